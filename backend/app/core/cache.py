@@ -1,78 +1,731 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from typing import Awaitable, Callable, Iterable
+
 from fastapi_cache import FastAPICache
 
 
 from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, TypeAdapter
+from redis.client import NEVER_DECODE
+from sqlalchemy import event, inspect as sa_inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from starlette.requests import Request as StarletteRequest
 from starlette.responses import Response as StarletteResponse
 
-async def custom_key_builder(
-    func,
-    namespace: str = "",
-    request: Request = None,
-    response: Response = None,
-    *args,
-    **kwargs,
-):
-    from fastapi_cache import FastAPICache
-
-    prefix = FastAPICache.get_prefix()
-    cache_key = f"{prefix}:{namespace}:{func.__module__}:{func.__name__}"
-
-    if args:
-        cache_key += f":{args}"
-
-    if kwargs:
-        filtered_kwargs = {}
-        for key, value in kwargs.items():
-            if key == "_":  # Skip unused dependencies (convention)
-                continue
-                
-            if isinstance(value, (AsyncSession, Request, Response, StarletteRequest, StarletteResponse)):
-                continue
-            
-            # Skip User objects (often returned by auth/permission dependencies)
-            if type(value).__name__ == "User":
-                continue
-                
-            # Also skip PermissionRequired if somehow passed directly
-            if type(value).__name__ == "PermissionRequired":
-                continue
-            filtered_kwargs[key] = value
-        
-        if filtered_kwargs:
-           cache_key += f":{filtered_kwargs}"
+from core.cache_codec import CacheCoder
+from core.config import settings
+from core.single_flight import single_flight
 
-    return cache_key
+logger = logging.getLogger(__name__)
 
-async def clear_cache(func, *args, **kwargs):
+
+def get_redis():
     """
-    Clears the cache for a specific function.
-    If args/kwargs are provided, attempts to clear specific key (complex due to flexible key builder).
-    Currently implementing: Clear ALL keys for this function pattern to ensuring safety.
+    Returns the Redis client shared with FastAPICache/FastAPILimiter,
+    or None if the cache has not been initialised yet.
     """
     try:
         backend = FastAPICache.get_backend()
-        if not backend:
+    except AssertionError:
+        return None
+    return getattr(backend, "redis", None)
+
+
+# ------------------------------------------------------------------ #
+#  KEYS
+# ------------------------------------------------------------------ #
+def _call_arguments(kwargs: dict) -> tuple[dict, AsyncSession | None, object | None]:
+    """
+    Splits an endpoint call into its canonical (JSON-able) request arguments,
+    the session and the calling User. Unused dependencies ("_") are left out.
+    """
+    arguments = {}
+    session = None
+    user = None
+    for name, value in kwargs.items():
+        if isinstance(value, AsyncSession):
+            session = value
+        elif type(value).__name__ == "User":
+            if name != "_":
+                user = value
+        elif name == "_" or isinstance(
+            value, (Request, Response, StarletteRequest, StarletteResponse)
+        ):
+            continue
+        elif isinstance(value, BaseModel):
+            arguments[name] = value.model_dump(mode="json")
+        else:
+            arguments[name] = jsonable_encoder(value)
+    return arguments, session, user
+
+
+def _entry_key(func, namespace: str, arguments: dict) -> str:
+    canonical = json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(canonical.encode()).hexdigest()
+    return f"{FastAPICache.get_prefix()}:{namespace}:{func.__module__}:{func.__name__}:{digest}"
+
+
+async def default_key_builder(func, namespace: str = "", **kwargs) -> str:
+    """
+    Key of a `cached` endpoint call: the endpoint plus a hash of its
+    canonical arguments. A User argument contributes its id, so endpoints
+    answering per caller never share entries between users.
+    """
+    arguments, _, user = _call_arguments(kwargs)
+    if user is not None:
+        arguments["__user__"] = user.id
+    return _entry_key(func, namespace, arguments)
+
+
+def scoped_key_builder(
+    visibility: Callable[[AsyncSession, object], Awaitable[list]],
+) -> Callable[..., Awaitable[str]]:
+    """
+    Keys a role-filtered endpoint on what the caller can see rather than on
+    who they are: `visibility(session, user)` returns the caller's scope
+    (role class, teacher groups/subjects, student group - see
+    dependence.cache_scope), and users with the same scope share entries.
+    """
+
+    async def build(func, namespace: str = "", **kwargs) -> str:
+        arguments, session, user = _call_arguments(kwargs)
+        if user is not None:
+            arguments["__scope__"] = await visibility(session, user)
+        return _entry_key(func, namespace, arguments)
+
+    return build
+
+
+# ------------------------------------------------------------------ #
+#  TAGS
+# ------------------------------------------------------------------ #
+def cache_tag_key(tag: str) -> str:
+    return f"{FastAPICache.get_prefix()}:tag:{tag}"
+
+
+def invalidation_channel() -> str:
+    """Pub/sub channel on which invalidated tags are announced to all workers."""
+    return f"{FastAPICache.get_prefix()}:cache:invalidations"
+
+
+def function_tag(func) -> str:
+    """Every entry of a `cached` endpoint carries its function tag."""
+    return f"{func.__module__}.{func.__name__}"
+
+
+def row_tag(table: str, row_id) -> str:
+    return f"{table}:{row_id}"
+
+
+def all_rows_tag(table: str) -> str:
+    """Invalidated by bulk statements, which do not say which rows they touched."""
+    return f"{table}:*"
+
+
+def stale_key(key: str) -> str:
+    """Where an invalidated stampede-protected entry is kept until recomputed."""
+    return f"{key}:stale"
+
+
+def _entry_tags(tags: Iterable[str]) -> set[str]:
+    entry_tags = set()
+    for tag in tags:
+        entry_tags.add(tag)
+        table, sep, _ = tag.partition(":")
+        if sep:
+            entry_tags.add(all_rows_tag(table))
+    return entry_tags
+
+
+# Stores an entry and adds it to its tag sets. A tag set lives at least as
+# long as its newest entry, so an entry never outlives its registration.
+# Protected entries (ARGV[3] == "1") register in the tag's ":protected" set
+# and replace their stale copy.
+_SET_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+local protected = ARGV[3] == '1'
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ttl)
+if protected then
+    redis.call('DEL', KEYS[1] .. ':stale')
+end
+for i = 2, #KEYS do
+    local tag = KEYS[i]
+    if protected then
+        tag = tag .. ':protected'
+    end
+    redis.call('SADD', tag, KEYS[1])
+    if redis.call('TTL', tag) < ttl then
+        redis.call('EXPIRE', tag, ttl)
+    end
+end
+return 1
+"""
+
+# Deletes every entry registered under the given tags, then the tag sets.
+# Protected entries are moved to their stale key instead (keeping their TTL)
+# unless ARGV[1] == "1" asks to drop them too.
+_INVALIDATE_SCRIPT = """
+local drop_stale = ARGV[1] == '1'
+local deleted = 0
+for i = 1, #KEYS do
+    local members = redis.call('SMEMBERS', KEYS[i])
+    for j = 1, #members, 500 do
+        deleted = deleted + redis.call('DEL', unpack(members, j, math.min(j + 499, #members)))
+    end
+    redis.call('DEL', KEYS[i])
+
+    local protected = KEYS[i] .. ':protected'
+    for _, key in ipairs(redis.call('SMEMBERS', protected)) do
+        if drop_stale then
+            deleted = deleted + redis.call('DEL', key, key .. ':stale')
+        elseif redis.call('EXISTS', key) == 1 then
+            redis.call('RENAME', key, key .. ':stale')
+            deleted = deleted + 1
+        end
+    end
+    redis.call('DEL', protected)
+end
+return deleted
+"""
+
+
+# Releases a recompute lock only if this worker still holds it
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class TaggedCache:
+    """
+    Response cache entries registered in Redis tag sets ("quizzes",
+    "quizzes:5", ...). A write invalidates by tag: one Lua call reads the
+    tag sets and deletes their members, so nothing ever walks the keyspace
+    with KEYS or SCAN.
+
+    Invalidation runs after the commit, in the background. Until it has
+    finished, this worker reads around the cache. The tags are then
+    published on `invalidation_channel()` for the workers' local tiers.
+
+    Stampede-protected entries are not deleted but moved to `stale_key()`,
+    to be served while a single worker recomputes them.
+    """
+
+    def __init__(self) -> None:
+        self._scripts: dict[str, object] = {}
+        self._scripts_redis = None
+        self._pending_tasks: set[asyncio.Task] = set()
+
+    @property
+    def has_pending_invalidations(self) -> bool:
+        return bool(self._pending_tasks)
+
+    def _get_script(self, redis, source: str):
+        # Script objects are bound to a client (re-initialised in tests)
+        if self._scripts_redis is not redis:
+            self._scripts = {}
+            self._scripts_redis = redis
+        if source not in self._scripts:
+            self._scripts[source] = redis.register_script(source)
+        return self._scripts[source]
+
+    async def get(self, key: str) -> bytes | None:
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            # Entries are binary; the shared client decodes responses by default
+            return await redis.execute_command("GET", key, **{NEVER_DECODE: True})
+        except Exception as e:
+            logger.warning(f"Could not read cache entry: {e}")
+            return None
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        ttl: int,
+        tags: Iterable[str],
+        protected: bool = False,
+    ) -> None:
+        redis = get_redis()
+        if redis is None:
+            return
+        tag_keys = [cache_tag_key(tag) for tag in _entry_tags(tags)]
+        try:
+            await self._get_script(redis, _SET_SCRIPT)(
+                keys=[key, *tag_keys], args=[value, ttl, int(protected)]
+            )
+        except Exception as e:
+            logger.warning(f"Could not write cache entry: {e}")
+
+    async def acquire_recompute_lock(self, key: str) -> str | None:
+        """Returns the lock token, or None if another worker is recomputing `key`."""
+        token = uuid.uuid4().hex
+        redis = get_redis()
+        if redis is None:
+            return token
+        try:
+            acquired = await redis.set(
+                f"{key}:lock", token, nx=True, ex=settings.cache.recompute_lock_ttl
+            )
+        except Exception as e:
+            logger.warning(f"Could not take cache recompute lock: {e}")
+            return token
+        return token if acquired else None
+
+    async def release_recompute_lock(self, key: str, token: str) -> None:
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await self._get_script(redis, _RELEASE_LOCK_SCRIPT)(keys=[f"{key}:lock"], args=[token])
+        except Exception as e:
+            logger.warning(f"Could not release cache recompute lock: {e}")
+
+    async def invalidate(self, tags: Iterable[str], drop_stale: bool = False) -> None:
+        tags = sorted(set(tags))
+        local_cache.drop_tags(tags)
+        redis = get_redis()
+        if redis is None or not tags:
             return
-            
-        prefix = FastAPICache.get_prefix()
-        # Namespace is usually empty or None in this project context unless specified.
-        # Assuming default namespace behavior or "" if not set.
-        namespace = ""
-        
-        # Construct base pattern: "fastapi-cache::app.modules.role.router:list_roles*"
-        pattern = f"{prefix}:{namespace}:{func.__module__}:{func.__name__}*"
-        
-        if hasattr(backend, "redis"):
-            redis = backend.redis
-            # Scan for keys matching the pattern to avoid blocking with keys() on large datasets
-            # multiple scans might be needed but keys() is okay for smaller scale testing/dev
-            # forcing keys() here for simplicity as per plan, but being aware of potential perf impact on massive redis
-            keys = await redis.keys(pattern)
-            if keys:
-                await redis.delete(*keys)
+        try:
+            await self._get_script(redis, _INVALIDATE_SCRIPT)(
+                keys=[cache_tag_key(tag) for tag in tags], args=[int(drop_stale)]
+            )
+            # After the delete, so a worker refilling its local tier reads fresh data
+            await redis.publish(invalidation_channel(), json.dumps(tags))
+        except Exception as e:
+            logger.warning(f"Could not invalidate cache tags: {e}")
+
+    def invalidate_later(self, tags: Iterable[str]) -> None:
+        local_cache.drop_tags(tags)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.invalidate(tags))
+        self._pending_tasks.add(task)
+        task.add_done_callback(self._pending_tasks.discard)
+
+
+tagged_cache = TaggedCache()
+
+cache_coder = CacheCoder(
+    serializer=settings.cache.serializer,
+    compressor=settings.cache.compressor,
+    threshold=settings.cache.compress_threshold,
+)
+
+
+async def _read_entry(key: str) -> dict | None:
+    raw = await tagged_cache.get(key)
+    if raw is None:
+        return None
+    try:
+        return cache_coder.decode(raw)
     except Exception as e:
-        # Fail silently or log error to avoid breaking the main flow if cache clearing fails
-        # For now, we just pass
-        pass
+        # E.g. written by a worker with a codec this one lacks: recompute it
+        logger.warning(f"Could not decode cache entry {key}: {e}")
+        return None
+
+
+# ------------------------------------------------------------------ #
+#  LOCAL TIER
+# ------------------------------------------------------------------ #
+class LocalCache:
+    """
+    In-process LRU of decoded responses in front of Redis, for small hot
+    reference data (endpoints cached with local=True). Entries live at most
+    `ttl` seconds and are dropped by tag when any worker announces an
+    invalidation on the pub/sub channel.
+
+    The local tier is only used while this worker is subscribed: if the
+    subscription drops, the tier is bypassed and cleared on resubscribe, as
+    announcements may have been missed in between.
+
+    Also counts local hits, Redis hits and misses per cache namespace.
+    """
+
+    def __init__(self, max_size: int, ttl: int) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> (expires at, value, tags)
+        self._entries: OrderedDict[str, tuple[float, object, frozenset[str]]] = OrderedDict()
+        self._keys_by_tag: dict[str, set[str]] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._subscribed = False
+
+    @property
+    def is_active(self) -> bool:
+        return self._subscribed
+
+    # ------------------------------------------------------------------ #
+    #  ENTRIES
+    # ------------------------------------------------------------------ #
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: int, tags: Iterable[str]) -> None:
+        self._discard(key)
+        entry_tags = frozenset(_entry_tags(tags))
+        self._entries[key] = (time.monotonic() + min(ttl, self.ttl), value, entry_tags)
+        for tag in entry_tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._discard(next(iter(self._entries)))
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def drop_tags(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            for key in list(self._keys_by_tag.get(tag, ())):
+                self._discard(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_tag.clear()
+
+    # ------------------------------------------------------------------ #
+    #  STATISTICS
+    # ------------------------------------------------------------------ #
+    def record(self, namespace: str, outcome: str) -> None:
+        """outcome is "local_hits", "redis_hits", "stale_hits" or "misses"."""
+        counters = self._stats.setdefault(
+            namespace or "default",
+            {"local_hits": 0, "redis_hits": 0, "stale_hits": 0, "misses": 0},
+        )
+        counters[outcome] += 1
+
+    def stats(self) -> dict:
+        return {
+            "local_entries": len(self._entries),
+            "local_max_size": self.max_size,
+            "local_ttl": self.ttl,
+            "subscribed": self._subscribed,
+            "namespaces": {name: dict(counters) for name, counters in self._stats.items()},
+        }
+
+    # ------------------------------------------------------------------ #
+    #  INVALIDATION LISTENER
+    # ------------------------------------------------------------------ #
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._task
+        self._task = None
+
+    async def _listen(self) -> None:
+        while not self._stopping:
+            redis = get_redis()
+            if redis is None:
+                await asyncio.sleep(1)
+                continue
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.subscribe(invalidation_channel())
+                # Announcements made while we were not subscribed are lost
+                self.clear()
+                self._subscribed = True
+                while not self._stopping:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                    if message is not None:
+                        self.drop_tags(json.loads(message["data"]))
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener failed: {e}")
+                await asyncio.sleep(1)
+            finally:
+                self._subscribed = False
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+local_cache = LocalCache(max_size=settings.cache.local_size, ttl=settings.cache.local_ttl)
+
+
+# ------------------------------------------------------------------ #
+#  DECORATOR
+# ------------------------------------------------------------------ #
+def _should_refresh(entry: dict, beta: float) -> bool:
+    """
+    Probabilistic early expiration (XFetch): the closer the entry is to its
+    expiry and the longer it took to compute, the likelier a reader is to
+    refresh it early, so refreshes of a hot key spread out instead of
+    piling up at the expiry.
+    """
+    jitter = -entry["delta"] * beta * math.log(1.0 - random.random())
+    return time.time() + jitter >= entry["expires_at"]
+
+
+async def _wait_for_entry(key: str) -> dict | None:
+    """
+    Polls for the entry another worker is computing, for as long as it holds
+    the recompute lock. None if the lock went away without an entry (the
+    recompute failed or outlived recompute_lock_ttl).
+    """
+    redis = get_redis()
+    while True:
+        await asyncio.sleep(0.05)
+        entry = await _read_entry(key)
+        if entry is not None:
+            return entry
+        try:
+            if not await redis.exists(f"{key}:lock"):
+                return None
+        except Exception as e:
+            logger.warning(f"Could not check cache recompute lock: {e}")
+            return None
+
+
+def cached(
+    expire: int = 60,
+    namespace: str = "",
+    tags: Iterable[str] = (),
+    key_builder: Callable[..., Awaitable[str]] | None = None,
+    local: bool = False,
+    stampede_protection: bool = False,
+) -> Callable:
+    """
+    Caches a GET endpoint's response in Redis under tags. Tags are format
+    strings over the endpoint's arguments, named after the tables the
+    response reads, e.g. ("questions:{question_id}", "subjects"); committed
+    ORM writes invalidate them automatically (see the hooks below).
+
+    The response is encoded through the route's response_model, so hits and
+    misses return the same JSON. Endpoints that filter rows by the caller's
+    role take key_builder=scoped_key_builder(...). Small, hot reference data
+    can add local=True to also keep decoded responses in this process (see
+    LocalCache). Hits and misses are counted per namespace.
+
+    Expensive shared entries can add stampede_protection=True: readers
+    refresh an entry early with a probability rising towards its expiry,
+    only the worker holding the entry's Redis lock recomputes it, and the
+    others keep serving the stale value (kept for another `expire` seconds)
+    meanwhile. A tag invalidation keeps the value as a stale copy too, so a
+    burst of writes costs one recompute rather than one per reader; callers
+    with nothing to serve wait for the lock holder.
+
+    Place it below the route decorator:
+
+        @router.get("/{quiz_id}", response_model=QuizStatisticsResponse)
+        @cached(expire=60, tags=("quizzes:{quiz_id}", "results"))
+        async def get_quiz_statistics(...): ...
+    """
+    key_builder = key_builder or default_key_builder
+    # Protected entries outlive their expiry to be served while recomputed
+    redis_ttl = expire * 2 if stampede_protection else expire
+
+    def wrapper(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        # Let FastAPI hand us the request (for the route's response_model)
+        params = list(signature.parameters.values()) + [
+            inspect.Parameter(
+                "_cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request
+            ),
+        ]
+        adapters: dict = {}
+
+        def encode(request: Request, result):
+            response_model = getattr(request.scope.get("route"), "response_model", None)
+            if response_model is None:
+                return jsonable_encoder(result)
+            if response_model not in adapters:
+                adapters[response_model] = TypeAdapter(response_model)
+            adapter = adapters[response_model]
+            return adapter.dump_python(
+                adapter.validate_python(result, from_attributes=True), mode="json"
+            )
+
+        async def compute(key: str, entry_tags: list[str], request: Request, args, kwargs):
+            local_cache.record(namespace, "misses")
+            started = time.monotonic()
+            value = encode(request, await func(*args, **kwargs))
+            entry = {
+                "value": value,
+                "expires_at": time.time() + expire,
+                # How long the value took to compute, for early refresh
+                "delta": time.monotonic() - started,
+            }
+            await tagged_cache.set(
+                key,
+                cache_coder.encode(entry),
+                redis_ttl,
+                entry_tags,
+                protected=stampede_protection,
+            )
+            return value
+
+        async def recompute(key: str, stale: dict | None, run: Callable[[], Awaitable]):
+            while (token := await tagged_cache.acquire_recompute_lock(key)) is None:
+                # Another worker is recomputing: serve what we have, or wait for it
+                if stale is not None:
+                    local_cache.record(namespace, "stale_hits")
+                    return stale["value"]
+                fresh = await _wait_for_entry(key)
+                if fresh is not None:
+                    local_cache.record(namespace, "redis_hits")
+                    return fresh["value"]
+                # The lock holder gave up without storing an entry: take over
+            try:
+                return await run()
+            finally:
+                await tagged_cache.release_recompute_lock(key, token)
+
+        @wraps(func)
+        async def inner(*args, _cache_request: Request, **kwargs):
+            if get_redis() is None or tagged_cache.has_pending_invalidations:
+                return await func(*args, **kwargs)
+
+            key = await key_builder(func, namespace, **kwargs)
+            entry_tags = [tag.format(**kwargs) for tag in tags]
+            entry_tags.append(function_tag(func))
+            use_local = local and local_cache.is_active
+            if use_local:
+                value = local_cache.get(key)
+                if value is not None:
+                    local_cache.record(namespace, "local_hits")
+                    return value
+
+            entry = await _read_entry(key)
+            stale = None
+            if entry is None and stampede_protection:
+                stale = await _read_entry(stale_key(key))
+
+            def run():
+                return compute(key, entry_tags, _cache_request, args, kwargs)
+
+            if entry is not None and not (
+                stampede_protection
+                and _should_refresh(entry, settings.cache.early_refresh_beta)
+            ):
+                local_cache.record(namespace, "redis_hits")
+                value = entry["value"]
+            elif stampede_protection and entry is None and stale is None:
+                # Without a stale value, callers in this worker share one recompute
+                value = await single_flight.do(key, lambda: recompute(key, None, run))
+            elif stampede_protection:
+                value = await recompute(key, entry or stale, run)
+            else:
+                value = await run()
+            if use_local:
+                local_cache.set(key, value, expire, entry_tags)
+            return value
+
+        inner.__signature__ = signature.replace(parameters=params)
+        return inner
+
+    return wrapper
+
+
+async def clear_cache(func, *args, **kwargs):
+    """Drops every cached response of a `cached` endpoint, stale copies included."""
+    await tagged_cache.invalidate([function_tag(func)], drop_stale=True)
+
+
+# ------------------------------------------------------------------ #
+#  INVALIDATION HOOKS
+# ------------------------------------------------------------------ #
+def mark_cache_tags(session: Session | AsyncSession, *tags: str) -> None:
+    """For writes the ORM does not see (raw SQL): invalidate these tags on commit."""
+    session.info.setdefault("cache_tags", set()).update(tags)
+
+
+def _object_tags(session: Session, obj, check_modified: bool) -> set[str]:
+    state = sa_inspect(obj)
+    mapper = state.mapper
+    tags = set()
+    # Column changes only - e.g. a new Result linked to the quiz is not one
+    if not check_modified or session.is_modified(obj, include_collections=False):
+        table = mapper.local_table.name
+        tags.add(table)
+        row_id = mapper.primary_key_from_instance(obj)
+        if len(row_id) == 1 and row_id[0] is not None:
+            tags.add(row_tag(table, row_id[0]))
+    # Collections kept in association tables (Role.users, ...)
+    for relationship in mapper.relationships:
+        if relationship.secondary is not None and relationship.key in state.committed_state:
+            tags.add(relationship.secondary.name)
+    return tags
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_cache_tags(session: Session, flush_context) -> None:
+    tags = set()
+    for obj in session.new:
+        tags |= _object_tags(session, obj, check_modified=False)
+    for obj in session.dirty:
+        tags |= _object_tags(session, obj, check_modified=True)
+    for obj in session.deleted:
+        tags |= _object_tags(session, obj, check_modified=False)
+    if tags:
+        mark_cache_tags(session, *tags)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_cache_tags(orm_execute_state) -> None:
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        table = mapper.local_table.name
+        mark_cache_tags(orm_execute_state.session, table, all_rows_tag(table))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_cache_on_commit(session: Session) -> None:
+    tags = session.info.pop("cache_tags", None)
+    if tags:
+        tagged_cache.invalidate_later(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_cache_tags_on_rollback(session: Session) -> None:
+    session.info.pop("cache_tags", None)
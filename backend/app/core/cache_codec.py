@@ -0,0 +1,146 @@
+import json
+import logging
+import zlib
+from typing import Any, Callable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Entry header: magic byte, format version, serializer id, compressor id.
+# Entries written before the header existed are plain JSON text.
+MAGIC = 0xC7
+VERSION = 1
+HEADER_SIZE = 4
+
+
+class CacheCodecError(ValueError):
+    pass
+
+
+class Serializer(NamedTuple):
+    code: int
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+class Compressor(NamedTuple):
+    code: int
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+SERIALIZERS: dict[str, Serializer] = {}
+COMPRESSORS: dict[str, Compressor] = {}
+
+
+def register_serializer(name: str, code: int, dumps, loads) -> None:
+    SERIALIZERS[name] = Serializer(code, dumps, loads)
+
+
+def register_compressor(name: str, code: int, compress, decompress) -> None:
+    COMPRESSORS[name] = Compressor(code, compress, decompress)
+
+
+# ------------------------------------------------------------------ #
+#  BUILT-IN CODECS
+# ------------------------------------------------------------------ #
+# Ids are stored in entries: never reuse one for a different codec
+register_serializer(
+    "json",
+    1,
+    lambda value: json.dumps(value, separators=(",", ":")).encode(),
+    json.loads,
+)
+register_compressor("none", 0, lambda data: data, lambda data: data)
+register_compressor("zlib", 1, zlib.compress, zlib.decompress)
+
+# orjson and zstandard are dependencies (the defaults); the others are used
+# when their packages are installed
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    register_serializer(
+        "orjson",
+        2,
+        # json.dumps stringifies non-str keys; orjson needs to be told to
+        lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS),
+        orjson.loads,
+    )
+
+try:
+    import msgpack
+except ImportError:
+    pass
+else:
+    register_serializer(
+        "msgpack", 3, msgpack.packb, lambda data: msgpack.unpackb(data, raw=False)
+    )
+
+try:
+    import zstandard
+except ImportError:
+    pass
+else:
+    register_compressor(
+        "zstd",
+        2,
+        lambda data: zstandard.ZstdCompressor().compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+
+try:
+    import lz4.frame
+except ImportError:
+    pass
+else:
+    register_compressor("lz4", 3, lz4.frame.compress, lz4.frame.decompress)
+
+
+# ------------------------------------------------------------------ #
+#  CODER
+# ------------------------------------------------------------------ #
+class CacheCoder:
+    """
+    Encodes cache entries as bytes: a 4-byte header naming the serializer
+    and compressor, then the payload. Payloads of at least `threshold` bytes
+    are compressed.
+
+    Entries are decoded by the codecs named in their header, not by this
+    coder's settings, so switching codecs needs no flush: old entries stay
+    readable as long as their codecs are registered.
+    """
+
+    def __init__(self, serializer: str, compressor: str, threshold: int) -> None:
+        if serializer not in SERIALIZERS:
+            logger.warning(f"Cache serializer '{serializer}' is not installed, using json")
+            serializer = "json"
+        if compressor not in COMPRESSORS:
+            logger.warning(f"Cache compressor '{compressor}' is not installed, using zlib")
+            compressor = "zlib"
+        self.serializer = SERIALIZERS[serializer]
+        self.compressor = COMPRESSORS[compressor]
+        self.threshold = threshold
+        self._serializers = {codec.code: codec for codec in SERIALIZERS.values()}
+        self._compressors = {codec.code: codec for codec in COMPRESSORS.values()}
+
+    def encode(self, value: Any) -> bytes:
+        payload = self.serializer.dumps(value)
+        compressor = self.compressor
+        if len(payload) < self.threshold:
+            compressor = COMPRESSORS["none"]
+        header = bytes((MAGIC, VERSION, self.serializer.code, compressor.code))
+        return header + compressor.compress(payload)
+
+    def decode(self, raw: bytes | str) -> Any:
+        if isinstance(raw, str):
+            raw = raw.encode()
+        if not raw or raw[0] != MAGIC:
+            return json.loads(raw)
+        if len(raw) < HEADER_SIZE or raw[1] != VERSION:
+            raise CacheCodecError("Unsupported cache entry format")
+        serializer = self._serializers.get(raw[2])
+        compressor = self._compressors.get(raw[3])
+        if serializer is None or compressor is None:
+            raise CacheCodecError(f"Cache entry codec {raw[2]}/{raw[3]} is not installed")
+        return serializer.loads(compressor.decompress(raw[HEADER_SIZE:]))
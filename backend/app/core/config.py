@@ -77,6 +77,28 @@ class FileUrl(BaseModel):
 class HemisConfig(BaseModel):
     login_url: str
     me_url: str
+    # Shared HTTP client (created in lifespan)
+    connect_timeout: float = 3.0
+    read_timeout: float = 10.0
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    # Max HEMIS calls in flight per worker
+    max_concurrency: int = 20
+    # Circuit breaker: open after N consecutive failures, retry after reset_timeout
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+    # Redis cache of `me` payloads (seconds); rejected credentials are cached shorter
+    profile_cache_ttl: int = 300
+    negative_cache_ttl: int = 60
+    # Buffered HemisTransaction audit writer
+    audit_batch_size: int = 100
+    audit_flush_interval: float = 2.0
+    audit_max_buffer: int = 10000
+    # Bulk roster sync: concurrent HEMIS fetches per job, users per commit
+    bulk_sync_concurrency: int = 10
+    bulk_sync_batch_size: int = 50
+    bulk_sync_job_ttl: int = 86400
 
 
 class RedisConfig(BaseModel):
@@ -90,6 +112,74 @@ class RedisConfig(BaseModel):
         return f"redis://{self.host}:{self.port}/0"
 
 
+class AuthConfig(BaseModel):
+    # Max number of users whose effective permissions are kept per process
+    permission_cache_size: int = 10000
+    # How often (seconds) a worker re-reads the permission version from Redis
+    permission_version_check_interval: float = 1.0
+    # Embed role bitmask / permission version / group id claims in access tokens
+    token_claims: bool = False
+
+
+class PasswordHashConfig(BaseModel):
+    # Raising this migrates existing hashes on the users' next login
+    bcrypt_rounds: int = 12
+    # Threads in the dedicated hashing pool (= max concurrent bcrypt ops)
+    max_workers: int = 4
+
+
+class QuizConfig(BaseModel):
+    # Compiled quiz snapshots kept per process (in front of Redis)
+    snapshot_cache_size: int = 256
+    # Redis TTL of a snapshot version (seconds)
+    snapshot_ttl: int = 3600
+    # Question texts/options kept per process, fetched only for sampled questions
+    question_cache_size: int = 5000
+    # Attempt tokens stay valid for the quiz duration plus this grace (minutes)
+    attempt_grace_minutes: int = 10
+    # Students reviewing their own attempts also see the correct answers
+    show_correct_answers: bool = False
+    # Accept end_quiz without an attempt_token (graded against whatever
+    # question ids the client sends); only for clients predating the token
+    allow_untokened_submit: bool = False
+    # Write-behind end_quiz: grade in memory, persist from a Redis stream
+    write_behind: bool = False
+    submission_batch_size: int = 100
+    submission_block_ms: int = 2000
+    # Pending stream entries idle this long are taken over from a dead consumer (ms)
+    submission_claim_idle_ms: int = 60000
+    # Graded responses are kept this long to answer repeated submits (seconds)
+    submission_ttl: int = 86400
+    # A batch failing this many deliveries is retried entry by entry; entries
+    # that still fail on their data go to the dead-letter stream
+    submission_max_deliveries: int = 3
+
+
+class IdempotencyConfig(BaseModel):
+    # How long the first response is replayed for a reused Idempotency-Key (seconds)
+    ttl: int = 86400
+    # A request still running after this long no longer blocks its key (seconds)
+    lock_ttl: int = 300
+
+
+class CacheConfig(BaseModel):
+    # Responses kept per process in front of Redis, for endpoints cached with local=True
+    local_size: int = 1000
+    # Upper bound on a local entry's age (seconds); missed invalidations expire with it
+    local_ttl: int = 30
+    # Early refresh eagerness for stampede-protected endpoints (1.0 = XFetch default)
+    early_refresh_beta: float = 1.0
+    # A worker recomputing an entry holds its lock at most this long (seconds);
+    # workers without a stale value wait for it meanwhile
+    recompute_lock_ttl: int = 30
+    # Entry codecs: json/orjson/msgpack, none/zlib/zstd/lz4; missing ones fall
+    # back to json/zlib
+    serializer: str = "orjson"
+    compressor: str = "zstd"
+    # Payloads from this size (bytes) are compressed
+    compress_threshold: int = 1024
+
+
 class AppConfig(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -106,6 +196,11 @@ class AppConfig(BaseSettings):
     hemis: HemisConfig
     file_url: FileUrl
     redis: RedisConfig
+    auth: AuthConfig = AuthConfig()
+    password_hash: PasswordHashConfig = PasswordHashConfig()
+    quiz: QuizConfig = QuizConfig()
+    idempotency: IdempotencyConfig = IdempotencyConfig()
+    cache: CacheConfig = CacheConfig()
 
 
 settings = AppConfig()
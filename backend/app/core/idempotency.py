@@ -0,0 +1,166 @@
+import hashlib
+import inspect
+import json
+import logging
+from functools import wraps
+from typing import Callable
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from starlette.datastructures import UploadFile
+
+from core.cache import get_redis
+from core.config import settings
+from core.rate_limit import default_identifier
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+_IN_PROGRESS = "in_progress"
+_DONE = "done"
+
+
+def idempotency_key(scope: str, key: str) -> str:
+    return f"{settings.redis.prefix}:idempotency:{scope}:{key}"
+
+
+async def _caller_scope(request: Request) -> str:
+    """
+    Keys are per endpoint and per caller: the user id from the verified
+    access token, so a refreshed token still finds its keys, else the IP.
+    """
+    caller = await default_identifier(request)
+    return hashlib.sha256(
+        f"{request.method}\x00{request.url.path}\x00{caller}".encode()
+    ).hexdigest()
+
+
+async def _request_fingerprint(request: Request) -> str:
+    digest = hashlib.sha256(str(request.query_params).encode())
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        # The stream was consumed by the form parser; FastAPI caches the form
+        form = await request.form()
+        for name, value in form.multi_items():
+            digest.update(name.encode())
+            if isinstance(value, UploadFile):
+                digest.update(f"{value.filename}\x00{value.size}".encode())
+            else:
+                digest.update(value.encode())
+    else:
+        digest.update(await request.body())
+    return digest.hexdigest()
+
+
+def idempotent(ttl: int | None = None, lock_ttl: int | None = None) -> Callable:
+    """
+    Makes a write endpoint honour the Idempotency-Key header: the first
+    response is stored in Redis and replayed (with an Idempotent-Replayed
+    header) for repeated requests with the same key, instead of running the
+    endpoint again.
+
+    A key reused with a different request is rejected with 422, and a repeat
+    arriving while the first request is still running gets 409. Failed
+    requests are not stored, so the client can retry them. Without the
+    header, or without Redis, the endpoint runs as usual.
+
+    Place it below the route decorator:
+
+        @router.post("/", ...)
+        @idempotent()
+        async def create_quiz(...): ...
+    """
+    ttl = ttl or settings.idempotency.ttl
+    lock_ttl = lock_ttl or settings.idempotency.lock_ttl
+
+    def wrapper(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        # Let FastAPI hand us the request and the response (for the header)
+        params = list(signature.parameters.values()) + [
+            inspect.Parameter(
+                "_idempotency_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request
+            ),
+            inspect.Parameter(
+                "_idempotency_response", inspect.Parameter.KEYWORD_ONLY, annotation=Response
+            ),
+        ]
+
+        @wraps(func)
+        async def inner(
+            *args, _idempotency_request: Request, _idempotency_response: Response, **kwargs
+        ):
+            request = _idempotency_request
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            redis = get_redis()
+            if not key or redis is None:
+                return await func(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters",
+                )
+
+            record_key = idempotency_key(await _caller_scope(request), key)
+            fingerprint = await _request_fingerprint(request)
+            try:
+                acquired = await redis.set(
+                    record_key,
+                    json.dumps({"state": _IN_PROGRESS, "fingerprint": fingerprint}),
+                    nx=True,
+                    ex=lock_ttl,
+                )
+                stored = None if acquired else await redis.get(record_key)
+            except Exception as e:
+                logger.warning(f"Idempotency store unavailable, running request: {e}")
+                return await func(*args, **kwargs)
+
+            if stored:
+                record = json.loads(stored)
+                if record["fingerprint"] != fingerprint:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail=f"{IDEMPOTENCY_HEADER} was already used for a different request",
+                    )
+                if record["state"] == _IN_PROGRESS:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=f"A request with this {IDEMPOTENCY_HEADER} is still in progress",
+                    )
+                _idempotency_response.headers[REPLAYED_HEADER] = "true"
+                if record["status_code"] is not None:
+                    _idempotency_response.status_code = record["status_code"]
+                return record["body"]
+
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException:
+                # Let the client retry a failed request with the same key
+                try:
+                    await redis.delete(record_key)
+                except Exception as e:
+                    logger.warning(f"Could not release idempotency key: {e}")
+                raise
+
+            try:
+                await redis.set(
+                    record_key,
+                    json.dumps(
+                        {
+                            "state": _DONE,
+                            "fingerprint": fingerprint,
+                            "status_code": _idempotency_response.status_code,
+                            "body": jsonable_encoder(result),
+                        }
+                    ),
+                    ex=ttl,
+                )
+            except Exception as e:
+                logger.warning(f"Could not store idempotent response: {e}")
+            return result
+
+        inner.__signature__ = signature.replace(parameters=params)
+        return inner
+
+    return wrapper
@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.permission.model import Permission
+from app.models.role.model import Role
+from app.models.role_permission.model import RolePermission
+from app.models.student.model import Student
+from app.models.user.model import User
+from app.models.user_role.model import UserRole
+from core.cache import get_redis
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PERMISSION_VERSION_KEY = f"{settings.redis.prefix}:permission_version"
+
+# Role ids are packed into a bitmask in access tokens; ids past this do not fit
+MAX_ROLE_MASK_BITS = 63
+
+# Models whose changes affect authorization, and the attributes that matter
+# on update (None = any change). Users and students are only tracked on delete
+# and on the attributes below - a password rehash must not flush the cache.
+_WATCHED_MODELS: dict[type, tuple[str, ...] | None] = {
+    Role: ("name", "permissions"),
+    Permission: ("name",),
+    UserRole: None,
+    RolePermission: None,
+}
+_WATCHED_USER_ATTRS = ("username", "roles")
+# A student's group is part of the cached scope (and of token claims)
+_WATCHED_STUDENT_ATTRS = ("group_id",)
+
+
+def encode_role_mask(role_ids) -> int | None:
+    """Packs role ids into a bitmask, or None if an id does not fit."""
+    mask = 0
+    for role_id in role_ids:
+        if not 0 <= role_id <= MAX_ROLE_MASK_BITS:
+            return None
+        mask |= 1 << role_id
+    return mask
+
+
+def decode_role_mask(mask: int) -> list[int]:
+    return [bit for bit in range(MAX_ROLE_MASK_BITS + 1) if mask >> bit & 1]
+
+
+@dataclass(frozen=True)
+class CachedPrincipal:
+    user_id: int
+    username: str
+    roles: tuple[tuple[int, str], ...]
+    permissions: frozenset[str]
+    group_id: int | None = None
+
+    @property
+    def is_admin(self) -> bool:
+        return any(name == "Admin" for _, name in self.roles)
+
+    def to_user(self) -> User:
+        """
+        Builds a transient User with its roles populated, so route handlers
+        keep receiving a User object (id, username, roles) without a DB hit.
+        """
+        user = User(id=self.user_id, username=self.username)
+        user.roles = [Role(id=role_id, name=name) for role_id, name in self.roles]
+        if self.group_id is not None:
+            user.student = Student(user_id=self.user_id, group_id=self.group_id)
+        return user
+
+
+class PermissionCache:
+    """
+    Per-process cache of each user's effective permission set and of the
+    permission name → id map.
+
+    Entries are tagged with a version counter stored in Redis. Any commit that
+    touches roles, permissions, user_roles or role_permissions bumps the
+    counter, which makes every worker drop its local cache on the next check.
+    """
+
+    def __init__(self, max_size: int, check_interval: float) -> None:
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self._principals: OrderedDict[int, CachedPrincipal] = OrderedDict()
+        self._permission_ids: dict[str, int] | None = None
+        # role id -> (role name, permission names), used for token claims
+        self._roles: dict[int, tuple[str, frozenset[str]]] | None = None
+        self._version: int | None = None
+        self._last_check: float = 0.0
+        self._pending_tasks: set[asyncio.Task] = set()
+
+    # ------------------------------------------------------------------ #
+    #  VERSIONING
+    # ------------------------------------------------------------------ #
+    async def _sync_version(self) -> bool:
+        """
+        Re-reads the version from Redis (at most once per check_interval) and
+        clears the local cache when it moved. Returns False when Redis is not
+        available, in which case callers must go to the database.
+        """
+        if self._pending_tasks:
+            # A local bump is still on its way to Redis; trust the local version
+            return self._version is not None
+
+        now = time.monotonic()
+        if self._version is not None and now - self._last_check < self.check_interval:
+            return True
+
+        redis = get_redis()
+        if redis is None:
+            return False
+        try:
+            raw = await redis.get(PERMISSION_VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"Could not read permission version from Redis: {e}")
+            return False
+
+        version = int(raw) if raw else 0
+        if version != self._version:
+            self.clear()
+            self._version = version
+        self._last_check = now
+        return True
+
+    async def current_version(self) -> int | None:
+        """Permission version as last seen by this worker (None if unknown)."""
+        if not await self._sync_version():
+            return None
+        return self._version
+
+    def clear(self) -> None:
+        self._principals.clear()
+        self._permission_ids = None
+        self._roles = None
+
+    def invalidate(self) -> None:
+        """
+        Drops the local cache immediately and bumps the shared version in
+        Redis in the background, so the other workers follow.
+        """
+        self.clear()
+        if self._version is not None:
+            # Tokens issued under the previous version are stale from now on
+            self._version += 1
+        self._last_check = 0.0
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.bump_version())
+        self._pending_tasks.add(task)
+        task.add_done_callback(self._pending_tasks.discard)
+
+    async def bump_version(self) -> None:
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.incr(PERMISSION_VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"Could not bump permission version in Redis: {e}")
+
+    # ------------------------------------------------------------------ #
+    #  LOOKUPS
+    # ------------------------------------------------------------------ #
+    async def get_principal(
+        self, session: AsyncSession, user_id: int
+    ) -> CachedPrincipal | None:
+        use_cache = await self._sync_version()
+        if use_cache:
+            principal = self._principals.get(user_id)
+            if principal is not None:
+                self._principals.move_to_end(user_id)
+                return principal
+
+        principal = await self._load_principal(session, user_id)
+        if principal is not None and use_cache:
+            self._principals[user_id] = principal
+            if len(self._principals) > self.max_size:
+                self._principals.popitem(last=False)
+        return principal
+
+    async def get_permission_id(
+        self, session: AsyncSession, permission_name: str
+    ) -> int | None:
+        use_cache = await self._sync_version()
+        if use_cache and self._permission_ids is not None:
+            return self._permission_ids.get(permission_name)
+
+        result = await session.execute(select(Permission.name, Permission.id))
+        permission_ids = {name: perm_id for name, perm_id in result.all()}
+        if use_cache:
+            self._permission_ids = permission_ids
+        return permission_ids.get(permission_name)
+
+    async def principal_from_claims(
+        self, session: AsyncSession, payload: dict
+    ) -> CachedPrincipal | None:
+        """
+        Builds the principal from the role/permission claims embedded in an
+        access token. Returns None when the token carries no claims or was
+        issued under an older permission version, so the caller falls back
+        to the database path.
+        """
+        role_mask = payload.get("rm")
+        if role_mask is None or payload.get("pv") is None:
+            return None
+        if not await self._sync_version() or payload["pv"] != self._version:
+            return None
+
+        if self._roles is None:
+            stmt = select(Role).options(selectinload(Role.permissions))
+            roles = (await session.execute(stmt)).scalars().all()
+            self._roles = {
+                role.id: (role.name, frozenset(p.name for p in role.permissions))
+                for role in roles
+            }
+
+        roles = []
+        permissions: set[str] = set()
+        for role_id in decode_role_mask(role_mask):
+            if role_id not in self._roles:
+                return None
+            name, role_permissions = self._roles[role_id]
+            roles.append((role_id, name))
+            permissions |= role_permissions
+
+        return CachedPrincipal(
+            user_id=payload["user_id"],
+            username="",
+            roles=tuple(roles),
+            permissions=frozenset(permissions),
+            group_id=payload.get("gid"),
+        )
+
+    async def _load_principal(
+        self, session: AsyncSession, user_id: int
+    ) -> CachedPrincipal | None:
+        user_stmt = (
+            select(User).where(User.id == user_id).options(selectinload(User.roles))
+        )
+        user = (await session.execute(user_stmt)).scalar_one_or_none()
+        if not user:
+            return None
+
+        perm_stmt = (
+            select(Permission.name)
+            .join(RolePermission, RolePermission.permission_id == Permission.id)
+            .join(UserRole, UserRole.role_id == RolePermission.role_id)
+            .where(UserRole.user_id == user_id)
+        )
+        permissions = (await session.execute(perm_stmt)).scalars().all()
+
+        group_stmt = select(Student.group_id).where(Student.user_id == user_id)
+        group_id = (await session.execute(group_stmt)).scalars().first()
+
+        return CachedPrincipal(
+            user_id=user.id,
+            username=user.username,
+            roles=tuple((role.id, role.name) for role in user.roles),
+            permissions=frozenset(permissions),
+            group_id=group_id,
+        )
+
+
+permission_cache = PermissionCache(
+    max_size=settings.auth.permission_cache_size,
+    check_interval=settings.auth.permission_version_check_interval,
+)
+
+
+# ------------------------------------------------------------------ #
+#  INVALIDATION HOOKS
+# ------------------------------------------------------------------ #
+def _attrs_changed(obj, attrs: tuple[str, ...]) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _touches_permissions(session: Session) -> bool:
+    for obj in session.deleted:
+        if isinstance(obj, (User, Student)) or type(obj) in _WATCHED_MODELS:
+            return True
+
+    for obj in session.new:
+        if type(obj) in _WATCHED_MODELS:
+            return True
+
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            if _attrs_changed(obj, _WATCHED_USER_ATTRS):
+                return True
+            continue
+        if isinstance(obj, Student):
+            if _attrs_changed(obj, _WATCHED_STUDENT_ATTRS):
+                return True
+            continue
+        if type(obj) not in _WATCHED_MODELS:
+            continue
+        attrs = _WATCHED_MODELS[type(obj)]
+        if attrs is None or _attrs_changed(obj, attrs):
+            return True
+
+    return False
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_permissions_dirty(session: Session, flush_context) -> None:
+    if _touches_permissions(session):
+        session.info["permissions_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop("permissions_dirty", False):
+        permission_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_on_rollback(session: Session) -> None:
+    session.info.pop("permissions_dirty", None)
@@ -0,0 +1,125 @@
+import logging
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Request, Response
+from fastapi_limiter import FastAPILimiter
+
+from core.utils.access_token import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+# Returns the caller's rate-limit identity, or None to defer to the next one
+Identifier = Callable[[Request], Awaitable[Optional[str]]]
+
+
+# ------------------------------------------------------------------ #
+#  IDENTIFIERS
+# ------------------------------------------------------------------ #
+async def user_identifier(request: Request) -> str | None:
+    """The authenticated user id, from the access token LoggingMiddleware verified."""
+    decoded = getattr(request.state, "access_token", None)
+    authorization = request.headers.get("Authorization")
+    if decoded is None and authorization:
+        decoded = decode_access_token(authorization)
+    if decoded is None or decoded.payload is None:
+        return None
+    user_id = decoded.payload.get("user_id")
+    return f"user:{user_id}" if user_id is not None else None
+
+
+async def ip_identifier(request: Request) -> str:
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded:
+        return f"ip:{forwarded.split(',')[0].strip()}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def chain_identifiers(*identifiers: Identifier) -> Identifier:
+    """The first identifier that recognises the caller wins."""
+
+    async def identify(request: Request) -> str | None:
+        for identifier in identifiers:
+            identity = await identifier(request)
+            if identity is not None:
+                return identity
+        return None
+
+    return identify
+
+
+# Users behind one NAT (a computer lab) get separate limits; anonymous
+# routes such as login fall back to the client IP
+default_identifier = chain_identifiers(user_identifier, ip_identifier)
+
+
+# ------------------------------------------------------------------ #
+#  LIMITER
+# ------------------------------------------------------------------ #
+# Fixed window: count the hit and report the remaining window (ms) if over
+_RATE_LIMIT_SCRIPT = """
+local current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+if current > tonumber(ARGV[1]) then
+    local ttl = redis.call('PTTL', KEYS[1])
+    if ttl < 0 then
+        redis.call('PEXPIRE', KEYS[1], ARGV[2])
+        ttl = tonumber(ARGV[2])
+    end
+    return ttl
+end
+return 0
+"""
+
+
+class RateLimiter:
+    """
+    Drop-in replacement for fastapi_limiter's RateLimiter dependency (same
+    arguments and callback), keyed on `default_identifier` and the request
+    path, as upstream. Each check is a single atomic Lua call.
+    """
+
+    def __init__(
+        self,
+        times: int = 1,
+        milliseconds: int = 0,
+        seconds: int = 0,
+        minutes: int = 0,
+        hours: int = 0,
+        identifier: Optional[Identifier] = None,
+        callback: Optional[Callable] = None,
+    ) -> None:
+        self.times = times
+        self.milliseconds = (
+            milliseconds + 1000 * seconds + 60000 * minutes + 3600000 * hours
+        )
+        self.identifier = identifier or default_identifier
+        self.callback = callback
+        self._script = None
+        self._script_redis = None
+
+    def _get_script(self, redis):
+        # Script objects are bound to a client (re-initialised in tests)
+        if self._script_redis is not redis:
+            self._script = redis.register_script(_RATE_LIMIT_SCRIPT)
+            self._script_redis = redis
+        return self._script
+
+    async def __call__(self, request: Request, response: Response):
+        redis = FastAPILimiter.redis
+        if redis is None:
+            raise Exception("You must call FastAPILimiter.init in startup event of fastapi!")
+
+        path = request.scope["path"]
+        identity = await self.identifier(request) or "anonymous"
+        key = (
+            f"{FastAPILimiter.prefix}:{identity}:{request.method}:{path}"
+            f":{self.times}/{self.milliseconds}"
+        )
+
+        # EVALSHA, falling back to EVAL once if the script is not loaded
+        pexpire = await self._get_script(redis)(keys=[key], args=[self.times, self.milliseconds])
+        if pexpire != 0:
+            callback = self.callback or FastAPILimiter.http_callback
+            return await callback(request, response, pexpire)
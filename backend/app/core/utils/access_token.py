@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+
+import jwt
+from core.config import settings
+
+
+@dataclass(frozen=True)
+class DecodedToken:
+    raw: str
+    payload: dict | None = None
+    error: str | None = None
+
+
+def decode_access_token(authorization: str) -> DecodedToken:
+    """
+    Verifies an access token taken from the Authorization header.
+    Never raises: a failed verification is reported through `error`.
+    """
+    token = authorization
+    # Если токен приходит как "Bearer <token>", нужно убрать префикс
+    if token.startswith("Bearer "):
+        token = token.replace("Bearer ", "")
+
+    try:
+        payload = jwt.decode(
+            token, settings.jwt.access_token_secret, algorithms=[settings.jwt.algorithm]
+        )
+    except jwt.PyJWTError as e:
+        return DecodedToken(raw=authorization, error=str(e))
+    return DecodedToken(raw=authorization, payload=payload)
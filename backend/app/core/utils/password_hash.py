@@ -1,6 +1,21 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import settings
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.password_hash.bcrypt_rounds,
+)
+
+# bcrypt releases the GIL, so a small dedicated pool hashes in parallel
+# without stalling the event loop; its size caps concurrent hashing.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash.max_workers,
+    thread_name_prefix="password-hash",
+)
 
 
 def hash_password(password: str) -> str:
@@ -9,3 +24,33 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+async def _run_in_hash_pool(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, func, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(pwd_context.hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(pwd_context.verify, plain_password, hashed_password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verifies a password off the event loop. The second item is a fresh hash
+    when the stored one uses outdated cost parameters (rehash-on-login),
+    otherwise None.
+    """
+    return await _run_in_hash_pool(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+
+def shutdown_hash_executor() -> None:
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
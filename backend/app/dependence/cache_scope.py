@@ -0,0 +1,83 @@
+from app.models.group_teachers.model import GroupTeacher
+from app.models.subject_teacher.model import SubjectTeacher
+from app.models.teacher.model import Teacher
+from app.models.user.model import User
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .role_checker import get_student_group_id
+
+# Visibility functions mirror the role filters of the list repositories:
+# two callers that get the same tuple see the same rows, so they may share a
+# cached response (see core.cache.scoped_key_builder). Keep each one in step
+# with its repository.
+
+
+def role_class(user: User) -> tuple[bool, bool, bool]:
+    """(is_admin, is_teacher, is_student), as the repositories compute them."""
+    names = {role.name.lower() for role in user.roles}
+    return "admin" in names, "teacher" in names, "student" in names
+
+
+async def teacher_group_ids(session: AsyncSession, user: User) -> list[int]:
+    # group_teachers.teacher_id references users.id
+    stmt = select(GroupTeacher.group_id).where(GroupTeacher.teacher_id == user.id)
+    return sorted(set((await session.execute(stmt)).scalars().all()))
+
+
+async def teacher_subject_ids(session: AsyncSession, user: User) -> list[int]:
+    # subject_teachers.teacher_id references teachers.id
+    stmt = (
+        select(SubjectTeacher.subject_id)
+        .join(Teacher, Teacher.id == SubjectTeacher.teacher_id)
+        .where(Teacher.user_id == user.id)
+    )
+    return sorted(set((await session.execute(stmt)).scalars().all()))
+
+
+async def quiz_visibility(session: AsyncSession, user: User) -> list:
+    _, is_teacher, is_student = role_class(user)
+    # Students always see quizzes for their group, even with a Teacher role
+    if is_student:
+        return ["group", await get_student_group_id(session, user)]
+    if is_teacher:
+        return [
+            "teacher",
+            await teacher_group_ids(session, user),
+            await teacher_subject_ids(session, user),
+        ]
+    return ["all"]
+
+
+async def result_visibility(session: AsyncSession, user: User) -> list:
+    is_admin, is_teacher, is_student = role_class(user)
+    if is_admin:
+        return ["all"]
+    if is_teacher:
+        return [
+            "teacher",
+            await teacher_group_ids(session, user),
+            await teacher_subject_ids(session, user),
+        ]
+    if is_student:
+        return ["user", user.id]
+    return ["all"]
+
+
+async def group_visibility(session: AsyncSession, user: User) -> list:
+    is_admin, is_teacher, is_student = role_class(user)
+    # Admins ignore the teacher_id filter, everyone else applies it
+    if is_admin:
+        return ["admin"]
+    if is_teacher:
+        return ["teacher", await teacher_group_ids(session, user)]
+    if is_student:
+        return ["group", await get_student_group_id(session, user)]
+    return ["other"]
+
+
+async def subject_visibility(session: AsyncSession, user: User) -> list:
+    is_admin, is_teacher, _ = role_class(user)
+    if is_teacher and not is_admin:
+        return ["teacher", await teacher_subject_ids(session, user)]
+    return ["all"]
@@ -1,19 +1,14 @@
 import logging
 
-import jwt
-from core.config import settings
 from core.db_helper import db_helper
-from fastapi import Depends, HTTPException, status
+from core.utils.access_token import decode_access_token
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import APIKeyHeader
-from jwt import PyJWTError
-from app.models.permission.model import Permission
-from app.models.role.model import Role
-from app.models.role_permission.model import RolePermission
+from core.permission_cache import permission_cache
+from app.models.student.model import Student
 from app.models.user.model import User
-from app.models.user_role.model import UserRole
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 logger = logging.getLogger(__name__)
 
@@ -21,28 +16,45 @@ logger = logging.getLogger(__name__)
 api_key_header = APIKeyHeader(name="Authorization")
 
 
-async def get_current_user_id(token: str = Depends(api_key_header)):
-    # Если токен приходит как "Bearer <token>", нужно убрать префикс
-    if token.startswith("Bearer "):
-        token = token.replace("Bearer ", "")
+async def get_token_payload(
+    request: Request, token: str = Depends(api_key_header)
+) -> dict:
+    # LoggingMiddleware already verified the token for this request
+    decoded = getattr(request.state, "access_token", None)
+    if decoded is None or decoded.raw != token:
+        decoded = decode_access_token(token)
 
-    try:
-        payload = jwt.decode(
-            token, settings.jwt.access_token_secret, algorithms=[settings.jwt.algorithm]
-        )
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token: user_id missing",
-            )
-        return user_id
-    except PyJWTError:
+    if decoded.payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
 
+    if decoded.payload.get("user_id") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token: user_id missing",
+        )
+    return decoded.payload
+
+
+async def get_current_user_id(payload: dict = Depends(get_token_payload)) -> int:
+    return payload["user_id"]
+
+
+async def get_student_group_id(session: AsyncSession, user: User) -> int | None:
+    """
+    Returns the student's group id, using the value resolved by
+    PermissionRequired (token claims / permission cache) when available.
+    """
+    student = user.__dict__.get("student")
+    if student is not None and student.group_id is not None:
+        return student.group_id
+
+    stmt = select(Student.group_id).where(Student.user_id == user.id)
+    result = await session.execute(stmt)
+    return result.scalars().first()
+
 
 class PermissionRequired:
     def __init__(self, permission_name: str):
@@ -50,54 +62,39 @@ class PermissionRequired:
 
     async def __call__(
         self,
-        user_id: int = Depends(get_current_user_id),
+        payload: dict = Depends(get_token_payload),
         session: AsyncSession = Depends(db_helper.session_getter),
     ) -> User:
-        # Загружаем пользователя с ролями один раз
-        user_stmt = (
-            select(User).where(User.id == user_id).options(selectinload(User.roles))
-        )
-        result = await session.execute(user_stmt)
-        user = result.scalar_one_or_none()
+        # Роли и права берём из токена (если он выпущен с claims и не устарел),
+        # иначе из кэша процесса (без запросов к БД при попадании)
+        principal = await permission_cache.principal_from_claims(session, payload)
+        if principal is None:
+            principal = await permission_cache.get_principal(session, payload["user_id"])
 
-        if not user:
+        if not principal:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
 
         # Проверяем, является ли пользователь админом
-        is_admin = any(role.name == "Admin" for role in user.roles)
-
-        if is_admin:
-            return user  # Админ имеет доступ ко всему
+        if principal.is_admin:
+            return principal.to_user()  # Админ имеет доступ ко всему
 
         # Для не-админов проверяем конкретное разрешение
         # Permissions are created at startup by init_db, no need to create here
-        perm_stmt = select(Permission).where(Permission.name == self.permission_name)
-        perm_result = await session.execute(perm_stmt)
-        perm_obj = perm_result.scalar_one_or_none()
+        perm_id = await permission_cache.get_permission_id(session, self.permission_name)
 
-        if not perm_obj:
+        if perm_id is None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Permission '{self.permission_name}' not found. Restart the app to sync permissions.",
             )
 
         # 2. Проверяем наличие права у пользователя
-        perm_check_stmt = (
-            select(Permission.id)
-            .join(RolePermission)
-            .join(Role)
-            .join(UserRole)
-            .where(UserRole.user_id == user_id, Permission.name == self.permission_name)
-        )
-        perm_check_result = await session.execute(perm_check_stmt)
-        has_permission = perm_check_result.scalars().first()
-
-        if not has_permission:
+        if self.permission_name not in principal.permissions:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Access denied: user lacks '{self.permission_name}' permission",
             )
 
-        return user
+        return principal.to_user()
@@ -4,8 +4,15 @@ from redis import asyncio as aioredis
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 from fastapi_limiter import FastAPILimiter
+from core.cache import local_cache
 from core.config import settings
 from core.db_helper import db_helper
+from core.rate_limit import default_identifier
+from core.utils.password_hash import shutdown_hash_executor
+from modules.group.name_index import group_name_index
+from modules.hemis.audit import hemis_audit_sink
+from modules.hemis.client import hemis_client
+from modules.quiz_process.submission_queue import submission_queue
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,11 +35,18 @@ async def lifespan(app: FastAPI):
         async with db_helper.session_factory() as session:
             from core.init_db import init_db
             await init_db(app, session)
+            await group_name_index.warm(session)
 
         FastAPICache.init(RedisBackend(redis), prefix=settings.redis.prefix)
-        await FastAPILimiter.init(redis)
+        await FastAPILimiter.init(redis, identifier=default_identifier)
         logger.info("Initialized FastAPICache and FastAPILimiter")
 
+        await local_cache.start()
+        await hemis_client.start()
+        await hemis_audit_sink.start()
+        if settings.quiz.write_behind:
+            await submission_queue.start()
+
     except Exception as e:
         logger.error(f"Failed to connect to Redis: {e}")
         # We might want to re-raise if Redis is critical, 
@@ -43,5 +57,10 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown
+    await submission_queue.stop()
+    await local_cache.stop()
+    await hemis_audit_sink.stop()
+    await hemis_client.close()
+    shutdown_hash_executor()
     await redis.close()
     logger.info("Closed Redis connection")
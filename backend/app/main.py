@@ -6,6 +6,7 @@ from app.core.db_helper import db_helper
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.middleware.admin_auth import AdminAuth
+from app.middleware.force_https import ForceHTTPSMiddleware
 from app.middleware.logging_middleware import LoggingMiddleware
 from app.models.views import register_models
 from app.modules.router import router
@@ -44,14 +45,6 @@ app.add_middleware(
 # --- Register Logging Middleware ---
 app.add_middleware(LoggingMiddleware)
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-
-class ForceHTTPSMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request.scope["scheme"] = "https"
-        return await call_next(request)
-
 app.add_middleware(ForceHTTPSMiddleware)
 
 app.include_router(router)
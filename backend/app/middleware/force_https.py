@@ -0,0 +1,13 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class ForceHTTPSMiddleware:
+    """Marks every request as HTTPS (TLS is terminated by the nginx proxy)."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            scope["scheme"] = "https"
+        await self.app(scope, receive, send)
@@ -1,72 +1,80 @@
-
 import logging
 import time
-import jwt
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
 
-from core.config import settings
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.utils.access_token import decode_access_token
 
 logger = logging.getLogger(__name__)
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+
+class LoggingMiddleware:
+    """
+    Pure ASGI request logger.
+
+    Decodes the Authorization token once and stores the result in
+    `request.state.access_token`, so auth dependencies reuse it instead of
+    verifying the signature a second time. Responses are passed through
+    untouched (streaming bodies are not buffered).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         start_time = time.time()
-        
+
         # Extract User Info
         user_info = "Anonymous"
-        auth_header = request.headers.get("Authorization")
+        auth_header = Headers(scope=scope).get("Authorization")
         if auth_header:
-            logger.debug(f"Auth header found: {auth_header[:10]}...") 
-            
-            token = auth_header
-            if token.startswith("Bearer "):
-                token = token.replace("Bearer ", "")
-
-            try:
-                # Decode with verification using settings
-                payload = jwt.decode(token, settings.jwt.access_token_secret, algorithms=[settings.jwt.algorithm])
-                user_id = payload.get("user_id")
-                
-                if user_id:
-                    user_info = f"User({user_id})"
-                    logger.debug(f"User extracted: {user_id}")
-                else:
-                    logger.debug(f"Token decoded but user_id missing. Payload keys: {list(payload.keys())}")
-
-            except jwt.PyJWTError as e:
+            logger.debug(f"Auth header found: {auth_header[:10]}...")
+
+            decoded = decode_access_token(auth_header)
+            scope.setdefault("state", {})["access_token"] = decoded
+
+            if decoded.payload is None:
                 user_info = "InvalidToken"
-                logger.debug(f"Token validation failed: {str(e)}") 
+                logger.debug(f"Token validation failed: {decoded.error}")
+            elif decoded.payload.get("user_id"):
+                user_info = f"User({decoded.payload['user_id']})"
+                logger.debug(f"User extracted: {decoded.payload['user_id']}")
+            else:
+                logger.debug(
+                    f"Token decoded but user_id missing. Payload keys: {list(decoded.payload.keys())}"
+                )
         else:
             logger.debug("No Authorization header found")
 
-        # Log Request Start (Optional, usually we log on finish to capture duration/status)
-        # logger.info(f"Started {request.method} {request.url.path} by {user_info}")
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
         try:
-            response = await call_next(request)
-            
-            process_time = (time.time() - start_time) * 1000
-            status_code = response.status_code
-            
-            log_msg = (
-                f"Endpoint: {request.method} {request.url.path} | "
-                f"User: {user_info} | "
-                f"Status: {status_code} | "
-                f"Duration: {process_time:.2f}ms"
-            )
-            
-            logger.info(log_msg)
-            
-            return response
-            
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
             process_time = (time.time() - start_time) * 1000
             logger.error(
-                f"Endpoint: {request.method} {request.url.path} | "
+                f"Endpoint: {scope['method']} {scope['path']} | "
                 f"User: {user_info} | "
                 f"Duration: {process_time:.2f}ms | "
                 f"Error: {str(e)}"
             )
             raise e
+
+        process_time = (time.time() - start_time) * 1000
+        logger.info(
+            f"Endpoint: {scope['method']} {scope['path']} | "
+            f"User: {user_info} | "
+            f"Status: {status_code} | "
+            f"Duration: {process_time:.2f}ms"
+        )
@@ -0,0 +1,48 @@
+"""add group name_key
+
+Revision ID: d2a9c5e8f1b7
+Revises: c4e1f7a2b9d3
+Create Date: 2026-10-16 11:03:47.219554
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a9c5e8f1b7'
+down_revision: Union[str, Sequence[str], None] = 'c4e1f7a2b9d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('groups', sa.Column('name_key', sa.String(length=255), nullable=True))
+    # Backfill: lower-case, whitespace removed. If several existing groups
+    # collapse to the same key, only the oldest one gets it.
+    op.execute(
+        """
+        UPDATE groups g
+        SET name_key = k.name_key
+        FROM (
+            SELECT id,
+                   lower(regexp_replace(name, '\\s+', '', 'g')) AS name_key,
+                   row_number() OVER (
+                       PARTITION BY lower(regexp_replace(name, '\\s+', '', 'g'))
+                       ORDER BY id
+                   ) AS rn
+            FROM groups
+        ) k
+        WHERE g.id = k.id AND k.rn = 1
+        """
+    )
+    op.create_index(op.f('ix_groups_name_key'), 'groups', ['name_key'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_groups_name_key'), table_name='groups')
+    op.drop_column('groups', 'name_key')
@@ -0,0 +1,94 @@
+"""add quiz attempts
+
+Revision ID: f3a8d1c5b2e9
+Revises: e7b3f0a4c6d2
+Create Date: 2026-10-16 15:48:22.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8d1c5b2e9'
+down_revision: Union[str, Sequence[str], None] = 'e7b3f0a4c6d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('quiz_attempts',
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('quiz_id', sa.Integer(), nullable=True),
+    sa.Column('submission_id', sa.String(length=32), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_quiz_attempts_submission_id'), 'quiz_attempts', ['submission_id'], unique=True)
+    op.add_column('results', sa.Column('attempt_id', sa.Integer(), nullable=True))
+    op.add_column('user_answers', sa.Column('attempt_id', sa.Integer(), nullable=True))
+
+    # Backfill: one attempt per existing result, reusing the result id. Answers
+    # were written in the same transaction as their result, so they share its
+    # user, quiz and created_at.
+    op.execute(
+        """
+        INSERT INTO quiz_attempts (id, user_id, quiz_id, submission_id, created_at, updated_at)
+        SELECT id, user_id, quiz_id, submission_id, created_at, created_at
+        FROM results
+        """
+    )
+    op.execute("UPDATE results SET attempt_id = id")
+    op.execute(
+        """
+        UPDATE user_answers ua
+        SET attempt_id = r.id
+        FROM results r
+        WHERE ua.user_id = r.user_id
+          AND ua.quiz_id = r.quiz_id
+          AND ua.created_at = r.created_at
+        """
+    )
+    op.execute(
+        "SELECT setval('quiz_attempts_id_seq', GREATEST((SELECT COALESCE(MAX(id), 0) FROM quiz_attempts), 1), "
+        "(SELECT COUNT(*) > 0 FROM quiz_attempts))"
+    )
+
+    op.create_index(op.f('ix_results_attempt_id'), 'results', ['attempt_id'], unique=False)
+    op.create_foreign_key(None, 'results', 'quiz_attempts', ['attempt_id'], ['id'], ondelete='CASCADE')
+    op.create_index(op.f('ix_user_answers_attempt_id'), 'user_answers', ['attempt_id'], unique=False)
+    op.create_foreign_key(None, 'user_answers', 'quiz_attempts', ['attempt_id'], ['id'], ondelete='CASCADE')
+
+    # The submission id now lives on the attempt
+    op.drop_index(op.f('ix_results_submission_id'), table_name='results')
+    op.drop_column('results', 'submission_id')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('results', sa.Column('submission_id', sa.String(length=32), nullable=True))
+    op.execute(
+        """
+        UPDATE results r
+        SET submission_id = a.submission_id
+        FROM quiz_attempts a
+        WHERE r.attempt_id = a.id
+        """
+    )
+    op.create_index(op.f('ix_results_submission_id'), 'results', ['submission_id'], unique=True)
+
+    op.drop_constraint('user_answers_attempt_id_fkey', 'user_answers', type_='foreignkey')
+    op.drop_index(op.f('ix_user_answers_attempt_id'), table_name='user_answers')
+    op.drop_column('user_answers', 'attempt_id')
+    op.drop_constraint('results_attempt_id_fkey', 'results', type_='foreignkey')
+    op.drop_index(op.f('ix_results_attempt_id'), table_name='results')
+    op.drop_column('results', 'attempt_id')
+    op.drop_index(op.f('ix_quiz_attempts_submission_id'), table_name='quiz_attempts')
+    op.drop_table('quiz_attempts')
@@ -14,6 +14,7 @@ __all__ = [
     "Question",
     "Quiz",
     "QuizQuestion",
+    "QuizAttempt",
     "Result",
     "UserAnswers",
     "GroupTeacher",
@@ -39,6 +40,7 @@ from .subject_teacher.model import SubjectTeacher
 from .question.model import Question
 from .quiz.model import Quiz
 from .quiz_questions.model import QuizQuestion
+from .quiz_attempt.model import QuizAttempt
 from .results.model import Result
 from .user_answers.model import UserAnswers
 from .group_teachers.model import GroupTeacher
@@ -1,5 +1,7 @@
+import re
+
 from sqlalchemy import String, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from app.models.base import Base
 from app.models.mixins.id_int_pk import IdIntPk
 from app.models.mixins.time_stamp_mixin import TimestampMixin
@@ -20,6 +22,8 @@ class Group(Base, IdIntPk, TimestampMixin):
     faculty_id: Mapped[int] = mapped_column(ForeignKey("faculties.id"))
     
     name: Mapped[str] = mapped_column(String(255), unique=True)
+    # Case/whitespace-insensitive lookup key ("7 A-23 KT" -> "7a-23kt")
+    name_key: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=True)
 
     faculty: Mapped["Faculty"] = relationship(
         "Faculty", 
@@ -49,4 +53,13 @@ class Group(Base, IdIntPk, TimestampMixin):
 
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    @staticmethod
+    def make_name_key(name: str) -> str:
+        return re.sub(r"\s+", "", name.lower())
+
+    @validates("name")
+    def _sync_name_key(self, key: str, name: str) -> str:
+        self.name_key = self.make_name_key(name) if name is not None else None
+        return name
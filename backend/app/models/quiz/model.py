@@ -11,6 +11,7 @@ if TYPE_CHECKING:
     from app.models.group.model import Group
     from app.models.quiz_questions.model import QuizQuestion
     from app.models.results.model import Result
+    from app.models.quiz_attempt.model import QuizAttempt
     from app.models.user_answers.model import UserAnswers
 
 
@@ -72,6 +73,12 @@ class Quiz(Base, IdIntPk, TimestampMixin):
         cascade="all, delete-orphan",
     )
 
+    quiz_attempts: Mapped[list["QuizAttempt"]] = relationship(
+        "QuizAttempt",
+        back_populates="quiz",
+        cascade="all, delete-orphan",
+    )
+
     def __str__(self):
         return self.title
 
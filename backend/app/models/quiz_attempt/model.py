@@ -0,0 +1,42 @@
+from sqlalchemy import Integer, ForeignKey, String
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.models.base import Base
+from app.models.mixins.id_int_pk import IdIntPk
+from app.models.mixins.time_stamp_mixin import TimestampMixin
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.models.user.model import User
+    from app.models.quiz.model import Quiz
+    from app.models.results.model import Result
+    from app.models.user_answers.model import UserAnswers
+
+
+class QuizAttempt(Base, IdIntPk, TimestampMixin):
+    """One submitted quiz: its Result and its UserAnswers hang off it."""
+
+    __tablename__ = "quiz_attempts"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    quiz_id: Mapped[int] = mapped_column(Integer, ForeignKey("quizzes.id", ondelete="SET NULL"), nullable=True)
+    # Attempt id from the attempt token; makes repeated submits idempotent
+    submission_id: Mapped[str | None] = mapped_column(String(32), unique=True, index=True, nullable=True)
+
+    user: Mapped["User"] = relationship("User", back_populates="quiz_attempts")
+    quiz: Mapped["Quiz"] = relationship("Quiz", back_populates="quiz_attempts")
+    result: Mapped["Result"] = relationship(
+        "Result",
+        back_populates="attempt",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    user_answers: Mapped[list["UserAnswers"]] = relationship(
+        "UserAnswers",
+        back_populates="attempt",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    def __str__(self):
+        return f"QuizAttempt {self.id}"
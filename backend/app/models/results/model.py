@@ -10,6 +10,7 @@ if TYPE_CHECKING:
     from app.models.quiz.model import Quiz
     from app.models.subject.model import Subject
     from app.models.group.model import Group
+    from app.models.quiz_attempt.model import QuizAttempt
 
 class Result(Base, IdIntPk, TimestampMixin):
     __tablename__ = "results"
@@ -18,6 +19,7 @@ class Result(Base, IdIntPk, TimestampMixin):
     quiz_id: Mapped[int] = mapped_column(Integer, ForeignKey("quizzes.id", ondelete="SET NULL"), nullable=True)
     subject_id: Mapped[int] = mapped_column(Integer, ForeignKey("subjects.id", ondelete="SET NULL"), nullable=True)
     group_id: Mapped[int] = mapped_column(Integer, ForeignKey("groups.id", ondelete="SET NULL"), nullable=True)
+    attempt_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("quiz_attempts.id", ondelete="CASCADE"), index=True, nullable=True)
     
     correct_answers: Mapped[int] = mapped_column(Integer, nullable=False)
     wrong_answers: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -27,6 +29,7 @@ class Result(Base, IdIntPk, TimestampMixin):
     quiz: Mapped["Quiz"] = relationship("Quiz", back_populates="results")
     subject: Mapped["Subject"] = relationship("Subject", back_populates="results")
     group: Mapped["Group"] = relationship("Group", back_populates="results")
+    attempt: Mapped["QuizAttempt"] = relationship("QuizAttempt", back_populates="result")
 
     def __str__(self):
         return f"Result {self.id} - Grade: {self.grade}"
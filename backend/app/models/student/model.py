@@ -44,6 +44,8 @@ class Student(Base, TimestampMixin, IdIntPk):
     semester: Mapped[str] = mapped_column(String)
     address: Mapped[str] = mapped_column(String)
     avg_gpa: Mapped[float] = mapped_column(Float)
+    # sha256 of the last synced HEMIS profile (see HemisLoginService.save_user_data)
+    hemis_fingerprint: Mapped[str] = mapped_column(String(64), nullable=True)
 
     group: Mapped["Group"] = relationship("Group", back_populates="students")
     user: Mapped["User"] = relationship("User", back_populates="student")
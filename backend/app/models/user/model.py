@@ -12,6 +12,7 @@ if TYPE_CHECKING:
     from app.models.question.model import Question
     from app.models.quiz.model import Quiz
     from app.models.results.model import Result
+    from app.models.quiz_attempt.model import QuizAttempt
     from app.models.teacher.model import Teacher
     from app.models.user_answers.model import UserAnswers
     from app.models.group_teachers.model import GroupTeacher
@@ -46,6 +47,11 @@ class User(Base, IdIntPk, TimestampMixin):
         back_populates="user"
     )
 
+    quiz_attempts: Mapped[list["QuizAttempt"]] = relationship(
+        "QuizAttempt",
+        back_populates="user"
+    )
+
 
     user_answers: Mapped[list["UserAnswers"]] = relationship(
         "UserAnswers", 
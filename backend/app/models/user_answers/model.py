@@ -9,6 +9,7 @@ if TYPE_CHECKING:
     from app.models.user.model import User
     from app.models.quiz.model import Quiz
     from app.models.question.model import Question
+    from app.models.quiz_attempt.model import QuizAttempt
 
 class UserAnswers(Base, IdIntPk, TimestampMixin):
     __tablename__ = "user_answers"
@@ -16,6 +17,7 @@ class UserAnswers(Base, IdIntPk, TimestampMixin):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     quiz_id: Mapped[int] = mapped_column(Integer, ForeignKey("quizzes.id", ondelete="SET NULL"), nullable=True)
     question_id: Mapped[int] = mapped_column(Integer, ForeignKey("questions.id", ondelete="SET NULL"), nullable=True)
+    attempt_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("quiz_attempts.id", ondelete="CASCADE"), index=True, nullable=True)
     answer: Mapped[str] = mapped_column(String, nullable=True)
     correct_answer: Mapped[str | None] = mapped_column(String, nullable=True)
     is_correct: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -23,6 +25,7 @@ class UserAnswers(Base, IdIntPk, TimestampMixin):
     user: Mapped["User"] = relationship("User", back_populates="user_answers")
     quiz: Mapped["Quiz"] = relationship("Quiz", back_populates="user_answers")
     question: Mapped["Question"] = relationship("Question", back_populates="user_answers")
+    attempt: Mapped["QuizAttempt"] = relationship("QuizAttempt", back_populates="user_answers")
 
     def __str__(self):
         return f"UserAnswer {self.id} - {self.answer}"
\ No newline at end of file
@@ -5,7 +5,8 @@ from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.cache import cached
 
 from .repository import get_faculty_repository
 from .schemas import (
@@ -41,7 +42,7 @@ async def create_faculty(
 
 
 @router.get("/{faculty_id}", response_model=FacultyCreateResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(expire=300, namespace="faculties", tags=("faculties:{faculty_id}",), local=True)
 async def get_faculty(
     faculty_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -53,7 +54,7 @@ async def get_faculty(
 
 
 @router.get("/", response_model=FacultyListResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(expire=300, namespace="faculties", tags=("faculties",), local=True)
 async def list_faculties(
     data: FacultyListRequest = Depends(),
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -0,0 +1,48 @@
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.group.model import Group
+
+logger = logging.getLogger(__name__)
+
+
+class GroupNameIndex:
+    """
+    Per-process map of normalized group name (`Group.name_key`) to group id,
+    warmed at startup. Entries are only hints: callers re-check the row by
+    primary key, so renames/deletes on other workers heal on first miss.
+    """
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+
+    async def warm(self, session: AsyncSession) -> None:
+        result = await session.execute(
+            select(Group.name_key, Group.id).where(Group.name_key.is_not(None))
+        )
+        self._ids = {key: group_id for key, group_id in result.all()}
+        logger.info(f"Warmed group name index with {len(self._ids)} groups")
+
+    async def resolve(self, session: AsyncSession, name: str) -> Group | None:
+        key = Group.make_name_key(name)
+        group_id = self._ids.get(key)
+        if group_id is not None:
+            group = await session.get(Group, group_id)
+            if group is not None and group.name_key == key:
+                return group
+            self._ids.pop(key, None)
+
+        stmt = select(Group).where(Group.name_key == key)
+        group = (await session.execute(stmt)).scalar_one_or_none()
+        if group is not None:
+            self._ids[key] = group.id
+        return group
+
+    def add(self, group: Group) -> None:
+        if group.name_key:
+            self._ids[group.name_key] = group.id
+
+
+group_name_index = GroupNameIndex()
@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.results.model import Result
 from app.models.user.model import User
 from app.models.group_teachers.model import GroupTeacher
+from dependence.role_checker import get_student_group_id
 
 from .schemas import (
     GroupCreateRequest,
@@ -21,7 +22,9 @@ class GroupRepository:
     async def create_group(
         self, session: AsyncSession, data: GroupCreateRequest
     ) -> Group:
-        stmt_check = select(Group).where(Group.name == data.name)
+        stmt_check = select(Group).where(
+            Group.name_key == Group.make_name_key(data.name)
+        )
         result_check = await session.execute(stmt_check)
         if result_check.scalar_one_or_none():
             raise HTTPException(
@@ -79,10 +82,7 @@ class GroupRepository:
             )
             already_joined_group_teacher = True
         elif is_student:
-            from app.models.student.model import Student
-            student_stmt = select(Student.group_id).where(Student.user_id == current_user.id)
-            student_result = await session.execute(student_stmt)
-            assigned_group_id = student_result.scalar_one_or_none()
+            assigned_group_id = await get_student_group_id(session, current_user)
             if assigned_group_id:
                 stmt = stmt.where(Group.id == assigned_group_id)
             else:
@@ -154,7 +154,8 @@ class GroupRepository:
         if data.name is not None:
             # Check unique name excluding current
             stmt_check = select(Group).where(
-                Group.name == data.name, Group.id != group_id
+                Group.name_key == Group.make_name_key(data.name),
+                Group.id != group_id,
             )
             existing = (await session.execute(stmt_check)).scalar_one_or_none()
             if existing:
@@ -5,7 +5,9 @@ from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.cache import cached, scoped_key_builder
+from dependence.cache_scope import group_visibility
 
 from .repository import get_group_repository
 from .schemas import (
@@ -44,7 +46,7 @@ async def create_group(
 
 
 @router.get("/{group_id}", response_model=GroupCreateResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(expire=300, namespace="groups", tags=("groups:{group_id}",), local=True)
 async def get_group(
     group_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -56,7 +58,13 @@ async def get_group(
 
 
 @router.get("/", response_model=GroupListResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(
+    expire=300,
+    namespace="groups",
+    tags=("groups", "group_teachers"),
+    key_builder=scoped_key_builder(group_visibility),
+    local=True,
+)
 async def list_groups(
     data: GroupListRequest = Depends(),
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.hemis_transaction.model import HemisTransaction
+from core.config import settings
+from core.db_helper import db_helper
+
+logger = logging.getLogger(__name__)
+
+
+class HemisAuditSink:
+    """
+    Buffers HemisTransaction rows in memory and writes them in batches with a
+    multi-row INSERT, so login requests do not pay for the audit commit.
+
+    A batch is flushed when `batch_size` rows are queued or every
+    `flush_interval` seconds; `stop()` drains the buffer on shutdown.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval: float,
+        max_buffer: int,
+        session_factory: async_sessionmaker[AsyncSession] = db_helper.session_factory,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: list[dict] = []
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def record(self, row: dict) -> None:
+        if len(self._buffer) >= self.max_buffer:
+            logger.warning(f"Hemis audit buffer full, dropping record for {row.get('login')}")
+            return
+        row.setdefault("created_at", datetime.now(timezone.utc).replace(tzinfo=None))
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+        # Final drain on shutdown
+        await self.flush()
+
+    async def flush(self) -> None:
+        while self._buffer:
+            batch = self._buffer[: self.batch_size]
+            del self._buffer[: self.batch_size]
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(insert(HemisTransaction).values(batch))
+                    await session.commit()
+            except Exception as e:
+                logger.error(f"Could not write {len(batch)} Hemis audit rows: {e}")
+                # Keep the rows for the next attempt (unless shutting down)
+                if not self._stopping:
+                    self._buffer[:0] = batch[: self.max_buffer - len(self._buffer)]
+                return
+
+
+hemis_audit_sink = HemisAuditSink(
+    batch_size=settings.hemis.audit_batch_size,
+    flush_interval=settings.hemis.audit_flush_interval,
+    max_buffer=settings.hemis.audit_max_buffer,
+)
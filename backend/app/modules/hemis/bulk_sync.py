@@ -0,0 +1,241 @@
+import asyncio
+import io
+import logging
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.cache import get_redis
+from core.config import settings
+from core.db_helper import db_helper
+from .schemas import HemisLoginRequest, HemisSyncJobError, HemisSyncJobResponse
+from .service import hemis_service
+
+logger = logging.getLogger(__name__)
+
+
+class HemisBulkSyncService:
+    """
+    Background roster sync: fetches HEMIS profiles with bounded concurrency
+    (over the shared HEMIS client) and saves them through
+    `HemisLoginService.save_user_data`, one commit per batch.
+
+    Running jobs are kept in memory and mirrored to Redis, so the status
+    endpoint works from any worker; finished jobs are only read from Redis
+    (for job_ttl).
+    """
+
+    MAX_ERRORS = 100
+
+    def __init__(
+        self,
+        concurrency: int,
+        batch_size: int,
+        job_ttl: int,
+        session_factory: async_sessionmaker[AsyncSession] = db_helper.session_factory,
+    ) -> None:
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.job_ttl = job_ttl
+        self.session_factory = session_factory
+        self.prefix = f"{settings.redis.prefix}:hemis:sync_job"
+        self._jobs: dict[str, HemisSyncJobResponse] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    # ------------------------------------------------------------------ #
+    #  JOBS
+    # ------------------------------------------------------------------ #
+    async def start_job(self, items: list[HemisLoginRequest]) -> HemisSyncJobResponse:
+        if not items:
+            raise HTTPException(status_code=400, detail="Roster is empty")
+
+        job = HemisSyncJobResponse(
+            job_id=uuid.uuid4().hex,
+            status="pending",
+            total=len(items),
+            created_at=datetime.now(timezone.utc),
+        )
+        self._jobs[job.job_id] = job
+        await self._save(job)
+
+        task = asyncio.create_task(self.run_job(job, items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def get_job(self, job_id: str) -> HemisSyncJobResponse:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+
+        # Started on another worker
+        redis = get_redis()
+        raw = await redis.get(f"{self.prefix}:{job_id}") if redis else None
+        if raw is None:
+            raise HTTPException(status_code=404, detail="Sync job not found")
+        return HemisSyncJobResponse.model_validate_json(raw)
+
+    async def run_job(
+        self, job: HemisSyncJobResponse, items: list[HemisLoginRequest]
+    ) -> None:
+        job.status = "running"
+        await self._save(job)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        try:
+            for start in range(0, len(items), self.batch_size):
+                batch = items[start : start + self.batch_size]
+                fetched = await asyncio.gather(
+                    *(self._fetch(semaphore, item) for item in batch)
+                )
+                await self._save_batch(job, batch, fetched)
+                await self._save(job)
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"Hemis sync job {job.job_id} failed: {e}")
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            await self._save(job)
+            self._jobs.pop(job.job_id, None)
+
+    # ------------------------------------------------------------------ #
+    #  HELPERS
+    # ------------------------------------------------------------------ #
+    async def _fetch(
+        self, semaphore: asyncio.Semaphore, item: HemisLoginRequest
+    ) -> dict | HTTPException:
+        async with semaphore:
+            try:
+                return await hemis_service.fetch_hemis_data(
+                    item.login, item.password, use_cache=False
+                )
+            except HTTPException as e:
+                return e
+
+    async def _save_batch(
+        self,
+        job: HemisSyncJobResponse,
+        batch: list[HemisLoginRequest],
+        fetched: list[dict | HTTPException],
+    ) -> None:
+        saved: list[str] = []
+        async with self.session_factory() as session:
+            for item, me_data in zip(batch, fetched):
+                job.processed += 1
+                if isinstance(me_data, HTTPException):
+                    self._record_error(job, item.login, str(me_data.detail))
+                    continue
+                try:
+                    # Savepoint per student: one bad row does not drop the batch
+                    async with session.begin_nested():
+                        await hemis_service.save_user_data(
+                            session=session,
+                            username=item.login,
+                            password=item.password,
+                            me_data=me_data,
+                            faculty_id=item.faculty_id,
+                            group_id=item.group_id,
+                            commit=False,
+                        )
+                    saved.append(item.login)
+                except HTTPException as e:
+                    self._record_error(job, item.login, str(e.detail))
+                except SQLAlchemyError as e:
+                    self._record_error(job, item.login, str(e))
+
+            try:
+                await session.commit()
+            except SQLAlchemyError as e:
+                await session.rollback()
+                for login in saved:
+                    self._record_error(job, login, f"Batch commit failed: {e}")
+                return
+        job.succeeded += len(saved)
+
+    def _record_error(self, job: HemisSyncJobResponse, login: str, detail: str) -> None:
+        job.failed += 1
+        if len(job.errors) < self.MAX_ERRORS:
+            job.errors.append(HemisSyncJobError(login=login, detail=detail))
+
+    async def _save(self, job: HemisSyncJobResponse) -> None:
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(
+                f"{self.prefix}:{job.job_id}", job.model_dump_json(), ex=self.job_ttl
+            )
+        except Exception as e:
+            logger.warning(f"Could not store Hemis sync job {job.job_id}: {e}")
+
+    # ------------------------------------------------------------------ #
+    #  ROSTER FILE
+    # ------------------------------------------------------------------ #
+    async def parse_roster(self, file: UploadFile) -> list[HemisLoginRequest]:
+        """
+        Reads login/password pairs from an Excel or CSV roster. Uses the
+        `login`/`password` columns when present, otherwise the first two;
+        optional `faculty_id`/`group_id` columns are passed through.
+        """
+        contents = await file.read()
+        # Parsing a large workbook would block the event loop
+        return await asyncio.to_thread(
+            self._parse_roster_file, contents, file.filename or ""
+        )
+
+    def _parse_roster_file(
+        self, contents: bytes, filename: str
+    ) -> list[HemisLoginRequest]:
+        import pandas as pd
+
+        try:
+            if filename.lower().endswith(".csv"):
+                df = pd.read_csv(io.BytesIO(contents), dtype=str)
+            else:
+                df = pd.read_excel(io.BytesIO(contents), dtype=str)
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Could not read roster file",
+            )
+
+        if len(df.columns) < 2:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Roster must contain at least 2 columns (login, password)",
+            )
+        login_col = "login" if "login" in df.columns else df.columns[0]
+        password_col = "password" if "password" in df.columns else df.columns[1]
+
+        def optional_int(row, column: str) -> int | None:
+            if column not in df.columns or pd.isna(row[column]):
+                return None
+            try:
+                return int(row[column])
+            except ValueError:
+                return None
+
+        items = []
+        for _, row in df.iterrows():
+            if pd.isna(row[login_col]) or pd.isna(row[password_col]):
+                continue
+            items.append(
+                HemisLoginRequest(
+                    login=str(row[login_col]).strip(),
+                    password=str(row[password_col]).strip(),
+                    faculty_id=optional_int(row, "faculty_id"),
+                    group_id=optional_int(row, "group_id"),
+                )
+            )
+        return items
+
+
+hemis_bulk_sync_service = HemisBulkSyncService(
+    concurrency=settings.hemis.bulk_sync_concurrency,
+    batch_size=settings.hemis.bulk_sync_batch_size,
+    job_ttl=settings.hemis.bulk_sync_job_ttl,
+)
@@ -0,0 +1,81 @@
+import hashlib
+import hmac
+import json
+import logging
+
+from core.cache import get_redis
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_REJECTED = "rejected"
+
+
+class HemisProfileCache:
+    """
+    Short-lived Redis cache of HEMIS `me` payloads, plus a negative cache of
+    credentials HEMIS rejected.
+
+    Profiles are keyed on the login alone: they are only served after HEMIS
+    accepted the password, so a hit never vouches for credentials.
+    Rejections are keyed on an HMAC of login+password (keyed with the app
+    secret), so neither the password nor a plain hash of it is ever stored
+    in Redis.
+    """
+
+    def __init__(self, positive_ttl: int, negative_ttl: int) -> None:
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.prefix = f"{settings.redis.prefix}:hemis"
+
+    def _key(self, kind: str, *parts: str) -> str:
+        digest = hmac.new(
+            settings.jwt.access_token_secret.encode(),
+            "\x00".join(parts).encode(),
+            hashlib.sha256,
+        ).hexdigest()
+        return f"{self.prefix}:{kind}:{digest}"
+
+    async def get(self, login: str) -> dict | None:
+        """The cached `me` data, or None on a miss."""
+        raw = await self._load(self._key("me", login))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, login: str, me_data: dict) -> None:
+        await self._store(self._key("me", login), json.dumps(me_data), self.positive_ttl)
+
+    async def is_rejected(self, login: str, password: str) -> bool:
+        return await self._load(self._key("rejected", login, password)) == _REJECTED
+
+    async def set_rejected(self, login: str, password: str) -> None:
+        await self._store(
+            self._key("rejected", login, password), _REJECTED, self.negative_ttl
+        )
+
+    async def _load(self, key: str) -> str | None:
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(key)
+        except Exception as e:
+            logger.warning(f"Could not read HEMIS profile cache: {e}")
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode()
+        return raw
+
+    async def _store(self, key: str, value: str, ttl: int) -> None:
+        redis = get_redis()
+        if redis is None or ttl <= 0:
+            return
+        try:
+            await redis.set(key, value, ex=ttl)
+        except Exception as e:
+            logger.warning(f"Could not write HEMIS profile cache: {e}")
+
+
+hemis_profile_cache = HemisProfileCache(
+    positive_ttl=settings.hemis.profile_cache_ttl,
+    negative_ttl=settings.hemis.negative_cache_ttl,
+)
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+
+import httpx
+from fastapi import HTTPException
+
+from core.config import HemisConfig, settings
+
+logger = logging.getLogger(__name__)
+
+
+class HemisCredentialsRejected(HTTPException):
+    """HEMIS refused the login/password pair (as opposed to being unavailable)."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    until `reset_timeout` has passed; then lets one trial call through
+    (half-open) and closes again on success.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        if self._opened_at is None:
+            return False
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self._trial_in_flight
+        return True
+
+    @property
+    def is_half_open(self) -> bool:
+        """A trial call is in flight."""
+        return self._opened_at is not None and self._trial_in_flight
+
+    def allow_request(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if self.is_open:
+            return False
+        # Half-open: only one trial request at a time
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """The trial call ended without a verdict (e.g. cancelled): allow another."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.warning(
+                    f"Hemis circuit breaker opened after {self._failures} failures"
+                )
+            self._opened_at = time.monotonic()
+
+
+class HemisClient:
+    """
+    App-lifetime HTTP client for the HEMIS API: pooled keep-alive
+    connections, explicit timeouts, bounded concurrency and a circuit
+    breaker. Started/closed from lifespan; created lazily if used earlier.
+    """
+
+    def __init__(
+        self, config: HemisConfig, transport: httpx.AsyncBaseTransport | None = None
+    ) -> None:
+        self.config = config
+        self.transport = transport
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.breaker_failure_threshold,
+            reset_timeout=config.breaker_reset_timeout,
+        )
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore = asyncio.Semaphore(config.max_concurrency)
+
+    # ------------------------------------------------------------------ #
+    #  LIFECYCLE
+    # ------------------------------------------------------------------ #
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                self.config.read_timeout, connect=self.config.connect_timeout
+            ),
+            limits=httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_keepalive_connections,
+                keepalive_expiry=self.config.keepalive_expiry,
+            ),
+            headers={"Accept": "application/json"},
+            transport=self.transport,
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def is_available(self) -> bool:
+        return not self.breaker.is_open
+
+    # ------------------------------------------------------------------ #
+    #  REQUESTS
+    # ------------------------------------------------------------------ #
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if not self.breaker.allow_request():
+            raise HTTPException(
+                status_code=503,
+                detail="Hemis service temporarily unavailable",
+            )
+        trial = self.breaker.is_half_open
+        try:
+            if self._client is None:
+                await self.start()
+            async with self._semaphore:
+                response = await self._client.request(method, url, **kwargs)
+        except httpx.RequestError as e:
+            self.breaker.record_failure()
+            raise HTTPException(
+                status_code=503,
+                detail=f"Hemis service unavailable: {str(e)}",
+            )
+        except BaseException:
+            # Cancelled (client went away, caller timed out): no verdict on
+            # HEMIS, but the breaker must not wait for this trial forever
+            if trial:
+                self.breaker.release_trial()
+            raise
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def fetch_me(self, login: str, password: str) -> dict:
+        """Logs in to HEMIS with the student's credentials and returns `me` data."""
+        return await self.fetch_profile(await self.authenticate(login, password))
+
+    async def authenticate(self, login: str, password: str) -> str:
+        """Logs in to HEMIS with the student's credentials; returns the HEMIS token."""
+        login_resp = await self._request(
+            "POST",
+            self.config.login_url,
+            json={"login": login, "password": password},
+        )
+
+        if login_resp.status_code >= 500:
+            raise HTTPException(status_code=400, detail="Hemis login failed")
+        if login_resp.status_code != 200:
+            raise HemisCredentialsRejected(status_code=400, detail="Hemis login failed")
+
+        login_data = login_resp.json()
+        if not login_data.get("success"):
+            raise HemisCredentialsRejected(
+                status_code=400, detail="Hemis login returned unsuccessful"
+            )
+
+        return login_data["data"]["token"]
+
+    async def fetch_profile(self, token: str) -> dict:
+        """The `me` data of the student a HEMIS token belongs to."""
+        me_resp = await self._request(
+            "GET",
+            self.config.me_url,
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+        if me_resp.status_code != 200:
+            raise HTTPException(status_code=400, detail="Hemis ME endpoint failed")
+
+        me_result = me_resp.json()
+        if not me_result.get("success"):
+            raise HTTPException(
+                status_code=400, detail="Hemis ME returned unsuccessful"
+            )
+
+        return me_result["data"]
+
+
+hemis_client = HemisClient(settings.hemis)
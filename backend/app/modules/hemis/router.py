@@ -1,10 +1,11 @@
 import logging
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, File, Query, UploadFile, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.db_helper import db_helper
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.idempotency import idempotent
 from starlette.requests import Request
 
 from app.dependence.role_checker import PermissionRequired, get_current_user_id
@@ -15,7 +16,10 @@ from .schemas import (
     HemisTransactionListResponse,
     HemisPreviewResponse,
     HemisSyncResponse,
+    HemisBulkSyncRequest,
+    HemisSyncJobResponse,
 )
+from .bulk_sync import hemis_bulk_sync_service
 from .service import hemis_service
 
 logger = logging.getLogger(__name__)
@@ -59,12 +63,45 @@ async def preview_hemis_data(
     response_model=HemisSyncResponse,
     dependencies=[Depends(PermissionRequired("hemis_admin_sync"))],
 )
+@idempotent()
 async def sync_hemis_data(
     data: HemisLoginRequest,
     session: AsyncSession = Depends(db_helper.session_getter),
 ):
     return await hemis_service.sync_hemis_data(session=session, data=data)
 
+
+@router.post(
+    "/sync/bulk",
+    response_model=HemisSyncJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(PermissionRequired("hemis_admin_sync"))],
+)
+@idempotent()
+async def bulk_sync_hemis_data(data: HemisBulkSyncRequest):
+    return await hemis_bulk_sync_service.start_job(data.items)
+
+
+@router.post(
+    "/sync/bulk/upload",
+    response_model=HemisSyncJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(PermissionRequired("hemis_admin_sync"))],
+)
+@idempotent()
+async def bulk_sync_hemis_roster(file: UploadFile = File(...)):
+    items = await hemis_bulk_sync_service.parse_roster(file)
+    return await hemis_bulk_sync_service.start_job(items)
+
+
+@router.get(
+    "/sync/jobs/{job_id}",
+    response_model=HemisSyncJobResponse,
+    dependencies=[Depends(PermissionRequired("hemis_admin_sync"))],
+)
+async def get_sync_job(job_id: str):
+    return await hemis_bulk_sync_service.get_job(job_id)
+
 # ------------------------------------------------------------------ #
 #  TRANSACTIONS — Admin
 # ------------------------------------------------------------------ #
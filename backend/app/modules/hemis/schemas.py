@@ -51,4 +51,24 @@ class HemisPreviewResponse(BaseModel):
 class HemisSyncResponse(BaseModel):
     success: bool
     message: str
-    user_id: Optional[int] = None
\ No newline at end of file
+    user_id: Optional[int] = None
+
+class HemisBulkSyncRequest(BaseModel):
+    items: list[HemisLoginRequest]
+
+
+class HemisSyncJobError(BaseModel):
+    login: str
+    detail: str
+
+
+class HemisSyncJobResponse(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    processed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    errors: list[HemisSyncJobError] = []
+    created_at: datetime
+    finished_at: Optional[datetime] = None
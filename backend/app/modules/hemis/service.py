@@ -1,23 +1,27 @@
+import hashlib
+import json
 import logging
 import re
-import httpx
 from datetime import datetime, date
 
-from sqlalchemy import select, or_, func, desc
+from sqlalchemy import select, func, desc
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, Request, status
 
-from core.config import settings
-from core.utils.password_hash import hash_password, verify_password
+from core.utils.password_hash import hash_password_async, verify_and_update_password
 from app.models.user.model import User
 from app.models.student.model import Student
 from app.models.group.model import Group
 from app.models.faculty.model import Faculty
 from app.models.role.model import Role
 from app.models.hemis_transaction.model import HemisTransaction
+from modules.group.name_index import group_name_index
 from modules.user.service import auth_service
+from .audit import hemis_audit_sink
+from .cache import hemis_profile_cache
+from .client import HemisCredentialsRejected, hemis_client
 from .schemas import (
     HemisLoginRequest,
     HemisLoginResponse,
@@ -53,8 +57,18 @@ class HemisLoginService:
         user = result.scalar_one_or_none()
 
         if user and user.password:
-            if verify_password(data.password, user.password):
-                access_token = auth_service.create_access_token({"user_id": user.id})
+            is_valid, new_hash = await verify_and_update_password(
+                data.password, user.password
+            )
+            if is_valid:
+                if new_hash:
+                    # Stored hash uses outdated cost parameters - upgrade it
+                    user.password = new_hash
+                    await session.commit()
+
+                access_token = auth_service.create_access_token(
+                    await auth_service.build_access_claims(session, user.id)
+                )
                 refresh_token = auth_service.create_refresh_token({"user_id": user.id})
 
                 # Log success (local)
@@ -107,52 +121,33 @@ class HemisLoginService:
     # ------------------------------------------------------------------ #
     #  HEMIS API REQUEST
     # ------------------------------------------------------------------ #
-    async def _fetch_hemis_data(self, login: str, password: str) -> dict:
-        try:
-            async with httpx.AsyncClient() as client:
-                # Login
-                login_resp = await client.post(
-                    settings.hemis.login_url,
-                    json={"login": login, "password": password},
-                    headers={"Accept": "application/json"},
-                )
-
-                if login_resp.status_code != 200:
-                    raise HTTPException(
-                        status_code=400, detail="Hemis login failed"
-                    )
-
-                login_data = login_resp.json()
-                if not login_data.get("success"):
-                    raise HTTPException(
-                        status_code=400, detail="Hemis login returned unsuccessful"
-                    )
+    async def fetch_hemis_data(
+        self, login: str, password: str, use_cache: bool = True
+    ) -> dict:
+        """
+        The student's HEMIS `me` payload; 400 if HEMIS rejects the credentials.
+
+        The password is always checked by HEMIS; only the profile fetch after
+        it is served from the cache. Syncs, which write the profile, pass
+        use_cache=False to skip both caches and get the current one.
+        """
+        if use_cache and await hemis_profile_cache.is_rejected(login, password):
+            raise HTTPException(status_code=400, detail="Hemis login failed")
 
-                token = login_data["data"]["token"]
+        try:
+            token = await hemis_client.authenticate(login, password)
+        except HemisCredentialsRejected:
+            await hemis_profile_cache.set_rejected(login, password)
+            raise
 
-                # Me Endpoint
-                me_resp = await client.get(
-                    settings.hemis.me_url,
-                    headers={"Authorization": f"Bearer {token}"},
-                )
+        if use_cache:
+            cached = await hemis_profile_cache.get(login)
+            if cached is not None:
+                return cached
 
-                if me_resp.status_code != 200:
-                    raise HTTPException(
-                        status_code=400, detail="Hemis ME endpoint failed"
-                    )
-
-                me_result = me_resp.json()
-                if not me_result.get("success"):
-                    raise HTTPException(
-                        status_code=400, detail="Hemis ME returned unsuccessful"
-                    )
-
-                return me_result["data"]
-        except httpx.RequestError as e:
-            raise HTTPException(
-                status_code=503,
-                detail=f"Hemis service unavailable: {str(e)}",
-            )
+        me_data = await hemis_client.fetch_profile(token)
+        await hemis_profile_cache.set(login, me_data)
+        return me_data
 
     async def request_to_hemis(
         self,
@@ -162,12 +157,16 @@ class HemisLoginService:
         ip_address: str | None = None,
         user_agent: str | None = None,
     ) -> HemisLoginResponse:
-        me_data = await self._fetch_hemis_data(data.login, data.password)
+        me_data = await self.fetch_hemis_data(data.login, data.password)
 
-        # Save Data
-        user = await self.save_user_data(session, data.login, data.password, me_data)
+        # Save Data (the local password was already checked and did not match)
+        user = await self.save_user_data(
+            session, data.login, data.password, me_data, verify_existing=False
+        )
 
-        access_token = auth_service.create_access_token({"user_id": user.id})
+        access_token = auth_service.create_access_token(
+            await auth_service.build_access_claims(session, user.id)
+        )
         refresh_token = auth_service.create_refresh_token({"user_id": user.id})
 
         # Log success (hemis_api)
@@ -191,7 +190,8 @@ class HemisLoginService:
     #  ADMIN PREVIEW & SYNC
     # ------------------------------------------------------------------ #
     async def preview_hemis_data(self, session: AsyncSession, data: HemisLoginRequest) -> dict:
-        me_data = await self._fetch_hemis_data(data.login, data.password)
+        # Writes nothing, so a cached profile is good enough
+        me_data = await self.fetch_hemis_data(data.login, data.password)
 
         # 1. Check if User exists & Fetch existing results
         stmt_user = select(User).where(User.username == data.login)
@@ -230,18 +230,9 @@ class HemisLoginService:
         group_info = me_data.get("group")
         group_name = self._extract_name(group_info) or "Unknown"
         
-        clean_name = group_name.lower().strip()
-        normalized = re.sub(r"(\d)([a-z])", r"\1 \2", clean_name)
-        normalized = re.sub(r"(\d+)([a-z]{2})$", r"\1 \2", normalized)
-
-        stmt_group = select(Group.id).where(
-            or_(
-                Group.name == normalized,
-                Group.name == clean_name,
-                Group.name.ilike(f"%{clean_name.replace(' ', '')}%"),
-            )
-        )
-        group_id = (await session.execute(stmt_group)).scalars().first()
+        group = await group_name_index.resolve(session, group_name)
+        group_id = group.id if group else None
+        normalized = self._normalize_group_name(group_name)
 
         return {
             "hemis_data": me_data,
@@ -256,7 +247,7 @@ class HemisLoginService:
         }
 
     async def sync_hemis_data(self, session: AsyncSession, data: HemisLoginRequest) -> dict:
-        me_data = await self._fetch_hemis_data(data.login, data.password)
+        me_data = await self.fetch_hemis_data(data.login, data.password, use_cache=False)
         user = await self.save_user_data(
             session=session,
             username=data.login,
@@ -290,6 +281,19 @@ class HemisLoginService:
         result = await session.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def _resolve_password_hash(
+        self, user: User | None, password: str, verify_existing: bool
+    ) -> str:
+        """
+        Keeps the stored hash when it already matches the password (upgrading
+        it only if its cost parameters are outdated); hashes otherwise.
+        """
+        if verify_existing and user and user.password:
+            is_valid, new_hash = await verify_and_update_password(password, user.password)
+            if is_valid:
+                return new_hash or user.password
+        return await hash_password_async(password)
+
     async def _log_transaction(
         self,
         session: AsyncSession,
@@ -302,20 +306,25 @@ class HemisLoginService:
         ip_address: str | None = None,
         user_agent: str | None = None,
         error_message: str | None = None,
-    ) -> HemisTransaction:
-        transaction = HemisTransaction(
-            user_id=user_id,
-            student_id=student_id,
-            login=login,
-            login_type=login_type,
-            status=status,
-            ip_address=ip_address,
-            user_agent=user_agent[:500] if user_agent else None,
-            error_message=error_message,
-        )
-        session.add(transaction)
+    ) -> None:
+        row = {
+            "user_id": user_id,
+            "student_id": student_id,
+            "login": login,
+            "login_type": login_type,
+            "status": status,
+            "ip_address": ip_address,
+            "user_agent": user_agent[:500] if user_agent else None,
+            "error_message": error_message,
+        }
+        if hemis_audit_sink.is_running:
+            # Written in the background in batches
+            hemis_audit_sink.record(row)
+            return
+
+        # Sink not started (outside the app lifespan) - write inline
+        session.add(HemisTransaction(**row))
         await session.commit()
-        return transaction
 
     # ------------------------------------------------------------------ #
     #  SAVE USER DATA
@@ -328,14 +337,55 @@ class HemisLoginService:
         me_data: dict,
         faculty_id: int | None = None,
         group_id: int | None = None,
+        verify_existing: bool = True,
+        commit: bool = True,
     ) -> User:
+        """
+        Creates/updates the user and student profile from HEMIS `me` data.
+        With verify_existing=False the caller already knows the stored
+        password does not match, so it is rehashed without verifying first.
+        With commit=False changes are only flushed (bulk sync commits per batch).
+
+        A fingerprint of the last synced profile is kept on the student: an
+        identical payload writes nothing, a changed one updates only the
+        columns that differ, in a single commit.
+        """
+        profile = self._build_profile(me_data)
+        faculty_name = self._extract_name(me_data.get("faculty")) or "Unknown"
+        group_name = self._extract_name(me_data.get("group")) or "Unknown"
+        fingerprint = self._profile_fingerprint(
+            profile, faculty_name, group_name, faculty_id, group_id
+        )
+
+        # Load User with roles and student profile
+        stmt = (
+            select(User)
+            .where(User.username == username)
+            .options(selectinload(User.roles), selectinload(User.student))
+        )
+        result = await session.execute(stmt)
+        user = result.scalar_one_or_none()
+        student = user.student if user else None
+
+        hashed_pw = await self._resolve_password_hash(user, password, verify_existing)
+        has_student_role = bool(user) and any(r.name == "Student" for r in user.roles)
+
+        # Nothing changed since the last sync - skip all writes
+        if (
+            student is not None
+            and student.hemis_fingerprint == fingerprint
+            and user.password == hashed_pw
+            and has_student_role
+        ):
+            logger.debug(f"Hemis profile of {username} unchanged, skipping sync")
+            return user
+
         # Load or Identify Faculty
         if faculty_id:
             faculty = await session.get(Faculty, faculty_id)
             if not faculty:
                 raise HTTPException(status_code=404, detail=f"Fakultet (id={faculty_id}) topilmadi")
         else:
-            faculty_name = self._extract_name(me_data.get("faculty")) or "Unknown"
             faculty = await self.get_or_create_faculty(session, faculty_name)
 
         # Load or Identify Group
@@ -344,51 +394,56 @@ class HemisLoginService:
             if not group:
                 raise HTTPException(status_code=404, detail=f"Guruh (id={group_id}) topilmadi")
         else:
-            group_name = self._extract_name(me_data.get("group")) or "Unknown"
             group = await self.get_or_create_group(session, group_name, faculty.id)
 
-        # Save User (or Update)
-        stmt = (
-            select(User)
-            .where(User.username == username)
-            .options(selectinload(User.roles))
-        )
-        result = await session.execute(stmt)
-        user = result.scalar_one_or_none()
-
-        hashed_pw = hash_password(password)
-
-        student_role_stmt = select(Role).where(Role.name == "Student")
-        role_res = await session.execute(student_role_stmt)
-        student_role = role_res.scalar_one_or_none()
+        student_role = None
+        if not has_student_role:
+            student_role_stmt = select(Role).where(Role.name == "Student")
+            role_res = await session.execute(student_role_stmt)
+            student_role = role_res.scalar_one_or_none()
 
-        if not student_role:
-            # Create role if it doesn't exist (safety fallback)
-            student_role = Role(name="Student")
-            session.add(student_role)
-            await session.flush()  # flush to get ID
+            if not student_role:
+                # Create role if it doesn't exist (safety fallback)
+                student_role = Role(name="Student")
+                session.add(student_role)
 
+        # Save User (or Update)
         if not user:
             user = User(username=username, password=hashed_pw)
-            if student_role:
-                user.roles.append(student_role)
+            user.roles.append(student_role)
             session.add(user)
             logger.info(f"Created new user {username} from Hemis data")
         else:
-            user.password = hashed_pw  # Update password
-            logger.info(f"Updated password for user {username} from Hemis login")
+            if user.password != hashed_pw:
+                user.password = hashed_pw  # Update password
+                logger.info(f"Updated password for user {username} from Hemis login")
             # Update role
-            if student_role and student_role not in user.roles:
+            if student_role:
                 user.roles.append(student_role)
 
-        await session.flush()
-        await session.refresh(user)
+        # Save Student Profile (only the columns that changed)
+        values = {
+            **profile,
+            "group_id": group.id,
+            "faculty": faculty.name,  # Save string name
+            "hemis_fingerprint": fingerprint,
+        }
+        if not student:
+            student = Student(user=user, avg_gpa=0.0, **values)
+            session.add(student)
+        else:
+            for column, value in values.items():
+                if getattr(student, column) != value:
+                    setattr(student, column, value)
 
-        # Save Student Profile
-        stmt_student = select(Student).where(Student.user_id == user.id)
-        current_student_res = await session.execute(stmt_student)
-        student = current_student_res.scalar_one_or_none()
+        if commit:
+            await session.commit()
+        else:
+            await session.flush()
+        return user
 
+    def _build_profile(self, me_data: dict) -> dict:
+        """Maps HEMIS `me` data to Student column values."""
         birth_timestamp = me_data.get("birth_date", 0)
         # Handle timestamp conversion safely
         try:
@@ -400,76 +455,46 @@ class HemisLoginService:
         except (OSError, OverflowError, ValueError):
             birth_date = date(1970, 1, 1)
 
-        # Extract complex fields
-        gender_val = self._extract_name(me_data.get("gender"))
-        student_status_val = self._extract_name(me_data.get("studentStatus"))
-        education_form_val = self._extract_name(me_data.get("educationForm"))
-        education_type_val = self._extract_name(me_data.get("educationType"))
-        payment_form_val = self._extract_name(me_data.get("paymentForm"))
-        education_lang_val = self._extract_name(me_data.get("educationLang"))
-        level_val = self._extract_name(me_data.get("level"))
-        semester_val = self._extract_name(me_data.get("semester"))
-        specialty_val = self._extract_name(me_data.get("specialty"))
-
         # Extract name parts
         full_name = me_data.get("full_name", "")
         name_parts = full_name.split()
-        last_name = name_parts[0] if len(name_parts) > 0 else ""
-        first_name = name_parts[1] if len(name_parts) > 1 else ""
-        third_name = " ".join(name_parts[2:]) if len(name_parts) > 2 else ""
 
-        if not student:
-            student = Student(
-                user_id=user.id,
-                full_name=full_name,
-                first_name=first_name,
-                last_name=last_name,
-                third_name=third_name,
-                student_id_number=me_data.get("student_id_number", ""),
-                image_path=me_data.get("image", ""),
-                birth_date=birth_date,
-                phone=me_data.get("phone", ""),
-                gender=gender_val,
-                university=me_data.get("university", ""),
-                specialty=specialty_val,
-                student_status=student_status_val,
-                education_form=education_form_val,
-                education_type=education_type_val,
-                payment_form=payment_form_val,
-                education_lang=education_lang_val,
-                faculty=faculty.name,  # Save string name
-                level=level_val,
-                semester=semester_val,
-                address=me_data.get("address", ""),
-                avg_gpa=0.0,
-            )
-            student.group_id = group.id
-            session.add(student)
-        else:
-            # Update existing student
-            student.full_name = full_name
-            student.first_name = first_name
-            student.last_name = last_name
-            student.third_name = third_name
-            student.student_id_number = me_data.get("student_id_number", "")
-            student.image_path = me_data.get("image", "")
-            student.birth_date = birth_date
-            student.group_id = group.id
-            student.faculty = faculty.name
-            student.student_status = student_status_val
-            student.address = me_data.get("address", "")
-            student.gender = gender_val
-            student.specialty = specialty_val
-            student.education_form = education_form_val
-            student.education_type = education_type_val
-            student.payment_form = payment_form_val
-            student.education_lang = education_lang_val
-            student.level = level_val
-            student.semester = semester_val
+        return {
+            "full_name": full_name,
+            "last_name": name_parts[0] if len(name_parts) > 0 else "",
+            "first_name": name_parts[1] if len(name_parts) > 1 else "",
+            "third_name": " ".join(name_parts[2:]) if len(name_parts) > 2 else "",
+            "student_id_number": me_data.get("student_id_number", ""),
+            "image_path": me_data.get("image", ""),
+            "birth_date": birth_date,
+            "phone": me_data.get("phone", ""),
+            "gender": self._extract_name(me_data.get("gender")),
+            "university": me_data.get("university", ""),
+            "specialty": self._extract_name(me_data.get("specialty")),
+            "student_status": self._extract_name(me_data.get("studentStatus")),
+            "education_form": self._extract_name(me_data.get("educationForm")),
+            "education_type": self._extract_name(me_data.get("educationType")),
+            "payment_form": self._extract_name(me_data.get("paymentForm")),
+            "education_lang": self._extract_name(me_data.get("educationLang")),
+            "level": self._extract_name(me_data.get("level")),
+            "semester": self._extract_name(me_data.get("semester")),
+            "address": me_data.get("address", ""),
+        }
 
-        await session.commit()
-        await session.refresh(user)
-        return user
+    def _profile_fingerprint(
+        self,
+        profile: dict,
+        faculty_name: str,
+        group_name: str,
+        faculty_id: int | None,
+        group_id: int | None,
+    ) -> str:
+        payload = json.dumps(
+            [profile, faculty_name, group_name, faculty_id, group_id],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
 
     # ------------------------------------------------------------------ #
     #  GET / CREATE helpers
@@ -490,41 +515,38 @@ class HemisLoginService:
     async def get_or_create_group(
         self, session: AsyncSession, name: str, faculty_id: int
     ) -> Group:
-        # 1. Normalization (7A-23KT -> 7 a-23 kt)
-        clean_name = name.lower().strip()
-        # Use regex to bring to standard format
-        normalized = re.sub(r"(\d)([a-z])", r"\1 \2", clean_name)
-        normalized = re.sub(r"(\d+)([a-z]{2})$", r"\1 \2", normalized)
-
-        # 2. Complex Search (ILIKE and variants)
-        stmt = select(Group).where(
-            or_(
-                Group.name == normalized,
-                Group.name == clean_name,
-                Group.name.ilike(f"%{clean_name.replace(' ', '')}%"),
+        # 1. Lookup by normalized key (7A-23KT / 7 a-23 kt -> 7a-23kt)
+        obj = await group_name_index.resolve(session, name)
+        if obj:
+            return obj
+
+        # 2. If not found, create in the most correct (normalized) format.
+        # ON CONFLICT: a parallel request may have created it meanwhile
+        normalized = self._normalize_group_name(name)
+        stmt = (
+            pg_insert(Group)
+            .values(
+                name=normalized,
+                name_key=Group.make_name_key(normalized),
+                faculty_id=faculty_id,
             )
+            .on_conflict_do_nothing()
+            .returning(Group.id)
         )
-
-        result = await session.execute(stmt)
-        obj = result.scalar_one_or_none()
-
-        if not obj:
-            # 3. If not found, create in the most correct (normalized) format
-            try:
-                obj = Group(name=normalized, faculty_id=faculty_id)
-                session.add(obj)
-                await session.flush()
-                await session.refresh(obj)
-            except IntegrityError:
-                # If already created in a parallel request, search again
-                await session.rollback()
-                result = await session.execute(
-                    select(Group).where(Group.name == normalized)
-                )
-                obj = result.scalar_one()
-
+        created_id = (await session.execute(stmt)).scalar_one_or_none()
+        if created_id is None:
+            obj = await group_name_index.resolve(session, name)
+        else:
+            obj = await session.get(Group, created_id)
+            group_name_index.add(obj)
         return obj
 
+    def _normalize_group_name(self, name: str) -> str:
+        """Display format for new groups (7A-23KT -> 7 a-23 kt)."""
+        clean_name = name.lower().strip()
+        normalized = re.sub(r"(\d)([a-z])", r"\1 \2", clean_name)
+        return re.sub(r"(\d+)([a-z]{2})$", r"\1 \2", normalized)
+
     # ------------------------------------------------------------------ #
     #  TRANSACTION QUERIES
     # ------------------------------------------------------------------ #
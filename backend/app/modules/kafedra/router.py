@@ -5,7 +5,8 @@ from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.cache import cached
 
 from .repository import get_kafedra_repository
 from .schemas import (
@@ -41,7 +42,7 @@ async def create_kafedra(
 
 
 @router.get("/{kafedra_id}", response_model=KafedraCreateResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(expire=300, namespace="kafedras", tags=("kafedras:{kafedra_id}",), local=True)
 async def get_kafedra(
     kafedra_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -53,7 +54,7 @@ async def get_kafedra(
 
 
 @router.get("/", response_model=KafedraListResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(expire=300, namespace="kafedras", tags=("kafedras",), local=True)
 async def list_kafedras(
     data: KafedraListRequest = Depends(),
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -5,7 +5,8 @@ from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.cache import cached
 
 from .repository import get_permission_repository
 from .schemas import (
@@ -41,7 +42,7 @@ async def create_permission(
 
 
 @router.get("/{permission_id}", response_model=PermissionCreateResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(expire=300, namespace="permissions", tags=("permissions:{permission_id}",), local=True)
 async def get_permission(
     permission_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -53,7 +54,7 @@ async def get_permission(
 
 
 @router.get("/", response_model=PermissionListResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(expire=300, namespace="permissions", tags=("permissions",), local=True)
 async def list_permissions(
     data: PermissionListRequest = Depends(),
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -6,7 +6,9 @@ from fastapi import APIRouter, Depends, status, UploadFile, File, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.idempotency import idempotent
+from core.cache import cached
 
 from .repository import get_question_repository
 from .schemas import (
@@ -73,7 +75,7 @@ async def create_question(
 
 
 @router.get("/{question_id}", response_model=QuestionCreateResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(expire=60, tags=("questions:{question_id}", "subjects", "users", "user_roles"))
 async def get_question(
     question_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -146,6 +148,7 @@ async def upload_image(
 
 
 @router.post("/upload_excel", status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimiter(times=5, seconds=60))])
+@idempotent()
 async def upload_questions_excel(
     subject_id: int,
     file: UploadFile = File(...),
@@ -10,7 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user.model import User
 from app.models.teacher.model import Teacher
 from app.models.subject_teacher.model import SubjectTeacher
-from app.models.student.model import Student
+from dependence.role_checker import get_student_group_id
 
 from .schemas import (
     QuizCreateRequest,
@@ -111,9 +111,7 @@ class QuizRepository:
 
         # Students always see quizzes for their group — even if they also have a Teacher role
         if is_student:
-            student_stmt = select(Student.group_id).where(Student.user_id == current_user.id)
-            student_result = await session.execute(student_stmt)
-            student_group_id = student_result.scalar_one_or_none()
+            student_group_id = await get_student_group_id(session, current_user)
             if student_group_id:
                 stmt = stmt.where(Quiz.group_id == student_group_id)
             else:
@@ -5,7 +5,10 @@ from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.idempotency import idempotent
+from core.cache import cached, scoped_key_builder
+from dependence.cache_scope import quiz_visibility
 
 from .repository import get_quiz_repository
 from .schemas import (
@@ -31,6 +34,7 @@ router = APIRouter(
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(RateLimiter(times=5, seconds=60))]
 )
+@idempotent()
 async def create_quiz(
     data: QuizCreateRequest,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -54,7 +58,11 @@ async def get_quiz(
 
 
 @router.get("/", response_model=QuizListResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(
+    expire=60,
+    tags=("quizzes",),
+    key_builder=scoped_key_builder(quiz_visibility),
+)
 async def list_quizzes(
     data: QuizListRequest = Depends(),
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -0,0 +1,152 @@
+import json
+import logging
+
+from fastapi import HTTPException, status
+
+from core.cache import get_redis
+from core.config import settings
+
+from .attempt_token import AttemptToken
+from .schemas import AnswerDTO
+
+logger = logging.getLogger(__name__)
+
+
+def attempt_answers_key(attempt_id: str) -> str:
+    return f"{settings.redis.prefix}:attempt:{attempt_id}:answers"
+
+
+def attempt_submitted_key(attempt_id: str) -> str:
+    return f"{settings.redis.prefix}:attempt:{attempt_id}:submitted"
+
+
+# Buffers the answers (ARGV[2..] as field/value pairs) unless the attempt was
+# submitted; returns the buffered count, or -1 if submitted
+_SAVE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return -1
+end
+if #ARGV > 1 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+end
+redis.call('EXPIREAT', KEYS[1], ARGV[1])
+return redis.call('HLEN', KEYS[1])
+"""
+
+
+class AnswerBuffer:
+    """
+    Autosaved answers of running attempts: one Redis hash per attempt
+    (question id -> [answer, option_index]), expiring with the attempt token.
+    end_quiz finalizes from it, so nothing reaches PostgreSQL before then.
+
+    end_quiz marks the attempt submitted before reading the buffer; later
+    saves are refused, so no answer lands after the grade was computed. A
+    submission that is not stored reopens the attempt.
+    """
+
+    def __init__(self) -> None:
+        self._script = None
+        self._script_redis = None
+
+    def _get_script(self, redis):
+        # Script objects are bound to a client (re-initialised in tests)
+        if self._script_redis is not redis:
+            self._script = redis.register_script(_SAVE_SCRIPT)
+            self._script_redis = redis
+        return self._script
+
+    async def save(self, attempt: AttemptToken, answers: list[AnswerDTO]) -> int:
+        """Stores the answers (latest wins) and returns how many are buffered."""
+        issued = set(attempt.question_ids)
+        for ans in answers:
+            if ans.question_id not in issued:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid question_id: {ans.question_id}",
+                )
+
+        redis = get_redis()
+        if redis is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Autosave is not available",
+            )
+
+        fields = []
+        for ans in answers:
+            fields += [ans.question_id, json.dumps([ans.answer, ans.option_index])]
+        try:
+            saved = await self._get_script(redis)(
+                keys=[
+                    attempt_answers_key(attempt.attempt_id),
+                    attempt_submitted_key(attempt.attempt_id),
+                ],
+                args=[attempt.expires_at, *fields],
+            )
+        except Exception as e:
+            logger.warning(f"Could not autosave answers: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Autosave is not available",
+            )
+        if saved < 0:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail="Attempt already submitted"
+            )
+        return saved
+
+    async def mark_submitted(self, attempt: AttemptToken) -> None:
+        """Refuses further saves for the attempt, until its token expires."""
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(
+                attempt_submitted_key(attempt.attempt_id), 1, exat=attempt.expires_at
+            )
+        except Exception as e:
+            logger.warning(f"Could not mark attempt as submitted: {e}")
+
+    async def reopen(self, attempt: AttemptToken) -> None:
+        """Accepts saves for the attempt again, after a failed submission."""
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(attempt_submitted_key(attempt.attempt_id))
+        except Exception as e:
+            logger.warning(f"Could not reopen attempt: {e}")
+
+    async def load(self, attempt: AttemptToken) -> list[AnswerDTO]:
+        redis = get_redis()
+        if redis is None:
+            return []
+        try:
+            raw = await redis.hgetall(attempt_answers_key(attempt.attempt_id))
+        except Exception as e:
+            logger.warning(f"Could not read autosaved answers: {e}")
+            return []
+        answers = []
+        for question_id, value in raw.items():
+            answer, option_index = json.loads(value)
+            answers.append(
+                AnswerDTO(
+                    question_id=int(question_id),
+                    answer=answer,
+                    option_index=option_index,
+                )
+            )
+        return answers
+
+    async def clear(self, attempt: AttemptToken) -> None:
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(attempt_answers_key(attempt.attempt_id))
+        except Exception as e:
+            logger.warning(f"Could not clear autosaved answers: {e}")
+
+
+answer_buffer = AnswerBuffer()
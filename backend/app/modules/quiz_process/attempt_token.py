@@ -0,0 +1,103 @@
+import base64
+import hashlib
+import hmac
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+
+from fastapi import HTTPException, status
+
+from core.config import settings
+
+_TOKEN_PURPOSE = b"quiz_attempt"
+
+
+@dataclass(frozen=True)
+class AttemptToken:
+    attempt_id: str
+    quiz_id: int
+    user_id: int
+    question_ids: tuple[int, ...]
+    seed: int
+    expires_at: int
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(body: str) -> str:
+    key = hmac.new(
+        settings.jwt.access_token_secret.encode(), _TOKEN_PURPOSE, hashlib.sha256
+    ).digest()
+    return _b64encode(hmac.new(key, body.encode(), hashlib.sha256).digest())
+
+
+def option_order(seed: int, question_id: int) -> list[int]:
+    """
+    Order in which the question's options (0 = option_a ... 3 = option_d) were
+    served in this attempt; recomputable from the seed, so it is not stored.
+    """
+    return random.Random(f"{seed}:{question_id}").sample(range(4), 4)
+
+
+def issue_attempt_token(
+    quiz_id: int, user_id: int, question_ids: list[int], seed: int, duration_minutes: int
+) -> str:
+    expires_at = int(time.time()) + (duration_minutes + settings.quiz.attempt_grace_minutes) * 60
+    body = _b64encode(
+        json.dumps(
+            {
+                "aid": uuid.uuid4().hex,
+                "qid": quiz_id,
+                "uid": user_id,
+                "q": question_ids,
+                "s": seed,
+                "exp": expires_at,
+            },
+            separators=(",", ":"),
+        ).encode()
+    )
+    return f"{body}.{_sign(body)}"
+
+
+def verify_attempt_token(token: str, quiz_id: int, user_id: int) -> AttemptToken:
+    try:
+        body, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(body)):
+            raise ValueError("bad signature")
+        payload = json.loads(_b64decode(body))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid attempt token"
+        )
+
+    if payload["exp"] < time.time():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Attempt token expired"
+        )
+    if payload["qid"] != quiz_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Attempt token does not belong to this quiz",
+        )
+    if payload["uid"] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Attempt token does not belong to this user",
+        )
+
+    return AttemptToken(
+        attempt_id=payload["aid"],
+        quiz_id=payload["qid"],
+        user_id=payload["uid"],
+        question_ids=tuple(payload["q"]),
+        seed=payload["s"],
+        expires_at=payload["exp"],
+    )
@@ -0,0 +1,255 @@
+from typing import NamedTuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import mark_cache_tags, row_tag
+
+from .attempt_token import AttemptToken, option_order
+from .schemas import AnswerDTO
+
+
+class GradedAnswer(NamedTuple):
+    question_id: int
+    answer: str | None
+    correct_answer: str
+    is_correct: bool
+
+
+def calculate_grade(correct_count: int, total_questions: int) -> int:
+    # Calculate percentage (0-100)
+    percentage = 0
+    if total_questions > 0:
+        percentage = (correct_count / total_questions) * 100
+
+    # Determine grade based on percentage
+    if percentage >= 86:
+        return 5
+    elif percentage >= 72:
+        return 4
+    elif percentage >= 56:
+        return 3
+    return 2
+
+
+def check_unique_questions(answers: list[AnswerDTO]) -> None:
+    """Each question may be answered once per submission."""
+    seen = set()
+    for ans in answers:
+        if ans.question_id in seen:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Duplicate question_id: {ans.question_id}",
+            )
+        seen.add(ans.question_id)
+
+
+def grade_attempt(
+    attempt: AttemptToken,
+    answers: list[AnswerDTO],
+    answer_key: dict[int, tuple[str, str, str, str]],
+) -> list[GradedAnswer]:
+    """
+    Grades answers against the answer key (question id -> options, option_a
+    correct). `option_index` refers to the order the options were served
+    in, which is recomputed from the attempt seed.
+    """
+    check_unique_questions(answers)
+    issued = set(attempt.question_ids)
+    graded = []
+    for ans in answers:
+        if ans.question_id not in issued or ans.question_id not in answer_key:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid question_id: {ans.question_id}",
+            )
+        options = answer_key[ans.question_id]
+
+        if ans.option_index is not None:
+            original = option_order(attempt.seed, ans.question_id)[ans.option_index]
+            answer = options[original]
+            is_correct = original == 0
+        else:
+            answer = ans.answer
+            is_correct = answer == options[0]
+
+        graded.append(
+            GradedAnswer(
+                question_id=ans.question_id,
+                answer=answer,
+                correct_answer=options[0],
+                is_correct=is_correct,
+            )
+        )
+    return graded
+
+
+class SavedAttempt(NamedTuple):
+    attempt_id: int
+    result_id: int
+    correct_answers: int
+    wrong_answers: int
+    grade: int
+
+
+# Grades the submitted (question_id, answer) arrays against `questions`
+# (option_a is correct), unless the correct_answers/is_correct arrays carry
+# the grades already, and writes the quiz attempt, its user_answers rows
+# and its result in the same statement. Nothing is inserted unless the quiz exists, every
+# question id matched and the submission id is new; the last three columns
+# tell which check failed.
+# The grade thresholds mirror calculate_grade.
+_GRADE_AND_SAVE = text(
+    """
+    WITH params AS (
+        SELECT CAST(:user_id AS integer) AS user_id,
+               CAST(:quiz_id AS integer) AS quiz_id,
+               CAST(:total_questions AS integer) AS total,
+               CAST(:submission_id AS varchar) AS submission_id,
+               CAST(:question_ids AS integer[]) AS question_ids,
+               CAST(:answers AS varchar[]) AS answers,
+               CAST(:correct_answers AS varchar[]) AS correct_answers,
+               CAST(:is_correct AS boolean[]) AS is_correct
+    ),
+    submitted AS (
+        SELECT s.question_id, s.answer, s.correct_answer, s.is_correct, s.ord
+        FROM params, unnest(params.question_ids, params.answers,
+                            params.correct_answers, params.is_correct)
+             WITH ORDINALITY AS s(question_id, answer, correct_answer, is_correct, ord)
+    ),
+    quiz AS (
+        SELECT quizzes.id, quizzes.subject_id, quizzes.group_id
+        FROM quizzes, params
+        WHERE quizzes.id = params.quiz_id
+    ),
+    graded AS (
+        SELECT s.ord, s.question_id, s.answer,
+               COALESCE(s.correct_answer, q.option_a) AS correct_answer,
+               COALESCE(s.is_correct, s.answer = q.option_a, false) AS is_correct
+        FROM submitted s
+        JOIN questions q ON q.id = s.question_id
+    ),
+    totals AS (
+        SELECT count(*) AS matched, count(*) FILTER (WHERE is_correct) AS correct
+        FROM graded
+    ),
+    valid AS (
+        SELECT params.user_id, params.total, params.submission_id,
+               quiz.id, quiz.subject_id, quiz.group_id, totals.correct
+        FROM params, quiz, totals
+        WHERE totals.matched = cardinality(params.question_ids)
+          AND NOT EXISTS (
+              SELECT 1 FROM quiz_attempts WHERE quiz_attempts.submission_id = params.submission_id
+          )
+    ),
+    saved_attempt AS (
+        INSERT INTO quiz_attempts (user_id, quiz_id, submission_id)
+        SELECT valid.user_id, valid.id, valid.submission_id
+        FROM valid
+        RETURNING id
+    ),
+    saved_answers AS (
+        INSERT INTO user_answers (user_id, quiz_id, question_id, answer, correct_answer, is_correct,
+                                  attempt_id)
+        SELECT valid.user_id, valid.id, g.question_id, g.answer, g.correct_answer, g.is_correct,
+               saved_attempt.id
+        FROM graded g, valid, saved_attempt
+        ORDER BY g.ord
+    ),
+    saved_result AS (
+        INSERT INTO results (user_id, quiz_id, subject_id, group_id, correct_answers, wrong_answers, grade,
+                             attempt_id)
+        SELECT valid.user_id, valid.id, valid.subject_id, valid.group_id,
+               valid.correct, valid.total - valid.correct,
+               CASE
+                   WHEN valid.total = 0 THEN 2
+                   WHEN valid.correct * 100 >= 86 * valid.total THEN 5
+                   WHEN valid.correct * 100 >= 72 * valid.total THEN 4
+                   WHEN valid.correct * 100 >= 56 * valid.total THEN 3
+                   ELSE 2
+               END,
+               saved_attempt.id
+        FROM valid, saved_attempt
+        RETURNING id, attempt_id, correct_answers, wrong_answers, grade
+    )
+    SELECT r.id, r.attempt_id, r.correct_answers, r.wrong_answers, r.grade,
+           EXISTS (SELECT 1 FROM quiz) AS quiz_found,
+           EXISTS (
+               SELECT 1 FROM quiz_attempts, params
+               WHERE quiz_attempts.submission_id = params.submission_id
+           ) AS already_submitted,
+           (SELECT s.question_id
+            FROM submitted s
+            LEFT JOIN questions q ON q.id = s.question_id
+            WHERE q.id IS NULL
+            ORDER BY s.ord
+            LIMIT 1) AS invalid_question_id
+    FROM (SELECT 1) AS one
+    LEFT JOIN saved_result r ON true
+    """
+)
+
+
+async def save_graded_attempt(
+    session: AsyncSession,
+    *,
+    user_id: int,
+    quiz_id: int,
+    answers: list[GradedAnswer] | list[tuple[int, str | None]],
+    total_questions: int,
+    submission_id: str | None = None,
+) -> SavedAttempt:
+    """
+    Grades and stores a submission in one round trip, without ORM objects.
+    Answers from grade_attempt are stored with their grade; (question_id,
+    answer) pairs are graded by their text. Does not commit.
+    """
+    graded = bool(answers) and isinstance(answers[0], GradedAnswer)
+    row = (
+        await session.execute(
+            _GRADE_AND_SAVE,
+            {
+                "user_id": user_id,
+                "quiz_id": quiz_id,
+                "question_ids": [ans[0] for ans in answers],
+                "answers": [ans[1] for ans in answers],
+                "correct_answers": (
+                    [ans.correct_answer for ans in answers] if graded else None
+                ),
+                "is_correct": [ans.is_correct for ans in answers] if graded else None,
+                "total_questions": total_questions,
+                "submission_id": submission_id,
+            },
+        )
+    ).one()
+
+    if not row.quiz_found:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found"
+        )
+    if row.already_submitted:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Attempt already submitted"
+        )
+    if row.invalid_question_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid question_id: {row.invalid_question_id}",
+        )
+    # Raw SQL is invisible to the ORM cache hooks
+    mark_cache_tags(
+        session,
+        "quiz_attempts",
+        "results",
+        "user_answers",
+        row_tag("quiz_attempts", row.attempt_id),
+        row_tag("results", row.id),
+    )
+    return SavedAttempt(
+        attempt_id=row.attempt_id,
+        result_id=row.id,
+        correct_answers=row.correct_answers,
+        wrong_answers=row.wrong_answers,
+        grade=row.grade,
+    )
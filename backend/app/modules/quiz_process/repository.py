@@ -1,19 +1,17 @@
 import logging
 import random
+import secrets
+from datetime import datetime, timezone
 
 from fastapi import HTTPException, status
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-
-from app.models.quiz.model import Quiz
-from app.models.question.model import Question
-from app.models.results.model import Result
-from app.models.quiz_questions.model import QuizQuestion
-from app.models.quiz_questions.model import QuizQuestion
-from app.models.user_answers.model import UserAnswers
+
 from app.models.student.model import Student
 from app.models.user.model import User
+from core.cache import get_redis
+from core.config import settings
 
 from .schemas import (
     StartQuizRequest,
@@ -21,7 +19,25 @@ from .schemas import (
     EndQuizRequest,
     EndQuizResponse,
     QuestionDTO,
+    SaveAnswerRequest,
+    SaveAnswerResponse,
+)
+from .answer_buffer import answer_buffer
+from .attempt_token import (
+    AttemptToken,
+    issue_attempt_token,
+    option_order,
+    verify_attempt_token,
+)
+from .grading import (
+    GradedAnswer,
+    calculate_grade,
+    check_unique_questions,
+    grade_attempt,
+    save_graded_attempt,
 )
+from .snapshot import QuizSnapshot, quiz_snapshot_cache
+from .submission_queue import submission_queue
 
 logger = logging.getLogger(__name__)
 
@@ -30,14 +46,8 @@ class QuizProcessRepository:
     async def start_quiz(
         self, session: AsyncSession, data: StartQuizRequest, user: User
     ) -> StartQuizResponse:
-        # Fetch quiz with questions
-        stmt = (
-            select(Quiz)
-            .options(selectinload(Quiz.quiz_questions).selectinload(QuizQuestion.question))
-            .where(Quiz.id == data.quiz_id)
-        )
-        result = await session.execute(stmt)
-        quiz = result.scalar_one_or_none()
+        # Compiled quiz (LRU -> Redis -> DB), no ORM load of the question pool
+        quiz = await quiz_snapshot_cache.get(session, data.quiz_id)
 
         if not quiz:
             raise HTTPException(
@@ -55,65 +65,43 @@ class QuizProcessRepository:
             )
 
         # Check if user is a student and restrict access based on group
-        stmt_student = select(Student).where(Student.user_id == user.id)
-        result_student = await session.execute(stmt_student)
-        student = result_student.scalar_one_or_none()
-
-        if student:
-            # If user is a student, they must have a group and it must match the quiz's group if the quiz has one
-            # Logic: 
-            # 1. If quiz has a group_id, student must belong to that group.
-            # 2. If quiz has NO group_id, looks like it's open to all? Or logic says "show only match group".
-            # The prompt says: "user need show only matcvh group if user id not in student model show all quiz"
-            # This implies:
-            # - If Student: Access ONLY if quiz.group_id == student.group_id
-            # - If Not Student: Access ALL (or at least no group restriction from this logic)
-            
-            # Additional clarification: "quiz have group id and user need show only matcvh group"
-            
-            if quiz.group_id is not None:
-                if student.group_id != quiz.group_id:
-                     raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN, 
-                        detail="This quiz is not available for your group"
-                    )
-            else:
-                 # Boolean: if quiz has no group, can student take it? 
-                 # Usually general quizzes are for everyone.
-                 # But if the requirement "show only match group" is strict, maybe they can't see general ones?
-                 # Assume general quizzes (group_id=None) are open to everyone.
-                 pass
+        # - If Student: Access ONLY if quiz.group_id == student.group_id
+        # - If Not Student: Access ALL (general quizzes with group_id=None are open to everyone)
+        if quiz.group_id is not None:
+            # Student profile resolved by PermissionRequired, if any
+            student = user.__dict__.get("student")
+            if student is None:
+                stmt_student = select(Student).where(Student.user_id == user.id)
+                result_student = await session.execute(stmt_student)
+                student = result_student.scalar_one_or_none()
+
+            if student and student.group_id != quiz.group_id:
+                 raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN, 
+                    detail="This quiz is not available for your group"
+                )
 
+        # Per-attempt seed: question and option order are derived from it
+        seed = secrets.randbits(63)
+
+        # Pick quiz.question_number random question ids (all of them, shuffled,
+        # if fewer) and fetch content for those only
+        num_questions = min(quiz.question_number, len(quiz.question_ids))
+        sampled_ids = random.Random(seed).sample(quiz.question_ids, num_questions)
+        content = await quiz_snapshot_cache.get_questions(session, quiz, sampled_ids)
 
         # Prepare questions with shuffled options
         question_dtos = []
-        # Accessing questions via quiz_questions association
-        # quiz.quiz_questions is a list of QuizQuestion objects
-        # each has a .question attribute
-        
-        # We might want to limit the number of questions if quiz.question_number is set
-        # But for now, let's take all or slice? 
-        # The user didn't specify random selection logic from pool, so let's assume all linked questions or slice.
-        # Let's shuffle the questions themselves too?
-        
-        quiz_questions = [qq.question for qq in quiz.quiz_questions if qq.question]
-        
-        # Determine how many questions to show
-        num_questions = quiz.question_number
-        if len(quiz_questions) > num_questions:
-            random.shuffle(quiz_questions)
-            quiz_questions = quiz_questions[:num_questions]
-        else:
-            random.shuffle(quiz_questions)
+        for q_id in sampled_ids:
+            if q_id not in content:
+                continue  # deleted since the snapshot was built
+            text, options = content[q_id]
+            opts = [options[i] for i in option_order(seed, q_id)]
 
-        for q in quiz_questions:
-            q_dict = q.to_dict(randomize_options=True)
-            opts = q_dict["options"]
-            
             question_dtos.append(
                 QuestionDTO(
-                    id=q_dict["id"],
-                    text=q_dict["text"],
+                    id=q_id,
+                    text=text,
                     option_a=opts[0],
                     option_b=opts[1],
                     option_c=opts[2],
@@ -125,119 +113,161 @@ class QuizProcessRepository:
             quiz_id=quiz.id,
             title=quiz.title,
             duration=quiz.duration,
-            questions=question_dtos
+            questions=question_dtos,
+            attempt_token=issue_attempt_token(
+                quiz_id=quiz.id,
+                user_id=user.id,
+                question_ids=[q.id for q in question_dtos],
+                seed=seed,
+                duration_minutes=quiz.duration,
+            ),
         )
 
+    async def save_answer(
+        self, data: SaveAnswerRequest, user_id: int
+    ) -> SaveAnswerResponse:
+        # The signed token identifies the attempt: no database access here
+        attempt = verify_attempt_token(data.attempt_token, data.quiz_id, user_id)
+        saved = await answer_buffer.save(attempt, data.answers)
+        return SaveAnswerResponse(saved=saved)
+
     async def end_quiz(
         self, session: AsyncSession, data: EndQuizRequest, user: User
     ) -> EndQuizResponse:
-        # Fetch quiz to get subject/group info if needed, or just for verification
-        stmt = select(Quiz).where(Quiz.id == data.quiz_id)
-        result = await session.execute(stmt)
-        quiz = result.scalar_one_or_none()
-        
-        if not quiz:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found"
-            )
-
-        correct_count = 0
-        wrong_count = 0
-        
-        # Efficiently fetch all relevant questions to check answers
-        question_ids = [ans.question_id for ans in data.answers]
-        if not question_ids:
-             # No answers submitted?
-             pass
-             
-        # Fetch questions
-        q_stmt = select(Question).where(Question.id.in_(question_ids))
-        q_result = await session.execute(q_stmt)
-        questions_map = {q.id: q for q in q_result.scalars().all()}
-        
-        # Validate that all question IDs exist
-        # If any question_id from answers is not in questions_map, it's invalid
-        for ans in data.answers:
-            if ans.question_id not in questions_map:
+        if data.attempt_token:
+            # Issued by start_quiz: grade by option index against the cached key
+            attempt = verify_attempt_token(data.attempt_token, data.quiz_id, user.id)
+            quiz = await quiz_snapshot_cache.get(session, data.quiz_id)
+            if not quiz:
                 raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid question_id: {ans.question_id}"
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found"
                 )
+            answer_key = await self._get_answer_key(session, quiz, attempt.question_ids)
+            check_unique_questions(data.answers)
+            # No autosave may land after the buffer is read; reopened below if
+            # nothing gets stored
+            await answer_buffer.mark_submitted(attempt)
+            # Autosaved answers, overridden by the ones sent with the request
+            merged = {ans.question_id: ans for ans in await answer_buffer.load(attempt)}
+            merged.update((ans.question_id, ans) for ans in data.answers)
+            try:
+                graded = grade_attempt(attempt, list(merged.values()), answer_key)
+            except HTTPException:
+                await answer_buffer.reopen(attempt)
+                raise
+            # Unanswered issued questions count as wrong
+            total_questions = len(attempt.question_ids)
 
-        for ans in data.answers:
-            question = questions_map.get(ans.question_id)
-            is_correct = False
-            if question:
-                # Option A is always correct
-                if ans.answer == question.option_a:
-                    correct_count += 1
-                    is_correct = True
-                else:
-                    wrong_count += 1
-            else:
-                # Question not found? Count as wrong?
-                wrong_count += 1
-            
-            # Save user answer
-            user_answer = UserAnswers(
-                user_id=user.id,
-                quiz_id=data.quiz_id,
-                question_id=ans.question_id,
-                answer=ans.answer,
-                correct_answer=question.option_a if question else None,
-                is_correct=is_correct
-            )
-            session.add(user_answer)
-        
-        total_questions = len(data.answers) # Or strictly correct + wrong
-        
-        # Calculate grade (0-100)
-        # Calculate percentage (0-100)
-        percentage = 0
-        if total_questions > 0:
-            percentage = (correct_count / total_questions) * 100
-        
-        # Determine grade based on percentage
-        if percentage >= 86:
-            grade = 5
-        elif percentage >= 72:
-            grade = 4
-        elif percentage >= 56:
-            grade = 3
+            if settings.quiz.write_behind and get_redis() is not None:
+                try:
+                    response = await self._submit_write_behind(
+                        attempt, quiz, graded, total_questions
+                    )
+                    await answer_buffer.clear(attempt)
+                    return response
+                except Exception as e:
+                    logger.warning(f"Write-behind submit failed, saving directly: {e}")
+
+            answers = graded
+            submission_id = attempt.attempt_id
+        elif settings.quiz.allow_untokened_submit:
+            check_unique_questions(data.answers)
+            attempt = None
+            answers = [(ans.question_id, ans.answer) for ans in data.answers]
+            total_questions = len(answers)
+            submission_id = None
         else:
-            grade = 2
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="attempt_token is required",
+            )
 
-        # Create Result
-        # Assuming user_id is passed or handled via auth in router (for now relying on request data)
-        
-        result = Result(
-            user_id=user.id, # Use authenticated user ID
-            quiz_id=quiz.id,
-            subject_id=quiz.subject_id,
-            group_id=quiz.group_id, # This takes group from quiz, but maybe should take from user? 
-                                    # Result model has group_id. Let's use quiz.group_id for now as context.
-            correct_answers=correct_count,
-            wrong_answers=wrong_count,
-            grade=grade
-        )
-        session.add(result)
-        
+        # Grading, the user_answers rows and the result in one statement
         try:
+            saved = await save_graded_attempt(
+                session,
+                user_id=user.id,
+                quiz_id=data.quiz_id,
+                answers=answers,
+                total_questions=total_questions,
+                submission_id=submission_id,
+            )
             await session.commit()
-            await session.refresh(result)
+        except HTTPException as e:
+            await session.rollback()
+            if attempt is not None and e.status_code != status.HTTP_409_CONFLICT:
+                await answer_buffer.reopen(attempt)
+            raise
+        except IntegrityError:
+            # The same attempt committed concurrently
+            await session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail="Attempt already submitted"
+            )
         except Exception as e:
             await session.rollback()
+            if attempt is not None:
+                await answer_buffer.reopen(attempt)
             logger.error(f"Error saving result: {e}", exc_info=True)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Database error while saving result: {e}",
             )
 
+        if attempt is not None:
+            await answer_buffer.clear(attempt)
+
         return EndQuizResponse(
+            total_questions=total_questions,
+            correct_answers=saved.correct_answers,
+            wrong_answers=saved.wrong_answers,
+            grade=float(saved.grade),
+            attempt_id=saved.attempt_id,
+        )
+
+    async def _submit_write_behind(
+        self,
+        attempt: AttemptToken,
+        quiz: QuizSnapshot,
+        graded: list[GradedAnswer],
+        total_questions: int,
+    ) -> EndQuizResponse:
+        """
+        Returns the grade right away and leaves the rows to the submission
+        queue consumer. A repeated submit of the attempt gets the first
+        response back.
+        """
+        correct_count = sum(1 for g in graded if g.is_correct)
+        response = EndQuizResponse(
             total_questions=total_questions,
             correct_answers=correct_count,
-            wrong_answers=wrong_count,
-            grade=float(grade)
+            wrong_answers=total_questions - correct_count,
+            grade=float(calculate_grade(correct_count, total_questions)),
         )
+        submission = {
+            "id": attempt.attempt_id,
+            "user_id": attempt.user_id,
+            "quiz_id": quiz.id,
+            "subject_id": quiz.subject_id,
+            "group_id": quiz.group_id,
+            "answers": [
+                (g.question_id, g.answer, g.correct_answer, g.is_correct) for g in graded
+            ],
+            "correct_answers": response.correct_answers,
+            "wrong_answers": response.wrong_answers,
+            "grade": int(response.grade),
+            "submitted_at": datetime.now(timezone.utc).replace(tzinfo=None).isoformat(),
+        }
+        stored = await submission_queue.submit(
+            attempt.attempt_id, response.model_dump(), submission
+        )
+        return EndQuizResponse(**stored)
+
+    async def _get_answer_key(
+        self, session: AsyncSession, quiz: QuizSnapshot, question_ids
+    ) -> dict[int, tuple[str, str, str, str]]:
+        """Options of the issued questions, from the question content cache."""
+        content = await quiz_snapshot_cache.get_questions(session, quiz, question_ids)
+        return {q_id: options for q_id, (_, options) in content.items()}
 
 get_quiz_process_repository = QuizProcessRepository()
@@ -3,9 +3,10 @@ import logging
 from core.db_helper import db_helper
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from dependence.role_checker import PermissionRequired
+from dependence.role_checker import PermissionRequired, get_current_user_id
 from app.models.user.model import User
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.idempotency import idempotent
 
 from .repository import get_quiz_process_repository
 from .schemas import (
@@ -13,6 +14,8 @@ from .schemas import (
     StartQuizResponse,
     EndQuizRequest,
     EndQuizResponse,
+    SaveAnswerRequest,
+    SaveAnswerResponse,
 )
 # from app.core.cache import clear_cache
 from app.modules.result.router import list_results
@@ -42,12 +45,27 @@ async def start_quiz(
     return await get_quiz_process_repository.start_quiz(session=session, data=data, user=current_user)
 
 
+@router.post(
+    "/save_answer",
+    response_model=SaveAnswerResponse,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(RateLimiter(times=60, seconds=60))]
+)
+async def save_answer(
+    data: SaveAnswerRequest,
+    current_user_id: int = Depends(get_current_user_id),
+):
+    # No session dependency: autosave only touches Redis
+    return await get_quiz_process_repository.save_answer(data=data, user_id=current_user_id)
+
+
 @router.post(
     "/end_quiz", 
     response_model=EndQuizResponse, 
     status_code=status.HTTP_200_OK,
     dependencies=[Depends(RateLimiter(times=5, seconds=60))]
 )
+@idempotent()
 async def end_quiz(
     data: EndQuizRequest,
     session: AsyncSession = Depends(db_helper.session_getter),
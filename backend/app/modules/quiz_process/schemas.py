@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class StartQuizRequest(BaseModel):
     quiz_id: int
@@ -18,18 +18,38 @@ class StartQuizResponse(BaseModel):
     title: str
     duration: int
     questions: list[QuestionDTO]
+    # Signed record of the issued questions; send it back to end_quiz
+    attempt_token: Optional[str] = None
 
 class AnswerDTO(BaseModel):
     question_id: int
-    answer: str
+    answer: Optional[str] = None
+    # Index of the chosen option as served (0 = option_a of the QuestionDTO);
+    # only with an attempt_token
+    option_index: Optional[int] = Field(None, ge=0, le=3)
+
+class SaveAnswerRequest(BaseModel):
+    quiz_id: int
+    attempt_token: str
+    answers: list[AnswerDTO]
+
+class SaveAnswerResponse(BaseModel):
+    # Answers buffered for the attempt so far
+    saved: int
 
 class EndQuizRequest(BaseModel):
     quiz_id: int
     user_id: Optional[int] = None 
-    answers: list[AnswerDTO]
+    # With an attempt_token, answers autosaved via save_answer are included
+    # (answers sent here take precedence)
+    answers: list[AnswerDTO] = []
+    # Required unless settings.quiz.allow_untokened_submit is on
+    attempt_token: Optional[str] = None
 
 class EndQuizResponse(BaseModel):
     total_questions: int
     correct_answers: int
     wrong_answers: int
     grade: int
+    # Not known yet while a write-behind submission is queued
+    attempt_id: Optional[int] = None
@@ -0,0 +1,415 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import ARRAY, Integer, any_, cast, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.question.model import Question
+from app.models.quiz.model import Quiz
+from app.models.quiz_questions.model import QuizQuestion
+from core.cache import get_redis
+from core.config import settings
+from core.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# Bumped by bulk UPDATE/DELETE statements whose affected quizzes are unknown
+QUIZ_EPOCH_KEY = f"{settings.redis.prefix}:quiz:epoch"
+_ALL_QUIZZES = "*"
+
+
+def quiz_version_key(quiz_id: int) -> str:
+    return f"{settings.redis.prefix}:quiz:{quiz_id}:version"
+
+
+def quiz_snapshot_key(quiz_id: int, version: str) -> str:
+    return f"{settings.redis.prefix}:quiz:{quiz_id}:v{version}:snapshot"
+
+
+def quiz_questions_key(quiz_id: int, version: str) -> str:
+    return f"{settings.redis.prefix}:quiz:{quiz_id}:v{version}:questions"
+
+
+# (text, (option_a, option_b, option_c, option_d)); option_a is correct
+QuestionContent = tuple[str, tuple[str, str, str, str]]
+
+
+@dataclass(frozen=True)
+class QuizSnapshot:
+    """
+    Everything start_quiz needs about a quiz, without ORM objects. Only the
+    ids of the linked questions are kept; content is fetched per question.
+    """
+
+    id: int
+    version: str
+    title: str
+    duration: int
+    question_number: int
+    pin: str
+    is_active: bool
+    group_id: int | None
+    subject_id: int | None
+    question_ids: tuple[int, ...]
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "id": self.id,
+                "title": self.title,
+                "duration": self.duration,
+                "question_number": self.question_number,
+                "pin": self.pin,
+                "is_active": self.is_active,
+                "group_id": self.group_id,
+                "subject_id": self.subject_id,
+                "question_ids": self.question_ids,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, raw: str, version: str) -> "QuizSnapshot":
+        data = json.loads(raw)
+        data["question_ids"] = tuple(data["question_ids"])
+        return cls(version=version, **data)
+
+
+class QuizSnapshotCache:
+    """
+    Versioned snapshots of quizzes for start_quiz: an in-process LRU in front
+    of Redis, in front of PostgreSQL.
+
+    Each quiz has a version counter in Redis (plus a global epoch for bulk
+    statements). Commits that touch the quiz, its quiz_questions or a linked
+    question bump the counter, so every worker moves to a new snapshot key.
+
+    Question content is cached separately under the same version, and only
+    for questions that were actually sampled (get_questions).
+    """
+
+    def __init__(self, max_size: int, ttl: int, question_cache_size: int) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.question_cache_size = question_cache_size
+        self._snapshots: OrderedDict[tuple[int, str], QuizSnapshot] = OrderedDict()
+        self._questions: OrderedDict[tuple[int, str, int], QuestionContent] = OrderedDict()
+        self._pending_tasks: set[asyncio.Task] = set()
+
+    # ------------------------------------------------------------------ #
+    #  LOOKUPS
+    # ------------------------------------------------------------------ #
+    async def get(self, session: AsyncSession, quiz_id: int) -> QuizSnapshot | None:
+        version = await self._current_version(quiz_id)
+        if version is None:
+            # Redis unavailable or an invalidation is in flight: go to the DB
+            return await self._load(session, quiz_id, version="")
+
+        snapshot = self._snapshots.get((quiz_id, version))
+        if snapshot is not None:
+            self._snapshots.move_to_end((quiz_id, version))
+            return snapshot
+
+        # Concurrent misses (a whole group starting at once) share one load
+        snapshot = await single_flight.do(
+            f"quiz:{quiz_id}:v{version}",
+            lambda: self._fetch(session, quiz_id, version),
+        )
+        if snapshot is not None:
+            self._remember(snapshot)
+        return snapshot
+
+    async def _fetch(
+        self, session: AsyncSession, quiz_id: int, version: str
+    ) -> QuizSnapshot | None:
+        snapshot = await self._read_redis(quiz_id, version)
+        if snapshot is None:
+            snapshot = await self._load(session, quiz_id, version)
+            if snapshot is not None:
+                await self._write_redis(snapshot)
+        return snapshot
+
+    async def _current_version(self, quiz_id: int) -> str | None:
+        if self._pending_tasks:
+            return None
+        redis = get_redis()
+        if redis is None:
+            return None
+        keys = (QUIZ_EPOCH_KEY, quiz_version_key(quiz_id))
+        try:
+            epoch, quiz_version = await redis.mget(*keys)
+            if epoch is None or quiz_version is None:
+                # Start new counters from a timestamp, so a Redis reset never
+                # brings back a version some worker still has snapshots for
+                seed = time.time_ns() // 1000
+                async with redis.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        pipe.set(key, seed, nx=True)
+                    await pipe.execute()
+                epoch, quiz_version = await redis.mget(*keys)
+        except Exception as e:
+            logger.warning(f"Could not read quiz version from Redis: {e}")
+            return None
+        return f"{int(epoch)}.{int(quiz_version)}"
+
+    async def _read_redis(self, quiz_id: int, version: str) -> QuizSnapshot | None:
+        redis = get_redis()
+        try:
+            raw = await redis.get(quiz_snapshot_key(quiz_id, version))
+        except Exception as e:
+            logger.warning(f"Could not read quiz snapshot from Redis: {e}")
+            return None
+        return QuizSnapshot.from_json(raw, version) if raw else None
+
+    async def _write_redis(self, snapshot: QuizSnapshot) -> None:
+        redis = get_redis()
+        try:
+            await redis.set(
+                quiz_snapshot_key(snapshot.id, snapshot.version),
+                snapshot.to_json(),
+                ex=self.ttl,
+            )
+        except Exception as e:
+            logger.warning(f"Could not write quiz snapshot to Redis: {e}")
+
+    def _remember(self, snapshot: QuizSnapshot) -> None:
+        self._snapshots[(snapshot.id, snapshot.version)] = snapshot
+        if len(self._snapshots) > self.max_size:
+            self._snapshots.popitem(last=False)
+
+    async def _load(
+        self, session: AsyncSession, quiz_id: int, version: str
+    ) -> QuizSnapshot | None:
+        quiz = await session.get(Quiz, quiz_id)
+        if not quiz:
+            return None
+
+        stmt = (
+            select(QuizQuestion.question_id)
+            .where(QuizQuestion.quiz_id == quiz_id, QuizQuestion.question_id.is_not(None))
+            .order_by(QuizQuestion.id)
+        )
+        question_ids = (await session.execute(stmt)).scalars().all()
+
+        return QuizSnapshot(
+            id=quiz.id,
+            version=version,
+            title=quiz.title,
+            duration=quiz.duration,
+            question_number=quiz.question_number,
+            pin=quiz.pin,
+            is_active=quiz.is_active,
+            group_id=quiz.group_id,
+            subject_id=quiz.subject_id,
+            question_ids=tuple(question_ids),
+        )
+
+    # ------------------------------------------------------------------ #
+    #  QUESTION CONTENT
+    # ------------------------------------------------------------------ #
+    async def get_questions(
+        self, session: AsyncSession, quiz: QuizSnapshot, question_ids
+    ) -> dict[int, QuestionContent]:
+        """
+        Text and options of the given questions: in-process LRU, then one
+        HMGET on the quiz version's Redis hash, then one `id = ANY(...)`
+        query for whatever is left. Deleted questions are missing from the
+        result.
+        """
+        if not quiz.version:
+            # Snapshot bypassed the cache, so does its content
+            return await self._load_questions(session, list(question_ids))
+
+        content: dict[int, QuestionContent] = {}
+        missing = []
+        for q_id in question_ids:
+            key = (quiz.id, quiz.version, q_id)
+            cached = self._questions.get(key)
+            if cached is None:
+                missing.append(q_id)
+            else:
+                self._questions.move_to_end(key)
+                content[q_id] = cached
+        if not missing:
+            return content
+
+        found = await self._read_redis_questions(quiz, missing)
+        missing = [q_id for q_id in missing if q_id not in found]
+        if missing:
+            loaded = await self._load_questions(session, missing)
+            await self._write_redis_questions(quiz, loaded)
+            found.update(loaded)
+
+        for q_id, value in found.items():
+            self._questions[(quiz.id, quiz.version, q_id)] = value
+        while len(self._questions) > self.question_cache_size:
+            self._questions.popitem(last=False)
+        content.update(found)
+        return content
+
+    async def _load_questions(
+        self, session: AsyncSession, question_ids: list[int]
+    ) -> dict[int, QuestionContent]:
+        stmt = select(
+            Question.id,
+            Question.text,
+            Question.option_a,
+            Question.option_b,
+            Question.option_c,
+            Question.option_d,
+        ).where(Question.id == any_(cast(question_ids, ARRAY(Integer))))
+        rows = (await session.execute(stmt)).all()
+        return {q_id: (text, (a, b, c, d)) for q_id, text, a, b, c, d in rows}
+
+    async def _read_redis_questions(
+        self, quiz: QuizSnapshot, question_ids: list[int]
+    ) -> dict[int, QuestionContent]:
+        redis = get_redis()
+        if redis is None:
+            return {}
+        try:
+            values = await redis.hmget(quiz_questions_key(quiz.id, quiz.version), question_ids)
+        except Exception as e:
+            logger.warning(f"Could not read quiz questions from Redis: {e}")
+            return {}
+        found = {}
+        for q_id, raw in zip(question_ids, values):
+            if raw:
+                text, options = json.loads(raw)
+                found[q_id] = (text, tuple(options))
+        return found
+
+    async def _write_redis_questions(
+        self, quiz: QuizSnapshot, content: dict[int, QuestionContent]
+    ) -> None:
+        redis = get_redis()
+        if redis is None or not content:
+            return
+        key = quiz_questions_key(quiz.id, quiz.version)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping={q_id: json.dumps(value) for q_id, value in content.items()})
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not write quiz questions to Redis: {e}")
+
+    # ------------------------------------------------------------------ #
+    #  INVALIDATION
+    # ------------------------------------------------------------------ #
+    def invalidate(self, quiz_ids: set) -> None:
+        """
+        Drops local snapshots of the given quizzes ("*" = all) and bumps their
+        versions in Redis in the background, so the other workers follow.
+        """
+        if _ALL_QUIZZES in quiz_ids:
+            self._snapshots.clear()
+            self._questions.clear()
+        else:
+            for cache in (self._snapshots, self._questions):
+                for key in [key for key in cache if key[0] in quiz_ids]:
+                    del cache[key]
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.bump_versions(quiz_ids))
+        self._pending_tasks.add(task)
+        task.add_done_callback(self._pending_tasks.discard)
+
+    async def bump_versions(self, quiz_ids: set) -> None:
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                if _ALL_QUIZZES in quiz_ids:
+                    pipe.incr(QUIZ_EPOCH_KEY)
+                else:
+                    for quiz_id in quiz_ids:
+                        pipe.incr(quiz_version_key(quiz_id))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not bump quiz versions in Redis: {e}")
+
+
+quiz_snapshot_cache = QuizSnapshotCache(
+    max_size=settings.quiz.snapshot_cache_size,
+    ttl=settings.quiz.snapshot_ttl,
+    question_cache_size=settings.quiz.question_cache_size,
+)
+
+
+# ------------------------------------------------------------------ #
+#  INVALIDATION HOOKS
+# ------------------------------------------------------------------ #
+def _dirty_quiz_ids(session: Session) -> set:
+    quiz_ids: set = set()
+    question_ids: set[int] = set()
+
+    for obj in session.deleted:
+        if isinstance(obj, Quiz):
+            quiz_ids.add(obj.id)
+        elif isinstance(obj, QuizQuestion):
+            quiz_ids.add(obj.quiz_id)
+        elif isinstance(obj, Question):
+            question_ids.add(obj.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, QuizQuestion):
+            quiz_ids.add(obj.quiz_id)
+        elif isinstance(obj, (Quiz, Question)):
+            # Column changes only - e.g. a new Result linked to the quiz is not one
+            if session.is_modified(obj, include_collections=False):
+                if isinstance(obj, Quiz):
+                    quiz_ids.add(obj.id)
+                else:
+                    question_ids.add(obj.id)
+
+    for obj in session.new:
+        if isinstance(obj, QuizQuestion):
+            quiz_ids.add(obj.quiz_id)
+
+    if question_ids:
+        # Quizzes linking the changed questions (links are still in place here)
+        stmt = select(QuizQuestion.quiz_id).where(
+            QuizQuestion.question_id.in_(question_ids)
+        )
+        quiz_ids.update(session.connection().execute(stmt).scalars().all())
+
+    quiz_ids.discard(None)
+    return quiz_ids
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_quizzes_dirty(session: Session, flush_context) -> None:
+    quiz_ids = _dirty_quiz_ids(session)
+    if quiz_ids:
+        session.info.setdefault("dirty_quiz_ids", set()).update(quiz_ids)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_quiz_changes(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in (Quiz, QuizQuestion, Question):
+        dirty = orm_execute_state.session.info.setdefault("dirty_quiz_ids", set())
+        dirty.add(_ALL_QUIZZES)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_quizzes_on_commit(session: Session) -> None:
+    quiz_ids = session.info.pop("dirty_quiz_ids", None)
+    if quiz_ids:
+        quiz_snapshot_cache.invalidate(quiz_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_quizzes_on_rollback(session: Session) -> None:
+    session.info.pop("dirty_quiz_ids", None)
@@ -0,0 +1,350 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.quiz_attempt.model import QuizAttempt
+from app.models.results.model import Result
+from app.models.user_answers.model import UserAnswers
+from core.cache import get_redis
+from core.config import settings
+from core.db_helper import db_helper
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_STREAM_KEY = f"{settings.redis.prefix}:quiz:submissions"
+SUBMISSION_DEAD_LETTER_KEY = f"{settings.redis.prefix}:quiz:submissions:dead"
+SUBMISSION_GROUP = "quiz_submissions"
+
+# Failures caused by the entry itself (e.g. its quiz was deleted meanwhile):
+# retrying will not help. Anything else (database down) is retried.
+_POISON_ERRORS = (IntegrityError, DataError, KeyError, TypeError, ValueError)
+
+
+def submission_key(submission_id: str) -> str:
+    return f"{settings.redis.prefix}:quiz:submission:{submission_id}"
+
+
+# Stores the graded response and appends the submission to the stream in one
+# step; a repeated submit gets the stored response back and adds nothing.
+_SUBMIT_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    redis.call('XADD', KEYS[2], '*', 'data', ARGV[3])
+    return false
+end
+return redis.call('GET', KEYS[1])
+"""
+
+
+class SubmissionQueue:
+    """
+    Write-behind queue for end_quiz: graded submissions are appended to a
+    Redis stream and a consumer group persists Result and UserAnswers rows
+    in batches.
+
+    Entries are acknowledged only after their batch is committed. On start a
+    consumer first replays its own pending entries, and it periodically
+    claims entries left pending by consumers that died (XAUTOCLAIM). Attempts
+    are inserted with ON CONFLICT (submission_id) DO NOTHING, so replaying an
+    entry never stores it twice.
+
+    A batch that has failed `max_deliveries` times is persisted entry by
+    entry, so one bad entry cannot hold up the others; entries that fail on
+    their own data are moved to a dead-letter stream and acknowledged.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        block_ms: int,
+        claim_idle_ms: int,
+        ttl: int,
+        max_deliveries: int = 3,
+        session_factory: async_sessionmaker[AsyncSession] = db_helper.session_factory,
+        consumer_name: str | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.ttl = ttl
+        self.max_deliveries = max_deliveries
+        self.consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        # "0" re-reads this consumer's pending entries, ">" reads new ones
+        self._read_id = "0"
+        self._next_claim = 0.0
+        # Failed deliveries seen by this consumer, per entry id
+        self._failures: dict[str, int] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._read_id = "0"
+        self._next_claim = 0.0
+        await self.ensure_group()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._task
+        self._task = None
+
+    async def ensure_group(self) -> None:
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.xgroup_create(
+                SUBMISSION_STREAM_KEY, SUBMISSION_GROUP, id="0", mkstream=True
+            )
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    # ------------------------------------------------------------------ #
+    #  PRODUCER
+    # ------------------------------------------------------------------ #
+    async def submit(self, submission_id: str, response: dict, submission: dict) -> dict:
+        """
+        Queues a graded submission and returns the response to send. If the
+        attempt was already submitted, returns the stored response instead.
+        Raises if Redis is not available.
+        """
+        redis = get_redis()
+        if redis is None:
+            raise RuntimeError("Redis is not initialised")
+        stored = await redis.eval(
+            _SUBMIT_SCRIPT,
+            2,
+            submission_key(submission_id),
+            SUBMISSION_STREAM_KEY,
+            json.dumps(response),
+            self.ttl,
+            json.dumps(submission),
+        )
+        return json.loads(stored) if stored else response
+
+    # ------------------------------------------------------------------ #
+    #  CONSUMER
+    # ------------------------------------------------------------------ #
+    async def _run(self) -> None:
+        while not self._stopping:
+            entries = []
+            try:
+                entries = await self._next_entries()
+                if entries:
+                    await self.persist(entries)
+            except Exception as e:
+                logger.error(f"Could not persist quiz submissions: {e}")
+                try:
+                    if entries and await self._settle_failed_batch(entries):
+                        continue
+                except Exception as retry_error:
+                    logger.error(
+                        f"Could not persist quiz submissions one by one: {retry_error}"
+                    )
+                # Retry this consumer's pending entries after a pause
+                self._read_id = "0"
+                await asyncio.sleep(1)
+
+    async def _delivery_counts(self, entry_ids: list[str]) -> dict[str, int]:
+        redis = get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            for entry_id in entry_ids:
+                pipe.xpending_range(
+                    SUBMISSION_STREAM_KEY, SUBMISSION_GROUP, min=entry_id, max=entry_id, count=1
+                )
+            pending = await pipe.execute()
+        return {
+            info["message_id"]: info["times_delivered"]
+            for rows in pending
+            for info in rows
+        }
+
+    async def _settle_failed_batch(self, entries: list[tuple[str, dict]]) -> bool:
+        """
+        Counts the failed delivery and, once the batch has failed
+        `max_deliveries` times, persists its entries one by one. Returns
+        False while the batch should simply be retried.
+        """
+        entry_ids = [entry_id for entry_id, _ in entries]
+        for entry_id in entry_ids:
+            self._failures[entry_id] = self._failures.get(entry_id, 0) + 1
+        # XPENDING also counts deliveries to consumers that died since
+        deliveries = await self._delivery_counts(entry_ids)
+        attempts = max(
+            max(deliveries.get(entry_id, 0), self._failures[entry_id])
+            for entry_id in entry_ids
+        )
+        if attempts < self.max_deliveries:
+            return False
+
+        for entry in entries:
+            try:
+                await self.persist([entry])
+            except _POISON_ERRORS as e:
+                await self.dead_letter(entry, e)
+        return True
+
+    async def dead_letter(self, entry: tuple[str, dict], error: Exception) -> None:
+        """Parks an entry that cannot be stored on the dead-letter stream."""
+        entry_id, fields = entry
+        redis = get_redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.xadd(
+                SUBMISSION_DEAD_LETTER_KEY,
+                {
+                    "data": fields.get("data", ""),
+                    "entry_id": entry_id,
+                    "error": f"{type(error).__name__}: {error}"[:2000],
+                },
+            )
+            pipe.xack(SUBMISSION_STREAM_KEY, SUBMISSION_GROUP, entry_id)
+            pipe.xdel(SUBMISSION_STREAM_KEY, entry_id)
+            await pipe.execute()
+        self._failures.pop(entry_id, None)
+        logger.error(f"Moved quiz submission {entry_id} to the dead-letter stream: {error}")
+
+    async def _next_entries(self) -> list[tuple[str, dict]]:
+        redis = get_redis()
+        if redis is None:
+            await asyncio.sleep(self.block_ms / 1000)
+            return []
+
+        if time.monotonic() >= self._next_claim:
+            self._next_claim = time.monotonic() + max(self.claim_idle_ms, 1000) / 1000
+            claimed = await redis.xautoclaim(
+                SUBMISSION_STREAM_KEY,
+                SUBMISSION_GROUP,
+                self.consumer_name,
+                min_idle_time=self.claim_idle_ms,
+                start_id="0-0",
+                count=self.batch_size,
+            )
+            entries = [(entry_id, fields) for entry_id, fields in claimed[1] if fields]
+            if entries:
+                logger.info(f"Claimed {len(entries)} stale quiz submissions")
+                return entries
+
+        response = await redis.xreadgroup(
+            SUBMISSION_GROUP,
+            self.consumer_name,
+            {SUBMISSION_STREAM_KEY: self._read_id},
+            count=self.batch_size,
+            block=None if self._read_id == "0" else self.block_ms,
+        )
+        entries = [
+            (entry_id, fields)
+            for _, stream_entries in response or []
+            for entry_id, fields in stream_entries
+            if fields
+        ]
+        if self._read_id == "0" and not entries:
+            # Nothing left over from a previous run: switch to new entries
+            self._read_id = ">"
+        return entries
+
+    async def persist(self, entries: list[tuple[str, dict]]) -> None:
+        """Writes a batch of stream entries in one transaction, then acks them."""
+        submissions = {}
+        for _, fields in entries:
+            submission = json.loads(fields["data"])
+            submissions[submission["id"]] = submission
+
+        attempt_rows = []
+        result_rows: dict[str, dict] = {}
+        answer_rows: dict[str, list[dict]] = {}
+        for submission in submissions.values():
+            submitted_at = datetime.fromisoformat(submission["submitted_at"])
+            attempt_rows.append(
+                {
+                    "submission_id": submission["id"],
+                    "user_id": submission["user_id"],
+                    "quiz_id": submission["quiz_id"],
+                    "created_at": submitted_at,
+                    "updated_at": submitted_at,
+                }
+            )
+            result_rows[submission["id"]] = {
+                "user_id": submission["user_id"],
+                "quiz_id": submission["quiz_id"],
+                "subject_id": submission["subject_id"],
+                "group_id": submission["group_id"],
+                "correct_answers": submission["correct_answers"],
+                "wrong_answers": submission["wrong_answers"],
+                "grade": submission["grade"],
+                "created_at": submitted_at,
+                "updated_at": submitted_at,
+            }
+            answer_rows[submission["id"]] = [
+                {
+                    "user_id": submission["user_id"],
+                    "quiz_id": submission["quiz_id"],
+                    "question_id": question_id,
+                    "answer": answer,
+                    "correct_answer": correct_answer,
+                    "is_correct": is_correct,
+                    "created_at": submitted_at,
+                    "updated_at": submitted_at,
+                }
+                for question_id, answer, correct_answer, is_correct in submission["answers"]
+            ]
+
+        async with self.session_factory() as session:
+            stmt = (
+                pg_insert(QuizAttempt)
+                .values(attempt_rows)
+                .on_conflict_do_nothing(index_elements=[QuizAttempt.submission_id])
+                .returning(QuizAttempt.submission_id, QuizAttempt.id)
+            )
+            # Already stored submissions (a replay) come back without a row
+            inserted = dict((await session.execute(stmt)).all())
+
+            results = []
+            answers = []
+            for submission_id, attempt_id in inserted.items():
+                results.append({**result_rows[submission_id], "attempt_id": attempt_id})
+                answers.extend(
+                    {**row, "attempt_id": attempt_id} for row in answer_rows[submission_id]
+                )
+            if results:
+                await session.execute(insert(Result).values(results))
+            if answers:
+                await session.execute(insert(UserAnswers).values(answers))
+            await session.commit()
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        redis = get_redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.xack(SUBMISSION_STREAM_KEY, SUBMISSION_GROUP, *entry_ids)
+            pipe.xdel(SUBMISSION_STREAM_KEY, *entry_ids)
+            await pipe.execute()
+        for entry_id in entry_ids:
+            self._failures.pop(entry_id, None)
+        logger.info(f"Persisted {len(inserted)} quiz submissions ({len(entries)} stream entries)")
+
+
+submission_queue = SubmissionQueue(
+    batch_size=settings.quiz.submission_batch_size,
+    block_ms=settings.quiz.submission_block_ms,
+    claim_idle_ms=settings.quiz.submission_claim_idle_ms,
+    ttl=settings.quiz.submission_ttl,
+    max_deliveries=settings.quiz.submission_max_deliveries,
+)
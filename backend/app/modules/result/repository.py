@@ -1,17 +1,23 @@
 import logging
 
 from fastapi import HTTPException, status
+from app.models.question.model import Question
+from app.models.quiz_attempt.model import QuizAttempt
 from app.models.results.model import Result
+from app.models.user_answers.model import UserAnswers
 from app.models.user.model import User
 from app.models.student.model import Student
-from sqlalchemy import func, select, desc, asc, or_
+from sqlalchemy import delete, func, select, desc, asc, or_
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.teacher.model import Teacher
 from app.models.group_teachers.model import GroupTeacher
 from app.models.subject_teacher.model import SubjectTeacher
+from core.config import settings
 
 from .schemas import (
+    AttemptReviewAnswer,
+    AttemptReviewResponse,
     ResultListRequest,
     ResultListResponse,
 )
@@ -79,35 +85,8 @@ class ResultRepository:
             # Admins see everything, no role-based filter applied
             pass
         elif is_teacher:
-            # Get teacher's assigned groups (group_teachers.teacher_id = users.id)
-            gt_stmt = select(GroupTeacher.group_id).where(GroupTeacher.teacher_id == current_user.id)
-            gt_result = await session.execute(gt_stmt)
-            allowed_group_ids = gt_result.scalars().all()
-
-            # Get teacher's assigned subjects (subject_teachers.teacher_id = teachers.id)
-            st_stmt = (
-                select(SubjectTeacher.subject_id)
-                .join(Teacher, Teacher.id == SubjectTeacher.teacher_id)
-                .where(Teacher.user_id == current_user.id)
-            )
-            st_result = await session.execute(st_stmt)
-            allowed_subject_ids = st_result.scalars().all()
-
-            if allowed_group_ids and allowed_subject_ids:
-                teacher_filter = (
-                    Result.group_id.in_(allowed_group_ids)
-                    & Result.subject_id.in_(allowed_subject_ids)
-                )
-            elif allowed_group_ids:
-                teacher_filter = Result.group_id.in_(allowed_group_ids)
-            elif allowed_subject_ids:
-                teacher_filter = Result.subject_id.in_(allowed_subject_ids)
-            else:
-                # If a teacher has no assigned groups/subjects, they see nothing
-                teacher_filter = Result.id == -1
-
-            if teacher_filter is not None:
-                stmt = stmt.where(teacher_filter)
+            teacher_filter = await self._teacher_filter(session, current_user)
+            stmt = stmt.where(teacher_filter)
 
         elif is_student:
             # Students only see their own results
@@ -195,12 +174,101 @@ class ResultRepository:
             total=total, page=request.page, limit=request.limit, results=results
         )
 
+    async def get_attempt_review(
+        self,
+        session: AsyncSession,
+        current_user: User,
+        result_id: int | None = None,
+        attempt_id: int | None = None,
+    ) -> AttemptReviewResponse:
+        """
+        One attempt's result with its answers, in a single query over the
+        attempt_id indexes of results and user_answers. Visibility follows
+        list_results; students only get the correct answers if
+        settings.quiz.show_correct_answers is on.
+        """
+        stmt = (
+            select(Result, UserAnswers, Question.text)
+            .outerjoin(UserAnswers, UserAnswers.attempt_id == Result.attempt_id)
+            .outerjoin(Question, Question.id == UserAnswers.question_id)
+            .order_by(UserAnswers.id)
+        )
+        if result_id is not None:
+            stmt = stmt.where(Result.id == result_id)
+        else:
+            stmt = stmt.where(Result.attempt_id == attempt_id)
+
+        role_names = {role.name.lower() for role in current_user.roles}
+        is_student_only = "student" in role_names and not role_names & {"admin", "teacher"}
+        if "admin" not in role_names and "teacher" in role_names:
+            # Outside the teacher's groups/subjects: not found, as in the list
+            stmt = stmt.where(await self._teacher_filter(session, current_user))
+        rows = (await session.execute(stmt)).all()
+
+        if not rows:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Result not found"
+            )
+        result = rows[0][0]
+
+        if is_student_only and result.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You can only review your own attempts",
+            )
+        show_correct = not is_student_only or settings.quiz.show_correct_answers
+
+        return AttemptReviewResponse(
+            attempt_id=result.attempt_id,
+            result_id=result.id,
+            user_id=result.user_id,
+            quiz_id=result.quiz_id,
+            correct_answers=result.correct_answers,
+            wrong_answers=result.wrong_answers,
+            grade=result.grade,
+            created_at=result.created_at,
+            answers=[
+                AttemptReviewAnswer(
+                    question_id=answer.question_id,
+                    question_text=question_text,
+                    answer=answer.answer,
+                    correct_answer=answer.correct_answer if show_correct else None,
+                    is_correct=answer.is_correct,
+                )
+                for _, answer, question_text in rows
+                if answer is not None
+            ],
+        )
+
+    async def _teacher_filter(self, session: AsyncSession, user: User):
+        """Results of the teacher's groups and subjects (both, if both are set)."""
+        # Get teacher's assigned groups (group_teachers.teacher_id = users.id)
+        gt_stmt = select(GroupTeacher.group_id).where(GroupTeacher.teacher_id == user.id)
+        allowed_group_ids = (await session.execute(gt_stmt)).scalars().all()
+
+        # Get teacher's assigned subjects (subject_teachers.teacher_id = teachers.id)
+        st_stmt = (
+            select(SubjectTeacher.subject_id)
+            .join(Teacher, Teacher.id == SubjectTeacher.teacher_id)
+            .where(Teacher.user_id == user.id)
+        )
+        allowed_subject_ids = (await session.execute(st_stmt)).scalars().all()
+
+        if allowed_group_ids and allowed_subject_ids:
+            return (
+                Result.group_id.in_(allowed_group_ids)
+                & Result.subject_id.in_(allowed_subject_ids)
+            )
+        if allowed_group_ids:
+            return Result.group_id.in_(allowed_group_ids)
+        if allowed_subject_ids:
+            return Result.subject_id.in_(allowed_subject_ids)
+        # If a teacher has no assigned groups/subjects, they see nothing
+        return Result.id == -1
+
     async def delete_result(
         self, session: AsyncSession, result_id: int
     ) -> None:
-        from app.models.user_answers.model import UserAnswers
-        from sqlalchemy import delete
-
         stmt = select(Result).where(Result.id == result_id)
         result = await session.execute(stmt)
         obj = result.scalar_one_or_none()
@@ -210,17 +278,13 @@ class ResultRepository:
                 status_code=status.HTTP_404_NOT_FOUND, detail="Result not found"
             )
 
-        # Delete associated user answers
-        # We match by user_id, quiz_id and the exact created_at timestamp 
-        # since they were created in the same transaction.
-        delete_answers_stmt = delete(UserAnswers).where(
-            UserAnswers.user_id == obj.user_id,
-            UserAnswers.quiz_id == obj.quiz_id,
-            UserAnswers.created_at == obj.created_at
-        )
-        await session.execute(delete_answers_stmt)
-
-        await session.delete(obj)
+        if obj.attempt_id is not None:
+            # The result and its answers go with the attempt (ON DELETE CASCADE)
+            await session.execute(
+                delete(QuizAttempt).where(QuizAttempt.id == obj.attempt_id)
+            )
+        else:
+            await session.delete(obj)
         await session.commit()
 
 
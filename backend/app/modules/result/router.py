@@ -5,10 +5,13 @@ from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.cache import cached, scoped_key_builder
+from dependence.cache_scope import result_visibility
 
 from .repository import get_result_repository
 from .schemas import (
+    AttemptReviewResponse,
     ResultResponse,
     ResultListRequest,
     ResultListResponse,
@@ -36,8 +39,34 @@ async def get_result(
     )
 
 
+@router.get("/{result_id}/review", response_model=AttemptReviewResponse)
+async def get_result_review(
+    result_id: int,
+    session: AsyncSession = Depends(db_helper.session_getter),
+    current_user: User = Depends(PermissionRequired("read:result")),
+):
+    return await get_result_repository.get_attempt_review(
+        session=session, current_user=current_user, result_id=result_id
+    )
+
+
+@router.get("/attempt/{attempt_id}/review", response_model=AttemptReviewResponse)
+async def get_attempt_review(
+    attempt_id: int,
+    session: AsyncSession = Depends(db_helper.session_getter),
+    current_user: User = Depends(PermissionRequired("read:result")),
+):
+    return await get_result_repository.get_attempt_review(
+        session=session, current_user=current_user, attempt_id=attempt_id
+    )
+
+
 @router.get("/", response_model=ResultListResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(
+    expire=60,
+    tags=("results", "users", "students", "quizzes", "subjects", "groups"),
+    key_builder=scoped_key_builder(result_visibility),
+)
 async def list_results(
     data: ResultListRequest = Depends(),
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -86,3 +86,23 @@ class ResultListResponse(BaseModel):
     page: int
     limit: int
     results: list[ResultResponse]
+
+
+class AttemptReviewAnswer(BaseModel):
+    question_id: Optional[int]
+    question_text: Optional[str] = None
+    answer: Optional[str]
+    correct_answer: Optional[str]
+    is_correct: bool
+
+
+class AttemptReviewResponse(BaseModel):
+    attempt_id: Optional[int]
+    result_id: int
+    user_id: Optional[int]
+    quiz_id: Optional[int]
+    correct_answers: int
+    wrong_answers: int
+    grade: int
+    created_at: datetime
+    answers: list[AttemptReviewAnswer]
@@ -5,7 +5,8 @@ from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.cache import cached
 
 from .repository import get_role_repository
 from .schemas import (
@@ -42,7 +43,12 @@ async def create_role(
 
 
 @router.get("/{role_id}", response_model=RoleCreateResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(
+    expire=300,
+    namespace="roles",
+    tags=("roles:{role_id}", "role_permissions", "permissions"),
+    local=True,
+)
 async def get_role(
     role_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -52,7 +58,12 @@ async def get_role(
 
 
 @router.get("/", response_model=RoleListResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(
+    expire=300,
+    namespace="roles",
+    tags=("roles", "role_permissions", "permissions"),
+    local=True,
+)
 async def list_roles(
     data: RoleListRequest = Depends(),
     session: AsyncSession = Depends(db_helper.session_getter),
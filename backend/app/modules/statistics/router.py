@@ -4,10 +4,11 @@ from core.db_helper import db_helper
 from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
-# from fastapi_cache.decorator import cache
+from core.cache import cached, local_cache
 
 from .repository import get_statistics_repository
 from .schemas import (
+    CacheStatisticsResponse,
     GeneralStatisticsResponse,
     QuizStatisticsResponse,
     UserStatisticsResponse,
@@ -25,7 +26,7 @@ router = APIRouter(
 
 
 @router.get("/general", response_model=GeneralStatisticsResponse)
-# @cache(expire=60)
+@cached(expire=60, tags=("results", "users", "quizzes"))
 async def get_general_statistics(
     session: AsyncSession = Depends(db_helper.session_getter),
     _: PermissionRequired = Depends(PermissionRequired("read:statistics")),
@@ -34,7 +35,7 @@ async def get_general_statistics(
 
 
 @router.get("/quiz/{quiz_id}", response_model=QuizStatisticsResponse)
-# @cache(expire=60)
+@cached(expire=60, tags=("quizzes:{quiz_id}", "results"))
 async def get_quiz_statistics(
     quiz_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -46,7 +47,7 @@ async def get_quiz_statistics(
 
 
 @router.get("/user/{user_id}", response_model=UserStatisticsResponse)
-# @cache(expire=60)
+@cached(expire=60, tags=("users:{user_id}", "results"))
 async def get_user_statistics(
     user_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -58,6 +59,11 @@ async def get_user_statistics(
 
 
 @router.get("/faculty/{faculty_id}", response_model=FacultyStatisticsResponse)
+@cached(
+    expire=60,
+    tags=("faculties:{faculty_id}", "groups", "results"),
+    stampede_protection=True,
+)
 async def get_faculty_statistics(
     faculty_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -69,6 +75,7 @@ async def get_faculty_statistics(
 
 
 @router.get("/group/{group_id}", response_model=GroupStatisticsResponse)
+@cached(expire=60, tags=("groups:{group_id}", "results"))
 async def get_group_statistics(
     group_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -80,6 +87,7 @@ async def get_group_statistics(
 
 
 @router.get("/teacher/{teacher_id}", response_model=TeacherStatisticsResponse)
+@cached(expire=60, tags=("teachers:{teacher_id}", "quizzes", "results"))
 async def get_teacher_statistics(
     teacher_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -88,3 +96,10 @@ async def get_teacher_statistics(
     return await get_statistics_repository.get_teacher_stats(
         session=session, teacher_id=teacher_id
     )
+
+
+@router.get("/cache", response_model=CacheStatisticsResponse)
+async def get_cache_statistics(
+    _: PermissionRequired = Depends(PermissionRequired("read:statistics")),
+):
+    return local_cache.stats()
@@ -63,3 +63,19 @@ class TeacherStatisticsResponse(BaseModel):
     average_grade: float
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class CacheNamespaceStat(BaseModel):
+    local_hits: int
+    redis_hits: int
+    stale_hits: int = 0
+    misses: int
+
+
+class CacheStatisticsResponse(BaseModel):
+    """Response cache counters of the worker that answered (not cluster-wide)."""
+    local_entries: int
+    local_max_size: int
+    local_ttl: int
+    subscribed: bool
+    namespaces: dict[str, CacheNamespaceStat]
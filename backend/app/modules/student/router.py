@@ -3,7 +3,7 @@ import logging
 from core.db_helper import db_helper
 from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
 
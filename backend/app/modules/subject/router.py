@@ -5,7 +5,9 @@ from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.cache import cached, scoped_key_builder
+from dependence.cache_scope import subject_visibility
 
 from .repository import get_subject_repository
 from .schemas import (
@@ -43,7 +45,7 @@ async def create_subject(
 
 
 @router.get("/{subject_id}", response_model=SubjectCreateResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(expire=300, namespace="subjects", tags=("subjects:{subject_id}",), local=True)
 async def get_subject(
     subject_id: int,
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -55,7 +57,13 @@ async def get_subject(
 
 
 @router.get("/", response_model=SubjectListResponse)
-# @cache(expire=60, key_builder=custom_key_builder)
+@cached(
+    expire=300,
+    namespace="subjects",
+    tags=("subjects", "subject_teachers"),
+    key_builder=scoped_key_builder(subject_visibility),
+    local=True,
+)
 async def list_subjects(
     data: SubjectListRequest = Depends(),
     session: AsyncSession = Depends(db_helper.session_getter),
@@ -5,7 +5,8 @@ from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
+from core.cache import cached
 
 from .repository import get_teacher_repository
 from .schemas import (
@@ -146,6 +147,12 @@ async def get_teacher_assigned_groups(
     response_model=TeacherRankingResponse,
     summary="Teacher ranking — with optional filters",
 )
+@cached(
+    expire=300,
+    namespace="rankings",
+    tags=("teachers", "kafedras", "faculties", "group_teachers", "results"),
+    stampede_protection=True,
+)
 async def teacher_ranking_overall(
     faculty_id: int | None = None,
     kafedra_id: int | None = None,
@@ -182,6 +189,12 @@ async def teacher_ranking_overall(
     response_model=FacultyRankingResponse,
     summary="Faculty ranking — faculties ranked by avg student grade",
 )
+@cached(
+    expire=300,
+    namespace="rankings",
+    tags=("teachers", "kafedras", "faculties", "group_teachers", "results"),
+    stampede_protection=True,
+)
 async def faculty_ranking(
     page: int = 1,
     limit: int = 10,
@@ -118,7 +118,7 @@ class UserRepository:
     async def update_user(
         self, session: AsyncSession, user_id: int, data: UserUpdateRequest
     ) -> User:
-        stmt = select(User).where(User.id == user_id)
+        stmt = select(User).where(User.id == user_id).options(selectinload(User.roles))
         result = await session.execute(stmt)
         user = result.scalar_one_or_none()
 
@@ -249,9 +249,9 @@ class UserRepository:
     async def change_my_credentials(
         self, session: AsyncSession, current_user: User, data
     ) -> User:
-        from core.utils.password_hash import verify_password
+        from core.utils.password_hash import verify_password_async
         # Verify current password
-        if not verify_password(data.current_password, current_user.password):
+        if not await verify_password_async(data.current_password, current_user.password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Joriy parol noto'g'ri"
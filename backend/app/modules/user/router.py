@@ -5,7 +5,7 @@ from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, Header, status
 from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_cache.decorator import cache
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
 
 from .repository import get_user_repository
 from .schemas import (
@@ -4,7 +4,8 @@ from datetime import datetime, timedelta, timezone
 
 import jwt
 from core.config import settings
-from core.utils.password_hash import verify_password
+from core.permission_cache import encode_role_mask, permission_cache
+from core.utils.password_hash import verify_and_update_password
 from fastapi import HTTPException, status
 from app.models.user.model import User
 from sqlalchemy import select
@@ -12,6 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from app.models.teacher.model import Teacher
 from app.models.student.model import Student
+from app.models.user_role.model import UserRole
 
 from .schemas import UserLoginRequest, UserLoginResponse
 
@@ -29,12 +31,20 @@ class UserService:
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username"
             )
 
-        if not verify_password(data.password, user.password):
+        is_valid, new_hash = await verify_and_update_password(data.password, user.password)
+        if not is_valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password"
             )
 
-        access_token = self.create_access_token({"user_id": user.id})
+        if new_hash:
+            # Stored hash uses outdated cost parameters - upgrade it
+            user.password = new_hash
+            await session.commit()
+
+        access_token = self.create_access_token(
+            await self.build_access_claims(session, user.id)
+        )
         refresh_token = self.create_refresh_token({"user_id": user.id})
 
         return UserLoginResponse(
@@ -54,7 +64,9 @@ class UserService:
                 detail="Invalid authentication credentials",
             )
 
-        access_token = self.create_access_token({"user_id": user.id})
+        access_token = self.create_access_token(
+            await self.build_access_claims(session, user.id)
+        )
         refresh_token = self.create_refresh_token({"user_id": user.id})
 
         return UserLoginResponse(
@@ -84,6 +96,34 @@ class UserService:
 
         return user
 
+    async def build_access_claims(self, session: AsyncSession, user_id: int) -> dict:
+        """
+        Payload for an access token. When settings.auth.token_claims is on it
+        also carries a role bitmask ("rm"), the permission version ("pv") and
+        the student's group id ("gid"), so PermissionRequired can authorize
+        without a DB query until the permission version moves on.
+        """
+        claims = {"user_id": user_id}
+        if not settings.auth.token_claims:
+            return claims
+
+        # Read the version before the roles: a concurrent role change then
+        # marks the token as stale instead of baking in outdated roles.
+        version = await permission_cache.current_version()
+        if version is None:
+            return claims
+
+        role_stmt = select(UserRole.role_id).where(UserRole.user_id == user_id)
+        role_mask = encode_role_mask((await session.execute(role_stmt)).scalars().all())
+        if role_mask is None:
+            return claims
+
+        group_stmt = select(Student.group_id).where(Student.user_id == user_id)
+        group_id = (await session.execute(group_stmt)).scalars().first()
+
+        claims.update({"rm": role_mask, "pv": version, "gid": group_id})
+        return claims
+
     def token_decode(self, token: str) -> dict:
         payload = jwt.decode(
             token, settings.jwt.access_token_secret, algorithms=[settings.jwt.algorithm]
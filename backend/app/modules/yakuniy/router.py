@@ -4,7 +4,7 @@ from core.db_helper import db_helper
 from dependence.role_checker import PermissionRequired
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi_limiter.depends import RateLimiter
+from core.rate_limit import RateLimiter
 
 from .repository import get_yakuniy_repository
 from .schemas import (
@@ -1,3 +1,4 @@
+import pytest
 import pytest_asyncio
 from core.config import settings
 from core.db_helper import db_helper
@@ -214,3 +215,45 @@ async def test_teacher(auth_client, test_kafedra):
     response = await auth_client.post("/teacher/", json=payload)
     assert response.status_code == 201
     return response.json()
+
+
+@pytest.fixture
+def untokened_submit(monkeypatch):
+    """Accept end_quiz without an attempt token (legacy clients)."""
+    monkeypatch.setattr(settings.quiz, "allow_untokened_submit", True)
+
+
+@pytest_asyncio.fixture
+async def test_quiz_with_questions(async_db, test_subject):
+    """Active quiz (PIN 4321) with 3 linked questions; option_a is correct."""
+    from app.models.question.model import Question
+    from app.models.quiz.model import Quiz
+    from app.models.quiz_questions.model import QuizQuestion
+
+    questions = [
+        Question(
+            text=f"Question {i}",
+            option_a=f"A{i}",
+            option_b=f"B{i}",
+            option_c=f"C{i}",
+            option_d=f"D{i}",
+            subject_id=test_subject.id,
+        )
+        for i in range(3)
+    ]
+    quiz = Quiz(
+        title="Fixture Quiz",
+        subject_id=test_subject.id,
+        question_number=3,
+        duration=10,
+        is_active=True,
+        pin="4321",
+    )
+    async_db.add_all([quiz, *questions])
+    await async_db.commit()
+
+    async_db.add_all(
+        [QuizQuestion(quiz_id=quiz.id, question_id=q.id) for q in questions]
+    )
+    await async_db.commit()
+    return {"quiz": quiz, "questions": questions}
@@ -0,0 +1,262 @@
+import asyncio
+
+import pytest
+from app.modules.question.router import get_question
+from core.cache import cache_tag_key, clear_cache, get_redis, tagged_cache
+
+
+async def wait_for_invalidation():
+    while tagged_cache.has_pending_invalidations:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_cached_question_is_invalidated_by_tag(auth_client, test_subject):
+    """
+    A cached response is registered under its tags; committing a change to
+    the row drops it (and the tag set) without scanning the keyspace.
+    """
+    users_resp = await auth_client.get("/user/")
+    user_id = users_resp.json()["users"][0]["id"]
+    payload = {
+        "subject_id": test_subject.id,
+        "user_id": user_id,
+        "text": "Original Question",
+        "option_a": "A",
+        "option_b": "B",
+        "option_c": "C",
+        "option_d": "D",
+    }
+    create_resp = await auth_client.post("/question/", json=payload)
+    question_id = create_resp.json()["id"]
+    await wait_for_invalidation()
+
+    resp = await auth_client.get(f"/question/{question_id}")
+    assert resp.status_code == 200
+    assert resp.json()["text"] == "Original Question"
+
+    redis = get_redis()
+    row_tag = cache_tag_key(f"questions:{question_id}")
+    entries = await redis.smembers(row_tag)
+    assert len(entries) == 1
+    (entry_key,) = entries
+    assert await redis.exists(entry_key)
+    assert await redis.ttl(row_tag) >= await redis.ttl(entry_key)
+
+    # A hit returns the same body
+    resp_again = await auth_client.get(f"/question/{question_id}")
+    assert resp_again.json() == resp.json()
+
+    update_resp = await auth_client.put(
+        f"/question/{question_id}", json={**payload, "text": "Updated Question"}
+    )
+    assert update_resp.status_code == 200
+    await wait_for_invalidation()
+
+    assert not await redis.exists(entry_key)
+    assert not await redis.exists(row_tag)
+    resp = await auth_client.get(f"/question/{question_id}")
+    assert resp.json()["text"] == "Updated Question"
+
+
+@pytest.mark.asyncio
+async def test_clear_cache_drops_function_entries(auth_client, test_subject):
+    users_resp = await auth_client.get("/user/")
+    user_id = users_resp.json()["users"][0]["id"]
+    create_resp = await auth_client.post(
+        "/question/",
+        json={
+            "subject_id": test_subject.id,
+            "user_id": user_id,
+            "text": "Question",
+            "option_a": "A",
+            "option_b": "B",
+            "option_c": "C",
+            "option_d": "D",
+        },
+    )
+    question_id = create_resp.json()["id"]
+    await wait_for_invalidation()
+    await auth_client.get(f"/question/{question_id}")
+
+    redis = get_redis()
+    (entry_key,) = await redis.smembers(cache_tag_key(f"questions:{question_id}"))
+    await clear_cache(get_question)
+    assert not await redis.exists(entry_key)
+
+
+@pytest.mark.asyncio
+async def test_scoped_keys_share_entries_between_equal_scopes(async_db):
+    """
+    List keys depend on what the caller can see, not on who they are:
+    callers with the same scope share an entry, other scopes never do.
+    """
+    from app.models.role.model import Role
+    from app.models.user.model import User
+    from app.modules.group.router import list_groups
+    from app.modules.group.schemas import GroupListRequest
+    from core.cache import scoped_key_builder
+    from dependence.cache_scope import group_visibility
+
+    build_key = scoped_key_builder(group_visibility)
+
+    async def key_for(user, **filters):
+        return await build_key(
+            list_groups,
+            "",
+            data=GroupListRequest(**filters),
+            session=async_db,
+            current_user=user,
+        )
+
+    admin_a = User(id=1001, username="admin_a", roles=[Role(name="Admin")])
+    admin_b = User(id=1002, username="admin_b", roles=[Role(name="admin")])
+    teacher_a = User(id=1003, username="teacher_a", roles=[Role(name="Teacher")])
+    teacher_b = User(id=1004, username="teacher_b", roles=[Role(name="Teacher")])
+    student = User(id=1005, username="student", roles=[Role(name="Student")])
+
+    assert await key_for(admin_a) == await key_for(admin_b)
+    # Neither teacher has groups assigned, so they see the same rows
+    assert await key_for(teacher_a) == await key_for(teacher_b)
+    keys = {await key_for(admin_a), await key_for(teacher_a), await key_for(student)}
+    assert len(keys) == 3
+    assert await key_for(admin_a, name="SE") != await key_for(admin_a)
+
+
+@pytest.mark.asyncio
+async def test_local_tier_serves_hits_and_follows_invalidations(auth_client, test_faculty):
+    """
+    Reference data is served from the in-process tier once cached, and an
+    invalidation announced on the pub/sub channel drops it in every worker.
+    """
+    from core.cache import LocalCache, local_cache
+
+    other_worker = LocalCache(max_size=10, ttl=30)
+    await local_cache.start()
+    await other_worker.start()
+    try:
+        while not (local_cache.is_active and other_worker.is_active):
+            await asyncio.sleep(0.01)
+        await wait_for_invalidation()
+        faculty_id = test_faculty["id"]
+
+        before = local_cache.stats()["namespaces"].get(
+            "faculties", {"local_hits": 0, "redis_hits": 0, "misses": 0}
+        )
+        first = await auth_client.get(f"/faculty/{faculty_id}")
+        second = await auth_client.get(f"/faculty/{faculty_id}")
+        assert second.json() == first.json()
+        after = local_cache.stats()["namespaces"]["faculties"]
+        assert after["misses"] == before["misses"] + 1
+        assert after["local_hits"] == before["local_hits"] + 1
+
+        other_worker.set("other-entry", {"id": faculty_id}, 30, [f"faculties:{faculty_id}"])
+        update_resp = await auth_client.put(
+            f"/faculty/{faculty_id}", json={"name": "Renamed Faculty"}
+        )
+        assert update_resp.status_code == 200
+        await wait_for_invalidation()
+        for _ in range(100):
+            if other_worker.get("other-entry") is None:
+                break
+            await asyncio.sleep(0.01)
+        assert other_worker.get("other-entry") is None
+
+        resp = await auth_client.get(f"/faculty/{faculty_id}")
+        assert resp.json()["name"] == "renamed faculty"
+    finally:
+        await other_worker.stop()
+        await local_cache.stop()
+
+
+@pytest.mark.asyncio
+async def test_stampede_protection_serves_stale_while_locked(auth_client, test_faculty):
+    """
+    An expired protected entry is recomputed by the lock holder only; other
+    callers keep getting the stale value until the new one is stored.
+    """
+    from app.modules.teacher.router import faculty_ranking
+    from core.cache import cache_coder, function_tag, local_cache
+
+    await wait_for_invalidation()
+    resp = await auth_client.get("/teacher/ranking/faculty")
+    assert resp.status_code == 200
+    assert resp.json()["total"] == 1
+
+    redis = get_redis()
+    # Protected entries register in the ":protected" tag sets
+    (entry_key,) = await redis.smembers(
+        cache_tag_key(function_tag(faculty_ranking)) + ":protected"
+    )
+    entry = cache_coder.decode(await tagged_cache.get(entry_key))
+    # Kept past its expiry so it can be served while recomputed
+    assert await redis.ttl(entry_key) > 300
+
+    # The entry has expired and another worker is recomputing it
+    entry["expires_at"] = 0
+    entry["value"]["total"] = 999
+    await redis.set(entry_key, cache_coder.encode(entry), ex=600)
+    await redis.set(f"{entry_key}:lock", "other-worker", ex=30)
+
+    stale_before = local_cache.stats()["namespaces"]["rankings"]["stale_hits"]
+    resp = await auth_client.get("/teacher/ranking/faculty")
+    assert resp.json()["total"] == 999
+    assert local_cache.stats()["namespaces"]["rankings"]["stale_hits"] == stale_before + 1
+    # The other worker's lock is left alone
+    assert await redis.get(f"{entry_key}:lock") == "other-worker"
+
+    # Once the lock is free, the next reader recomputes and releases it
+    await redis.delete(f"{entry_key}:lock")
+    resp = await auth_client.get("/teacher/ranking/faculty")
+    assert resp.json()["total"] == 1
+    assert cache_coder.decode(await tagged_cache.get(entry_key))["expires_at"] > 0
+    assert not await redis.exists(f"{entry_key}:lock")
+
+
+@pytest.mark.asyncio
+async def test_invalidated_protected_entry_stays_servable(auth_client, test_faculty):
+    """
+    A tag invalidation moves a protected entry to its stale key: readers get
+    the stale value while another worker recomputes, and callers with
+    nothing to serve wait for that worker instead of computing as well.
+    """
+    from app.modules.teacher.router import faculty_ranking
+    from core.cache import function_tag, local_cache, stale_key
+
+    await wait_for_invalidation()
+    resp = await auth_client.get("/teacher/ranking/faculty")
+    assert resp.json()["total"] == 1
+
+    redis = get_redis()
+    (entry_key,) = await redis.smembers(
+        cache_tag_key(function_tag(faculty_ranking)) + ":protected"
+    )
+    await redis.set(f"{entry_key}:lock", "other-worker", ex=30)
+
+    await tagged_cache.invalidate(["results"])
+    assert not await redis.exists(entry_key)
+    assert await redis.exists(stale_key(entry_key))
+
+    stale_before = local_cache.stats()["namespaces"]["rankings"]["stale_hits"]
+    resp = await auth_client.get("/teacher/ranking/faculty")
+    assert resp.json()["total"] == 1
+    assert local_cache.stats()["namespaces"]["rankings"]["stale_hits"] == stale_before + 1
+
+    # Nothing to serve: the request waits while the lock is held
+    await redis.delete(stale_key(entry_key))
+    waiting = asyncio.create_task(auth_client.get("/teacher/ranking/faculty"))
+    await asyncio.sleep(0.3)
+    assert not waiting.done()
+    assert not await redis.exists(entry_key)
+
+    # The other worker gave up: the waiter takes over the recompute
+    await redis.delete(f"{entry_key}:lock")
+    resp = await asyncio.wait_for(waiting, timeout=5)
+    assert resp.json()["total"] == 1
+    assert await redis.exists(entry_key)
+    assert not await redis.exists(f"{entry_key}:lock")
+
+    # clear_cache drops protected entries outright
+    await clear_cache(faculty_ranking)
+    assert not await redis.exists(entry_key)
+    assert not await redis.exists(stale_key(entry_key))
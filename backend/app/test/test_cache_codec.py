@@ -0,0 +1,56 @@
+import zlib
+
+import pytest
+from core.cache_codec import MAGIC, CacheCodecError, CacheCoder
+
+
+def test_small_payloads_are_stored_uncompressed():
+    coder = CacheCoder(serializer="json", compressor="zlib", threshold=1024)
+    value = {"total": 1, "items": [{"id": 1, "name": "Mathematics"}]}
+
+    raw = coder.encode(value)
+    assert raw[0] == MAGIC
+    assert raw[3] == 0  # "none"
+    assert coder.decode(raw) == value
+
+
+def test_large_payloads_are_compressed_and_self_describing():
+    coder = CacheCoder(serializer="json", compressor="zlib", threshold=1024)
+    value = {"questions": [{"id": i, "text": "<p>Question text</p>" * 10} for i in range(50)]}
+
+    raw = coder.encode(value)
+    assert raw[3] == 1  # "zlib"
+    assert len(raw) < len(str(value)) / 5
+    # Decoding follows the entry header, not the reader's settings
+    reader = CacheCoder(serializer="json", compressor="none", threshold=10**9)
+    assert reader.decode(raw) == value
+
+
+def test_legacy_and_unknown_entries():
+    coder = CacheCoder(serializer="json", compressor="zlib", threshold=1024)
+    # Plain JSON entries written before the header existed
+    assert coder.decode('{"value": 1}') == {"value": 1}
+
+    unknown = bytes((MAGIC, 1, 1, 250)) + zlib.compress(b"{}")
+    with pytest.raises(CacheCodecError):
+        coder.decode(unknown)
+
+
+def test_missing_codecs_fall_back():
+    coder = CacheCoder(serializer="not-installed", compressor="not-installed", threshold=0)
+    raw = coder.encode([1, 2, 3])
+    assert raw[2:4] == bytes((1, 1))  # json, zlib
+    assert coder.decode(raw) == [1, 2, 3]
+
+
+def test_default_codecs_round_trip():
+    pytest.importorskip("orjson")
+    pytest.importorskip("zstandard")
+    coder = CacheCoder(serializer="orjson", compressor="zstd", threshold=1024)
+    value = {"items": [{"id": i, "name": "Mathematics" * 10} for i in range(50)]}
+
+    raw = coder.encode(value)
+    assert raw[2:4] == bytes((2, 2))  # orjson, zstd
+    assert CacheCoder(serializer="json", compressor="zlib", threshold=1024).decode(raw) == value
+    # Non-str keys are stringified, as json.dumps does
+    assert coder.decode(coder.encode({1: "a"})) == {"1": "a"}
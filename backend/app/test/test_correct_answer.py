@@ -3,6 +3,7 @@ from app.models.user_answers.model import UserAnswers
 from sqlalchemy import select
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("untokened_submit")
 async def test_end_quiz_check_correct_answer(auth_client, test_subject, test_group, async_db):
     users_resp = await auth_client.get("/user/")
     user_id = users_resp.json()["users"][0]["id"]
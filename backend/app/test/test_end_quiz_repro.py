@@ -52,6 +52,7 @@ async def setup_quiz_execution(auth_client, async_db, test_subject, test_user):
     }
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("untokened_submit")
 async def test_end_quiz_error_reproduction(setup_quiz_execution, auth_client):
     data = setup_quiz_execution
     
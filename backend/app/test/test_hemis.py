@@ -1,4 +1,6 @@
 
+import asyncio
+
 import pytest
 
 
@@ -59,3 +61,372 @@ async def test_hemis_login_external_success(async_client):
         assert response.status_code in [400, 401, 503]
         data = response.json()
         assert "detail" in data
+
+
+def _stub_hemis_app(calls: dict, fail: dict, profiles: dict | None = None):
+    """Local stand-in for the HEMIS API (login + me); password "secret"."""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+
+    stub = FastAPI()
+
+    @stub.post("/auth/login")
+    async def login(request: Request):
+        calls["login"] = calls.get("login", 0) + 1
+        if fail.get("slow"):
+            await asyncio.sleep(30)
+        if fail.get("down"):
+            return JSONResponse({"success": False}, status_code=502)
+        body = await request.json()
+        if body["password"] != "secret":
+            return JSONResponse({"success": False}, status_code=401)
+        return {"success": True, "data": {"token": f"stub-{body['login']}"}}
+
+    @stub.get("/account/me")
+    async def me(request: Request):
+        calls["me"] = calls.get("me", 0) + 1
+        login = request.headers["Authorization"].removeprefix("Bearer stub-")
+        default = {"full_name": "Stub Student", "group": {"name": "7A-23KT"}}
+        return {"success": True, "data": (profiles or {}).get(login, default)}
+
+    return stub
+
+
+@pytest.fixture
+def hemis_stub(monkeypatch):
+    """Points the app's HEMIS client at the stub; yields (calls, profiles)."""
+    import httpx
+    from app.modules.hemis import service as app_service
+    from core.config import settings
+    from modules.hemis import service
+    from modules.hemis.client import HemisClient
+
+    calls, profiles = {}, {}
+    config = settings.hemis.model_copy(
+        update={
+            "login_url": "http://hemis.test/auth/login",
+            "me_url": "http://hemis.test/account/me",
+        }
+    )
+    client = HemisClient(
+        config,
+        transport=httpx.ASGITransport(app=_stub_hemis_app(calls, {}, profiles)),
+    )
+    # The app and the tests import the service under different module names
+    monkeypatch.setattr(app_service, "hemis_client", client)
+    monkeypatch.setattr(service, "hemis_client", client)
+    return calls, profiles
+
+
+@pytest.mark.asyncio
+async def test_hemis_client_circuit_breaker():
+    """
+    The shared HEMIS client talks to a stub server, does not trip on bad
+    credentials, and fails fast once the upstream keeps returning 5xx.
+    """
+    import httpx
+    from fastapi import HTTPException
+    from core.config import settings
+    from modules.hemis.client import HemisClient
+
+    calls, fail = {}, {}
+    config = settings.hemis.model_copy(
+        update={
+            "login_url": "http://hemis.test/auth/login",
+            "me_url": "http://hemis.test/account/me",
+            "breaker_failure_threshold": 2,
+            "breaker_reset_timeout": 60,
+        }
+    )
+    client = HemisClient(
+        config, transport=httpx.ASGITransport(app=_stub_hemis_app(calls, fail))
+    )
+    try:
+        me_data = await client.fetch_me("student", "secret")
+        assert me_data["full_name"] == "Stub Student"
+
+        # Wrong password: client error, breaker stays closed
+        with pytest.raises(HTTPException) as exc:
+            await client.fetch_me("student", "wrong")
+        assert exc.value.status_code == 400
+        assert client.is_available
+
+        # Upstream down: breaker opens after the threshold
+        fail["down"] = True
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await client.fetch_me("student", "secret")
+        assert not client.is_available
+
+        # Open breaker: rejected without reaching the server
+        calls_before = calls["login"]
+        with pytest.raises(HTTPException) as exc:
+            await client.fetch_me("student", "secret")
+        assert exc.value.status_code == 503
+        assert calls["login"] == calls_before
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_hemis_client_cancelled_trial_does_not_lock_breaker():
+    """
+    A half-open trial request that is cancelled (the caller went away) must
+    not leave the breaker open: the next call becomes the new trial.
+    """
+    import httpx
+    from core.config import settings
+    from modules.hemis.client import HemisClient
+
+    calls, fail = {}, {"down": True}
+    config = settings.hemis.model_copy(
+        update={
+            "login_url": "http://hemis.test/auth/login",
+            "me_url": "http://hemis.test/account/me",
+            "breaker_failure_threshold": 1,
+            "breaker_reset_timeout": 0.05,
+        }
+    )
+    client = HemisClient(
+        config, transport=httpx.ASGITransport(app=_stub_hemis_app(calls, fail))
+    )
+    try:
+        with pytest.raises(Exception):
+            await client.fetch_me("student", "secret")
+        assert not client.is_available
+        await asyncio.sleep(0.1)
+
+        # The trial hangs upstream and is cancelled
+        fail.update(down=False, slow=True)
+        trial = asyncio.create_task(client.fetch_me("student", "secret"))
+        while not client.breaker.is_half_open:
+            await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert client.is_available
+
+        fail["slow"] = False
+        me_data = await client.fetch_me("student", "secret")
+        assert me_data["full_name"] == "Stub Student"
+        assert not client.breaker.is_half_open
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_hemis_login_served_from_profile_cache(async_client, hemis_stub):
+    """
+    Rejected credentials are answered from Redis without calling HEMIS. A
+    cached `me` payload saves the profile fetch, but never the password
+    check: a wrong password is refused even while the profile is cached.
+    """
+    from modules.hemis.cache import hemis_profile_cache
+
+    calls, _ = hemis_stub
+
+    # Rejected credentials: fail fast from the negative cache
+    await hemis_profile_cache.set_rejected("cached_student", "wrong")
+    response = await async_client.post(
+        "/hemis/login", json={"login": "cached_student", "password": "wrong"}
+    )
+    assert response.status_code == 400
+    assert calls.get("login", 0) == 0
+
+    await hemis_profile_cache.set(
+        "cached_student",
+        {"full_name": "Cached Student Aka", "group": {"name": "7A-23KT"}},
+    )
+    response = await async_client.post(
+        "/hemis/login", json={"login": "cached_student", "password": "guess"}
+    )
+    assert response.status_code == 400
+    assert calls["login"] == 1
+
+    # Correct password: HEMIS checks it, the profile comes from the cache
+    response = await async_client.post(
+        "/hemis/login", json={"login": "cached_student", "password": "secret"}
+    )
+    assert response.status_code == 200
+    assert "access_token" in response.json()
+    assert calls["login"] == 2
+    assert calls.get("me", 0) == 0
+
+
+@pytest.mark.asyncio
+async def test_hemis_preview_uses_profile_cache(auth_client, hemis_stub):
+    """
+    The admin preview writes nothing and is served the cached profile; a
+    sync fetches the current one from HEMIS.
+    """
+    from modules.hemis.cache import hemis_profile_cache
+
+    calls, profiles = hemis_stub
+    cached = {"full_name": "Cached Student Aka", "group": {"name": "7A-23KT"}}
+    profiles["preview_student"] = {**cached, "full_name": "Current Student Aka"}
+    await hemis_profile_cache.set("preview_student", cached)
+    credentials = {"login": "preview_student", "password": "secret"}
+
+    response = await auth_client.post("/hemis/preview", json=credentials)
+    assert response.status_code == 200
+    assert response.json()["hemis_data"]["full_name"] == "Cached Student Aka"
+    assert calls["login"] == 1
+    assert calls.get("me", 0) == 0
+
+    # The password is still checked by HEMIS
+    response = await auth_client.post(
+        "/hemis/preview", json={**credentials, "password": "wrong"}
+    )
+    assert response.status_code == 400
+
+    response = await auth_client.post("/hemis/sync", json=credentials)
+    assert response.status_code == 200
+    assert calls["me"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hemis_profile_sync_skips_unchanged(async_client, async_db, hemis_stub):
+    """
+    Re-syncing an identical HEMIS profile writes nothing; a changed profile
+    only updates the columns that differ.
+    """
+    from sqlalchemy import select
+    from app.models.student.model import Student
+    from modules.hemis.cache import hemis_profile_cache
+    from modules.hemis.service import hemis_service
+
+    me_data = {
+        "full_name": "Karimov Aziz Akmal o'g'li",
+        "phone": "+998901234567",
+        "group": {"name": "7A-23KT"},
+        "faculty": {"name": "Kompyuter injiniringi"},
+    }
+    await hemis_profile_cache.set("fp_student", me_data)
+    response = await async_client.post(
+        "/hemis/login", json={"login": "fp_student", "password": "secret"}
+    )
+    assert response.status_code == 200
+
+    student = (await async_db.execute(select(Student))).scalar_one()
+    fingerprint = student.hemis_fingerprint
+    updated_at = student.updated_at
+    assert fingerprint
+
+    # Same payload: nothing is written
+    await hemis_service.save_user_data(async_db, "fp_student", "secret", me_data)
+    await async_db.refresh(student)
+    assert student.hemis_fingerprint == fingerprint
+    assert student.updated_at == updated_at
+
+    # Changed payload: only the phone differs
+    me_data["phone"] = "+998907654321"
+    await hemis_service.save_user_data(async_db, "fp_student", "secret", me_data)
+    await async_db.refresh(student)
+    assert student.phone == "+998907654321"
+    assert student.full_name == "Karimov Aziz Akmal o'g'li"
+    assert student.hemis_fingerprint != fingerprint
+
+
+@pytest.mark.asyncio
+async def test_hemis_audit_sink_flushes_batches(async_db_engine, async_db):
+    """
+    Audit rows are queued in memory and written in batches; stopping the
+    sink drains whatever is left.
+    """
+    from sqlalchemy import func, select
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.models.hemis_transaction.model import HemisTransaction
+    from modules.hemis.audit import HemisAuditSink
+
+    sink = HemisAuditSink(
+        batch_size=2,
+        flush_interval=60,
+        max_buffer=100,
+        session_factory=async_sessionmaker(bind=async_db_engine),
+    )
+    await sink.start()
+    for i in range(3):
+        sink.record(
+            {
+                "user_id": None,
+                "student_id": None,
+                "login": f"audit_{i}",
+                "login_type": "hemis_api",
+                "status": "failed",
+                "ip_address": None,
+                "user_agent": None,
+                "error_message": "Hemis login failed",
+            }
+        )
+    await sink.stop()
+
+    count = await async_db.scalar(select(func.count()).select_from(HemisTransaction))
+    assert count == 3
+
+
+@pytest.mark.asyncio
+async def test_hemis_bulk_sync_job(auth_client, async_db_engine, async_db, hemis_stub):
+    """
+    A bulk sync job saves every fetched profile, records rejected logins as
+    errors and reports its progress. Profiles are fetched from HEMIS, not
+    from the login cache.
+    """
+    from sqlalchemy import func, select
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.models.student.model import Student
+    from modules.hemis.bulk_sync import HemisBulkSyncService
+    from modules.hemis.cache import hemis_profile_cache
+    from modules.hemis.schemas import HemisLoginRequest
+
+    calls, profiles = hemis_stub
+    items = []
+    for i in range(5):
+        login = f"bulk_{i}"
+        profiles[login] = {"full_name": f"Student {i}", "group": {"name": "7A-23KT"}}
+        # A stale cached profile is not used by the admin sync
+        await hemis_profile_cache.set(login, {"full_name": "Stale", "group": {}})
+        items.append(HemisLoginRequest(login=login, password="secret"))
+    items.append(HemisLoginRequest(login="bulk_bad", password="wrong"))
+
+    service = HemisBulkSyncService(
+        concurrency=2,
+        batch_size=4,
+        job_ttl=60,
+        session_factory=async_sessionmaker(bind=async_db_engine, expire_on_commit=False),
+    )
+    job = await service.start_job(items)
+    await asyncio.gather(*service._tasks)
+
+    # Finished jobs are served from Redis only
+    assert not service._jobs
+    job = await service.get_job(job.job_id)
+    assert job.status == "completed"
+    assert (job.total, job.processed, job.succeeded, job.failed) == (6, 6, 5, 1)
+    assert job.errors[0].login == "bulk_bad"
+
+    count = await async_db.scalar(select(func.count()).select_from(Student))
+    assert count == 5
+    assert calls["me"] == 5
+    names = (await async_db.scalars(select(Student.full_name))).all()
+    assert "Stale" not in names
+
+    # Unknown job
+    response = await auth_client.get("/hemis/sync/jobs/unknown")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_group_normalized_key(async_db, test_faculty):
+    """
+    Spelling variants of a group name resolve to one group via its
+    normalized key instead of creating duplicates.
+    """
+    from modules.hemis.service import hemis_service
+
+    group = await hemis_service.get_or_create_group(async_db, "7A-23KT", test_faculty["id"])
+    assert group.name == "7 a-23 kt"
+    assert group.name_key == "7a-23kt"
+
+    for variant in ("7a-23kt", "7 A-23 KT", " 7a-23 kt "):
+        same = await hemis_service.get_or_create_group(async_db, variant, test_faculty["id"])
+        assert same.id == group.id
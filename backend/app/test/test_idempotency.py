@@ -0,0 +1,65 @@
+import jwt
+import pytest
+from core.config import settings
+from sqlalchemy import func, select
+from app.models.quiz.model import Quiz
+
+
+@pytest.mark.asyncio
+async def test_create_quiz_idempotency_key(auth_client, async_db, test_subject, test_group):
+    """
+    A repeated request with the same Idempotency-Key gets the first response
+    back without creating another quiz; reusing the key for a different
+    request is rejected.
+    """
+    users_resp = await auth_client.get("/user/")
+    user_id = users_resp.json()["users"][0]["id"]
+
+    payload = {
+        "title": "Idempotent Quiz",
+        "question_number": 10,
+        "duration": 60,
+        "pin": "1234",
+        "user_id": user_id,
+        "group_id": test_group["id"],
+        "subject_id": test_subject.id,
+        "is_active": True
+    }
+    headers = {"Idempotency-Key": "create-quiz-1"}
+
+    first = await auth_client.post("/quiz/", json=payload, headers=headers)
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+
+    second = await auth_client.post("/quiz/", json=payload, headers=headers)
+    assert second.status_code == 201
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.json()
+
+    count = await async_db.scalar(
+        select(func.count()).select_from(Quiz).where(Quiz.title == "Idempotent Quiz")
+    )
+    assert count == 1
+
+    # A new access token of the same user still finds the key
+    refreshed = jwt.encode(
+        {"user_id": user_id, "jti": "refreshed"},
+        settings.jwt.access_token_secret,
+        algorithm=settings.jwt.algorithm,
+    )
+    replayed = await auth_client.post(
+        "/quiz/", json=payload, headers={**headers, "Authorization": refreshed}
+    )
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert replayed.json() == first.json()
+
+    # Same key, different body
+    other = await auth_client.post(
+        "/quiz/", json={**payload, "title": "Other Quiz"}, headers=headers
+    )
+    assert other.status_code == 422
+
+    # Without the header every request runs
+    third = await auth_client.post("/quiz/", json=payload)
+    assert third.status_code == 201
+    assert third.json()["id"] != first.json()["id"]
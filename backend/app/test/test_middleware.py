@@ -0,0 +1,109 @@
+import jwt
+import pytest
+from fastapi import Depends, FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+from app.dependence import role_checker
+from app.middleware import logging_middleware
+from app.middleware.force_https import ForceHTTPSMiddleware
+from app.middleware.logging_middleware import LoggingMiddleware
+from core.config import settings
+from core.utils.access_token import DecodedToken, decode_access_token
+
+
+def _token(user_id: int) -> str:
+    return jwt.encode(
+        {"user_id": user_id}, settings.jwt.access_token_secret, algorithm=settings.jwt.algorithm
+    )
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(payload: dict = Depends(role_checker.get_token_payload)):
+        return {"user_id": payload["user_id"]}
+
+    @app.get("/scheme")
+    async def scheme(request: Request):
+        return {"scheme": request.url.scheme}
+
+    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(ForceHTTPSMiddleware)
+    return app
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    """Counts access token verifications in the middleware and the dependency."""
+    calls = []
+
+    def counting_decode(authorization: str) -> DecodedToken:
+        calls.append(authorization)
+        return decode_access_token(authorization)
+
+    monkeypatch.setattr(logging_middleware, "decode_access_token", counting_decode)
+    monkeypatch.setattr(role_checker, "decode_access_token", counting_decode)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_token_is_verified_once_per_request(decode_calls):
+    transport = ASGITransport(app=_app())
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/me", headers={"Authorization": _token(7)})
+        assert resp.status_code == 200
+        assert resp.json() == {"user_id": 7}
+        assert len(decode_calls) == 1
+
+        # Still rejected when the middleware could not verify it
+        resp = await client.get("/me", headers={"Authorization": "not-a-token"})
+        assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_token_payload_reverifies_a_different_header(decode_calls):
+    """A decoded token that does not belong to this header is not trusted."""
+    request = Request(
+        {
+            "type": "http",
+            "headers": [],
+            "state": {
+                "access_token": DecodedToken(raw="other", payload={"user_id": 1})
+            },
+        }
+    )
+    payload = await role_checker.get_token_payload(request, token=_token(2))
+    assert payload["user_id"] == 2
+    assert len(decode_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_scheme_is_forced_to_https():
+    transport = ASGITransport(app=_app())
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.get("/scheme")
+        assert resp.json() == {"scheme": "https"}
+
+
+@pytest.mark.asyncio
+async def test_streaming_responses_pass_through_unbuffered():
+    """Each body chunk reaches the server before the app sends the next one."""
+    events = []
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for chunk in (b"first", b"second"):
+            events.append(f"app:{chunk.decode()}")
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message["body"]:
+            events.append(f"server:{message['body'].decode()}")
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    scope = {"type": "http", "method": "GET", "path": "/stream", "headers": []}
+    await LoggingMiddleware(streaming_app)(scope, receive, send)
+    assert events == ["app:first", "server:first", "app:second", "server:second"]
@@ -0,0 +1,90 @@
+import pytest
+from app.models.permission.model import Permission
+from app.models.role.model import Role
+from app.models.role_permission.model import RolePermission
+
+
+@pytest.mark.asyncio
+async def test_permission_cache_invalidated_on_assign(auth_client, async_client, async_db):
+    """
+    A cached "access denied" must not survive a role permission change.
+    """
+    permission = Permission(name="read:permission")
+    role = Role(name="Cache Reader")
+    async_db.add_all([permission, role])
+    await async_db.commit()
+
+    user_payload = {
+        "username": "cache_reader",
+        "password": "password123",
+        "roles": [{"name": "Cache Reader"}],
+    }
+    assert (await auth_client.post("/user/", json=user_payload)).status_code == 201
+    admin_token = auth_client.headers["Authorization"]
+
+    login_resp = await async_client.post(
+        "/user/login",
+        json={"username": "cache_reader", "password": "password123"},
+    )
+    reader_headers = {"Authorization": login_resp.json()["access_token"]}
+
+    # 1. No permission yet (second call is served from the cache)
+    for _ in range(2):
+        resp = await async_client.get("/permission/", headers=reader_headers)
+        assert resp.status_code == 403
+
+    # 2. Grant the permission as admin
+    resp = await async_client.post(
+        "/role/assign_permission",
+        json={"role_id": role.id, "permission_ids": [permission.id]},
+        headers={"Authorization": admin_token},
+    )
+    assert resp.status_code == 200
+
+    # 3. The change is visible immediately
+    resp = await async_client.get("/permission/", headers=reader_headers)
+    assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_token_claims_fall_back_when_stale(async_client, async_db, monkeypatch):
+    """
+    Tokens issued with role claims authorize statelessly, but a later role
+    change must be picked up from the database instead of the stale claims.
+    """
+    import jwt
+    from core.config import settings
+
+    monkeypatch.setattr(settings.auth, "token_claims", True)
+
+    permission = Permission(name="read:permission")
+    role = Role(name="Claims Reader")
+    async_db.add_all([permission, role])
+    await async_db.commit()
+
+    user_payload = {
+        "username": "claims_reader",
+        "password": "password123",
+        "roles": [{"name": "Claims Reader"}],
+    }
+    assert (await async_client.post("/user/", json=user_payload)).status_code == 201
+
+    login_resp = await async_client.post(
+        "/user/login",
+        json={"username": "claims_reader", "password": "password123"},
+    )
+    token = login_resp.json()["access_token"]
+    payload = jwt.decode(
+        token, settings.jwt.access_token_secret, algorithms=[settings.jwt.algorithm]
+    )
+    assert payload["rm"] == 1 << role.id
+    assert "pv" in payload
+
+    headers = {"Authorization": token}
+    assert (await async_client.get("/permission/", headers=headers)).status_code == 403
+
+    # Grant the permission: the token's "pv" is now stale
+    async_db.add(RolePermission(role_id=role.id, permission_id=permission.id))
+    await async_db.commit()
+
+    assert (await async_client.get("/permission/", headers=headers)).status_code == 200
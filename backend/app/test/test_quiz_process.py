@@ -1,4 +1,10 @@
+import base64
+import json
+
 import pytest
+from sqlalchemy import func, select
+from app.models.results.model import Result
+from app.models.user_answers.model import UserAnswers
 
 
 @pytest.mark.asyncio
@@ -57,6 +63,7 @@ async def test_start_quiz(auth_client, test_subject, test_group, async_db):
 
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("untokened_submit")
 async def test_end_quiz(auth_client, test_subject, test_group):
     # Setup
     users_resp = await auth_client.get("/user/")
@@ -116,3 +123,284 @@ async def test_end_quiz(auth_client, test_subject, test_group):
     assert response.status_code == 200
     data = response.json()
     assert "grade" in data
+
+
+@pytest.mark.asyncio
+async def test_end_quiz_with_attempt_token(auth_client, test_quiz_with_questions):
+    """
+    end_quiz verifies the attempt token from start_quiz and grades by the
+    index of the option as it was served.
+    """
+    quiz = test_quiz_with_questions["quiz"]
+    start_resp = await auth_client.post(
+        "/quiz_process/start_quiz", json={"quiz_id": quiz.id, "pin": "4321"}
+    )
+    assert start_resp.status_code == 200
+    start_data = start_resp.json()
+    token = start_data["attempt_token"]
+
+    # Answer the first question correctly (by index), the second wrongly
+    answers = []
+    for i, q in enumerate(start_data["questions"][:2]):
+        options = [q["option_a"], q["option_b"], q["option_c"], q["option_d"]]
+        correct = next(o for o in options if o.startswith("A"))
+        wrong = next(o for o in options if not o.startswith("A"))
+        chosen = correct if i == 0 else wrong
+        answers.append({"question_id": q["id"], "option_index": options.index(chosen)})
+
+    # A question that was not issued is rejected
+    bad_payload = {
+        "quiz_id": quiz.id,
+        "attempt_token": token,
+        "answers": answers + [{"question_id": 999999, "option_index": 0}],
+    }
+    resp = await auth_client.post("/quiz_process/end_quiz", json=bad_payload)
+    assert resp.status_code == 400
+
+    # A tampered token is rejected
+    tampered = {"quiz_id": quiz.id, "attempt_token": token[:-2] + "xx", "answers": answers}
+    resp = await auth_client.post("/quiz_process/end_quiz", json=tampered)
+    assert resp.status_code == 400
+
+    payload = {"quiz_id": quiz.id, "attempt_token": token, "answers": answers}
+    resp = await auth_client.post("/quiz_process/end_quiz", json=payload)
+    assert resp.status_code == 200
+    data = resp.json()
+    # The third issued question was left unanswered
+    assert data["total_questions"] == 3
+    assert data["correct_answers"] == 1
+    assert data["wrong_answers"] == 2
+
+
+@pytest.mark.asyncio
+async def test_end_quiz_rejects_untokened_and_duplicate_answers(
+    auth_client, async_db, test_quiz_with_questions
+):
+    """
+    Without an attempt token end_quiz is refused (unless the legacy path is
+    enabled), and a question answered twice is refused rather than counted twice.
+    """
+    quiz = test_quiz_with_questions["quiz"]
+    questions = test_quiz_with_questions["questions"]
+
+    untokened = {
+        "quiz_id": quiz.id,
+        "answers": [{"question_id": q.id, "answer": q.option_a} for q in questions],
+    }
+    resp = await auth_client.post("/quiz_process/end_quiz", json=untokened)
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "attempt_token is required"
+
+    start_resp = await auth_client.post(
+        "/quiz_process/start_quiz", json={"quiz_id": quiz.id, "pin": "4321"}
+    )
+    start_data = start_resp.json()
+    q0 = start_data["questions"][0]
+    options = [q0["option_a"], q0["option_b"], q0["option_c"], q0["option_d"]]
+    correct = next(i for i, o in enumerate(options) if o.startswith("A"))
+    duplicated = {
+        "quiz_id": quiz.id,
+        "attempt_token": start_data["attempt_token"],
+        "answers": [{"question_id": q0["id"], "option_index": correct}] * 2,
+    }
+    resp = await auth_client.post("/quiz_process/end_quiz", json=duplicated)
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == f"Duplicate question_id: {q0['id']}"
+
+    count_results = select(func.count()).select_from(Result).where(
+        Result.quiz_id == quiz.id
+    )
+    assert (await async_db.execute(count_results)).scalar_one() == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("untokened_submit")
+async def test_end_quiz_saves_answers_and_result_together(
+    auth_client, async_db, test_quiz_with_questions
+):
+    """
+    end_quiz grades and stores the answers and the result in one statement;
+    an unknown question id stores nothing.
+    """
+    quiz = test_quiz_with_questions["quiz"]
+    questions = test_quiz_with_questions["questions"]
+    # The failed submit rolls back the shared session, expiring the fixtures
+    quiz_id, subject_id = quiz.id, quiz.subject_id
+    payload = {
+        "quiz_id": quiz_id,
+        "answers": [
+            {"question_id": q.id, "answer": q.option_a if i < 2 else q.option_b}
+            for i, q in enumerate(questions)
+        ],
+    }
+
+    bad_payload = {
+        "quiz_id": quiz_id,
+        "answers": [payload["answers"][0], {"question_id": 999999, "answer": "A"}],
+    }
+    resp = await auth_client.post("/quiz_process/end_quiz", json=bad_payload)
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Invalid question_id: 999999"
+
+    count_answers = select(func.count()).select_from(UserAnswers).where(
+        UserAnswers.quiz_id == quiz_id
+    )
+    assert (await async_db.execute(count_answers)).scalar_one() == 0
+
+    resp = await auth_client.post("/quiz_process/end_quiz", json=payload)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["correct_answers"] == 2
+    assert data["wrong_answers"] == 1
+    # 2/3 = 66% -> 3
+    assert data["grade"] == 3
+
+    assert (await async_db.execute(count_answers)).scalar_one() == 3
+    result = (
+        await async_db.execute(select(Result).where(Result.quiz_id == quiz_id))
+    ).scalar_one()
+    assert result.subject_id == subject_id
+    assert result.grade == 3
+
+
+@pytest.mark.asyncio
+async def test_end_quiz_stores_the_grade_of_the_chosen_option(
+    auth_client, async_db, test_quiz_with_questions
+):
+    """
+    A tokened submission is stored with the grade of the option index, even
+    when a wrong option has the same text as the correct one.
+    """
+    from modules.quiz_process.attempt_token import option_order
+
+    quiz_id = test_quiz_with_questions["quiz"].id
+    question = test_quiz_with_questions["questions"][0]
+    question.option_b = question.option_a
+    await async_db.commit()
+
+    start_resp = await auth_client.post(
+        "/quiz_process/start_quiz", json={"quiz_id": quiz_id, "pin": "4321"}
+    )
+    token = start_resp.json()["attempt_token"]
+    body = token.split(".")[0]
+    seed = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))["s"]
+    # The served position of option_b
+    wrong_index = option_order(seed, question.id).index(1)
+
+    resp = await auth_client.post(
+        "/quiz_process/end_quiz",
+        json={
+            "quiz_id": quiz_id,
+            "attempt_token": token,
+            "answers": [{"question_id": question.id, "option_index": wrong_index}],
+        },
+    )
+    assert resp.status_code == 200
+    assert resp.json()["correct_answers"] == 0
+
+    stored = (
+        await async_db.execute(
+            select(UserAnswers).where(UserAnswers.question_id == question.id)
+        )
+    ).scalar_one()
+    assert stored.answer == stored.correct_answer
+    assert stored.is_correct is False
+
+
+@pytest.mark.asyncio
+async def test_save_answer_then_end_quiz_from_buffer(auth_client, test_quiz_with_questions):
+    """
+    Answers autosaved with save_answer are buffered in Redis (latest wins)
+    and end_quiz finalizes from the buffer; saves after it are refused.
+    """
+    from core.cache import get_redis
+    from modules.quiz_process.answer_buffer import attempt_answers_key
+
+    quiz = test_quiz_with_questions["quiz"]
+    start_resp = await auth_client.post(
+        "/quiz_process/start_quiz", json={"quiz_id": quiz.id, "pin": "4321"}
+    )
+    start_data = start_resp.json()
+    token = start_data["attempt_token"]
+
+    def pick(q, correct):
+        options = [q["option_a"], q["option_b"], q["option_c"], q["option_d"]]
+        chosen = next(o for o in options if o.startswith("A") == correct)
+        return {"question_id": q["id"], "option_index": options.index(chosen)}
+
+    q0, q1, _ = start_data["questions"]
+
+    async def save(answers):
+        return await auth_client.post(
+            "/quiz_process/save_answer",
+            json={"quiz_id": quiz.id, "attempt_token": token, "answers": answers},
+        )
+
+    resp = await save([pick(q0, False)])
+    assert resp.status_code == 200
+    assert resp.json()["saved"] == 1
+    # Changing an answer replaces it
+    resp = await save([pick(q0, True), pick(q1, True)])
+    assert resp.json()["saved"] == 2
+
+    resp = await save([{"question_id": 999999, "option_index": 0}])
+    assert resp.status_code == 400
+
+    resp = await auth_client.post(
+        "/quiz_process/end_quiz",
+        json={"quiz_id": quiz.id, "attempt_token": token, "answers": []},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["correct_answers"] == 2
+    assert resp.json()["wrong_answers"] == 1
+
+    # The buffer is dropped once the attempt is stored
+    body = token.split(".")[0]
+    attempt_id = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))["aid"]
+    assert not await get_redis().exists(attempt_answers_key(attempt_id))
+
+    resp = await save([pick(q1, False)])
+    assert resp.status_code == 409
+    assert not await get_redis().exists(attempt_answers_key(attempt_id))
+
+
+@pytest.mark.asyncio
+async def test_failed_submit_keeps_the_attempt_open(
+    auth_client, async_db, test_quiz_with_questions, monkeypatch
+):
+    """
+    A submission that is not stored leaves the attempt open: autosaves
+    still go through and the attempt can be submitted again.
+    """
+    quiz_id = test_quiz_with_questions["quiz"].id
+    start_resp = await auth_client.post(
+        "/quiz_process/start_quiz", json={"quiz_id": quiz_id, "pin": "4321"}
+    )
+    start_data = start_resp.json()
+    token = start_data["attempt_token"]
+    q0 = start_data["questions"][0]
+    options = [q0["option_a"], q0["option_b"], q0["option_c"], q0["option_d"]]
+    answer = {
+        "question_id": q0["id"],
+        "option_index": next(i for i, o in enumerate(options) if o.startswith("A")),
+    }
+    submit = {"quiz_id": quiz_id, "attempt_token": token, "answers": []}
+
+    async def failing_commit():
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(async_db, "commit", failing_commit)
+    resp = await auth_client.post("/quiz_process/end_quiz", json=submit)
+    assert resp.status_code == 500
+    monkeypatch.undo()
+
+    resp = await auth_client.post(
+        "/quiz_process/save_answer",
+        json={"quiz_id": quiz_id, "attempt_token": token, "answers": [answer]},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["saved"] == 1
+
+    resp = await auth_client.post("/quiz_process/end_quiz", json=submit)
+    assert resp.status_code == 200
+    assert resp.json()["correct_answers"] == 1
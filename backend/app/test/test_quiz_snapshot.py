@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import select
+from app.models.quiz_questions.model import QuizQuestion
+
+
+@pytest.mark.asyncio
+async def test_start_quiz_snapshot_invalidated_on_change(auth_client, async_db, test_quiz_with_questions):
+    """
+    start_quiz is served from the cached snapshot, and editing a linked
+    question, the quiz, or its question links is visible on the next start.
+    """
+    quiz = test_quiz_with_questions["quiz"]
+    payload = {"quiz_id": quiz.id, "pin": "4321"}
+
+    resp = await auth_client.post("/quiz_process/start_quiz", json=payload)
+    assert resp.status_code == 200
+    assert {q["text"] for q in resp.json()["questions"]} == {
+        "Question 0", "Question 1", "Question 2"
+    }
+
+    # 1. Edit a linked question
+    question = test_quiz_with_questions["questions"][0]
+    question.text = "Question 0 (edited)"
+    await async_db.commit()
+
+    resp = await auth_client.post("/quiz_process/start_quiz", json=payload)
+    assert "Question 0 (edited)" in {q["text"] for q in resp.json()["questions"]}
+
+    # 2. Unlink a question
+    link = (
+        await async_db.execute(
+            select(QuizQuestion).where(QuizQuestion.question_id == question.id)
+        )
+    ).scalar_one()
+    await async_db.delete(link)
+    await async_db.commit()
+
+    resp = await auth_client.post("/quiz_process/start_quiz", json=payload)
+    assert len(resp.json()["questions"]) == 2
+
+    # 3. Deactivate the quiz
+    quiz.is_active = False
+    await async_db.commit()
+
+    resp = await auth_client.post("/quiz_process/start_quiz", json=payload)
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_start_quiz_fetches_only_sampled_questions(auth_client, async_db, test_quiz_with_questions):
+    """
+    The snapshot keeps only question ids; content is fetched and cached for
+    the sampled questions only.
+    """
+    from core.cache import get_redis
+    from modules.quiz_process.snapshot import QuizSnapshot, quiz_questions_key, quiz_snapshot_key
+
+    quiz = test_quiz_with_questions["quiz"]
+    quiz.question_number = 2
+    await async_db.commit()
+
+    resp = await auth_client.post(
+        "/quiz_process/start_quiz", json={"quiz_id": quiz.id, "pin": "4321"}
+    )
+    assert resp.status_code == 200
+    served = {q["id"] for q in resp.json()["questions"]}
+    assert len(served) == 2
+
+    redis = get_redis()
+    snapshot_keys = [k async for k in redis.scan_iter(match=quiz_snapshot_key(quiz.id, "*"))]
+    assert len(snapshot_keys) == 1
+    version = snapshot_keys[0].split(":v")[-1].split(":")[0]
+    snapshot = QuizSnapshot.from_json(await redis.get(snapshot_keys[0]), version)
+    assert set(snapshot.question_ids) == {q.id for q in test_quiz_with_questions["questions"]}
+
+    cached = await redis.hkeys(quiz_questions_key(quiz.id, version))
+    assert {int(q_id) for q_id in cached} == served
@@ -0,0 +1,156 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.models.results.model import Result
+from app.models.user_answers.model import UserAnswers
+from core.cache import get_redis
+from core.config import settings
+from modules.quiz_process.submission_queue import (
+    SUBMISSION_DEAD_LETTER_KEY,
+    SUBMISSION_GROUP,
+    SUBMISSION_STREAM_KEY,
+    SubmissionQueue,
+)
+
+
+@pytest.mark.asyncio
+async def test_end_quiz_write_behind(
+    auth_client, async_db_engine, async_db, test_quiz_with_questions, monkeypatch
+):
+    """
+    In write-behind mode end_quiz answers from memory and queues the
+    submission; a consumer persists it, including entries left pending by a
+    consumer that crashed, and replays never store a result twice.
+    """
+    monkeypatch.setattr(settings.quiz, "write_behind", True)
+    quiz = test_quiz_with_questions["quiz"]
+
+    start_resp = await auth_client.post(
+        "/quiz_process/start_quiz", json={"quiz_id": quiz.id, "pin": "4321"}
+    )
+    start_data = start_resp.json()
+    answers = []
+    for q in start_data["questions"][:2]:
+        options = [q["option_a"], q["option_b"], q["option_c"], q["option_d"]]
+        correct = next(o for o in options if o.startswith("A"))
+        answers.append({"question_id": q["id"], "option_index": options.index(correct)})
+    payload = {
+        "quiz_id": quiz.id,
+        "attempt_token": start_data["attempt_token"],
+        "answers": answers,
+    }
+
+    resp = await auth_client.post("/quiz_process/end_quiz", json=payload)
+    assert resp.status_code == 200
+    assert resp.json()["correct_answers"] == 2
+    # A repeated submit gets the same response and queues nothing
+    resp_again = await auth_client.post("/quiz_process/end_quiz", json=payload)
+    assert resp_again.json() == resp.json()
+
+    redis = get_redis()
+    assert await redis.xlen(SUBMISSION_STREAM_KEY) == 1
+    count_results = select(func.count()).select_from(Result).where(Result.quiz_id == quiz.id)
+    assert (await async_db.execute(count_results)).scalar_one() == 0
+
+    # A consumer reads the entry and dies before acknowledging it
+    queue = SubmissionQueue(
+        batch_size=10,
+        block_ms=100,
+        claim_idle_ms=0,
+        ttl=60,
+        session_factory=async_sessionmaker(bind=async_db_engine),
+        consumer_name="test-consumer",
+    )
+    await queue.ensure_group()
+    crashed = await redis.xreadgroup(
+        SUBMISSION_GROUP, "crashed-consumer", {SUBMISSION_STREAM_KEY: ">"}, count=10
+    )
+    entries = crashed[0][1]
+    assert len(entries) == 1
+
+    # The surviving consumer claims and persists it
+    await queue.start()
+    while await redis.xlen(SUBMISSION_STREAM_KEY):
+        await asyncio.sleep(0.05)
+    await queue.stop()
+
+    result = (
+        await async_db.execute(select(Result).where(Result.quiz_id == quiz.id))
+    ).scalar_one()
+    assert result.correct_answers == 2
+    assert result.wrong_answers == 1
+    assert result.attempt_id is not None
+    count_answers = select(func.count()).select_from(UserAnswers).where(
+        UserAnswers.quiz_id == quiz.id
+    )
+    assert (await async_db.execute(count_answers)).scalar_one() == 2
+
+    # Replaying the same entry does not store it again
+    await queue.persist(entries)
+    assert (await async_db.execute(count_results)).scalar_one() == 1
+    assert (await async_db.execute(count_answers)).scalar_one() == 2
+
+
+@pytest.mark.asyncio
+async def test_bad_submission_is_dead_lettered(
+    auth_client, async_db_engine, async_db, test_quiz_with_questions, monkeypatch
+):
+    """
+    An entry that can never be stored (its quiz no longer exists) does not
+    block the stream: after max_deliveries the batch is persisted entry by
+    entry, and the bad entry is parked on the dead-letter stream.
+    """
+    monkeypatch.setattr(settings.quiz, "write_behind", True)
+    quiz = test_quiz_with_questions["quiz"]
+
+    start_resp = await auth_client.post(
+        "/quiz_process/start_quiz", json={"quiz_id": quiz.id, "pin": "4321"}
+    )
+    start_data = start_resp.json()
+    resp = await auth_client.post(
+        "/quiz_process/end_quiz",
+        json={
+            "quiz_id": quiz.id,
+            "attempt_token": start_data["attempt_token"],
+            "answers": [],
+        },
+    )
+    assert resp.status_code == 200
+
+    redis = get_redis()
+    [(_, good_fields)] = await redis.xrange(SUBMISSION_STREAM_KEY)
+    bad = json.loads(good_fields["data"])
+    bad["id"] = "bad-submission"
+    bad["quiz_id"] = 999999  # violates quiz_attempts.quiz_id -> quizzes.id
+    bad_id = await redis.xadd(SUBMISSION_STREAM_KEY, {"data": json.dumps(bad)})
+
+    queue = SubmissionQueue(
+        batch_size=10,
+        block_ms=100,
+        claim_idle_ms=60000,
+        ttl=60,
+        max_deliveries=2,
+        session_factory=async_sessionmaker(bind=async_db_engine),
+        consumer_name="test-consumer",
+    )
+    await queue.start()
+    for _ in range(100):
+        if not await redis.xlen(SUBMISSION_STREAM_KEY):
+            break
+        await asyncio.sleep(0.1)
+    await queue.stop()
+
+    assert await redis.xlen(SUBMISSION_STREAM_KEY) == 0
+    pending = await redis.xpending(SUBMISSION_STREAM_KEY, SUBMISSION_GROUP)
+    assert pending["pending"] == 0
+    [(_, dead_fields)] = await redis.xrange(SUBMISSION_DEAD_LETTER_KEY)
+    assert dead_fields["entry_id"] == bad_id
+    assert json.loads(dead_fields["data"])["quiz_id"] == 999999
+    assert "IntegrityError" in dead_fields["error"]
+
+    # The good submission was stored regardless
+    count_results = select(func.count()).select_from(Result).where(Result.quiz_id == quiz.id)
+    assert (await async_db.execute(count_results)).scalar_one() == 1
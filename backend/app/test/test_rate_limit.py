@@ -0,0 +1,50 @@
+import jwt
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from core.config import settings
+from core.rate_limit import RateLimiter
+
+
+def _limited_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/limited/{item_id}", dependencies=[Depends(RateLimiter(times=2, seconds=60))])
+    async def limited(item_id: int):
+        return {"ok": True}
+
+    return app
+
+
+def _token(user_id: int) -> str:
+    return jwt.encode(
+        {"user_id": user_id}, settings.jwt.access_token_secret, algorithm=settings.jwt.algorithm
+    )
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_per_user_behind_one_ip():
+    """
+    Authenticated callers from the same IP have their own limits (per path);
+    anonymous callers are limited per IP.
+    """
+    transport = ASGITransport(app=_limited_app())
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        user_1 = {"Authorization": _token(1)}
+        user_2 = {"Authorization": _token(2)}
+
+        assert (await client.get("/limited/1", headers=user_1)).status_code == 200
+        assert (await client.get("/limited/1", headers=user_1)).status_code == 200
+        resp = await client.get("/limited/1", headers=user_1)
+        assert resp.status_code == 429
+        assert (await client.get("/limited/2", headers=user_1)).status_code == 200
+
+        # Same IP, different user
+        assert (await client.get("/limited/1", headers=user_2)).status_code == 200
+
+        # Anonymous: keyed on the IP
+        assert (await client.get("/limited/1")).status_code == 200
+        assert (await client.get("/limited/1")).status_code == 200
+        assert (await client.get("/limited/1")).status_code == 429
+        other_ip = {"X-Forwarded-For": "10.0.0.2"}
+        assert (await client.get("/limited/1", headers=other_ip)).status_code == 200
@@ -1,6 +1,7 @@
 import pytest
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("untokened_submit")
 async def test_list_results(auth_client, test_subject, test_group):
     # Setup: Create quiz and complete it to generate a result
     users_resp = await auth_client.get("/user/")
@@ -63,6 +64,7 @@ async def test_list_results(auth_client, test_subject, test_group):
 
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("untokened_submit")
 async def test_get_result(auth_client, test_subject, test_group):
     # Reuse flow or create new
     # For simplicity, let's just rely on the fact that previous tests might have created results or we create one here.
@@ -119,6 +121,7 @@ async def test_get_result(auth_client, test_subject, test_group):
 
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("untokened_submit")
 async def test_delete_result(auth_client, test_subject, test_group):
     users_resp = await auth_client.get("/user/")
     user_id = users_resp.json()["users"][0]["id"]
@@ -165,3 +168,104 @@ async def test_delete_result(auth_client, test_subject, test_group):
     # Verify deletion
     response = await auth_client.get(f"/result/{result_id}")
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("untokened_submit")
+async def test_attempt_review_and_cascade_delete(auth_client, async_db, test_quiz_with_questions):
+    """
+    end_quiz records a quiz attempt; its review comes back by attempt or by
+    result id, and deleting the result removes the attempt's answers.
+    """
+    from sqlalchemy import func, select
+    from app.models.quiz_attempt.model import QuizAttempt
+    from app.models.user_answers.model import UserAnswers
+
+    quiz = test_quiz_with_questions["quiz"]
+    questions = test_quiz_with_questions["questions"]
+    end_payload = {
+        "quiz_id": quiz.id,
+        "answers": [
+            {"question_id": questions[0].id, "answer": questions[0].option_a},
+            {"question_id": questions[1].id, "answer": questions[1].option_c},
+        ],
+    }
+    end_resp = await auth_client.post("/quiz_process/end_quiz", json=end_payload)
+    assert end_resp.status_code == 200
+    attempt_id = end_resp.json()["attempt_id"]
+    assert attempt_id is not None
+
+    response = await auth_client.get(f"/result/attempt/{attempt_id}/review")
+    assert response.status_code == 200
+    review = response.json()
+    assert review["attempt_id"] == attempt_id
+    assert review["correct_answers"] == 1
+    assert [a["question_text"] for a in review["answers"]] == ["Question 0", "Question 1"]
+    assert [a["is_correct"] for a in review["answers"]] == [True, False]
+
+    result_id = review["result_id"]
+    response = await auth_client.get(f"/result/{result_id}/review")
+    assert response.json() == review
+
+    response = await auth_client.delete(f"/result/{result_id}")
+    assert response.status_code == 204
+
+    count_answers = select(func.count()).select_from(UserAnswers).where(
+        UserAnswers.attempt_id == attempt_id
+    )
+    assert (await async_db.execute(count_answers)).scalar_one() == 0
+    assert await async_db.get(QuizAttempt, attempt_id) is None
+    response = await auth_client.get(f"/result/attempt/{attempt_id}/review")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("untokened_submit")
+async def test_attempt_review_visibility(
+    auth_client, async_db, test_quiz_with_questions, monkeypatch
+):
+    """
+    The review follows list_results: teachers only see their groups and
+    subjects, students only their own attempts, without the correct answers
+    unless quiz.show_correct_answers is on.
+    """
+    from fastapi import HTTPException
+    from app.models.role.model import Role
+    from app.models.user.model import User
+    from core.config import settings
+    from modules.result.repository import get_result_repository
+
+    quiz = test_quiz_with_questions["quiz"]
+    question = test_quiz_with_questions["questions"][0]
+    end_resp = await auth_client.post(
+        "/quiz_process/end_quiz",
+        json={
+            "quiz_id": quiz.id,
+            "answers": [{"question_id": question.id, "answer": question.option_b}],
+        },
+    )
+    attempt_id = end_resp.json()["attempt_id"]
+    owner_id = (await auth_client.get("/user/")).json()["users"][0]["id"]
+
+    async def review(user_id: int, role: str):
+        user = User(id=user_id, username=f"{role}_{user_id}", roles=[Role(name=role)])
+        return await get_result_repository.get_attempt_review(
+            session=async_db, current_user=user, attempt_id=attempt_id
+        )
+
+    # A teacher without this group or subject
+    with pytest.raises(HTTPException) as exc:
+        await review(999001, "Teacher")
+    assert exc.value.status_code == 404
+
+    with pytest.raises(HTTPException) as exc:
+        await review(999002, "Student")
+    assert exc.value.status_code == 403
+
+    own = await review(owner_id, "Student")
+    assert own.answers[0].answer == question.option_b
+    assert own.answers[0].correct_answer is None
+
+    monkeypatch.setattr(settings.quiz, "show_correct_answers", True)
+    own = await review(owner_id, "Student")
+    assert own.answers[0].correct_answer == question.option_a
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls():
+    """
+    Concurrent calls with the same key run the loader once and share its
+    result; a different key loads separately.
+    """
+    from core.single_flight import SingleFlight
+
+    flight = SingleFlight()
+    calls = []
+
+    async def load(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value
+
+    results = await asyncio.gather(
+        *(flight.do("quiz:1:v1", lambda: load("one")) for _ in range(10)),
+        flight.do("quiz:2:v1", lambda: load("two")),
+    )
+
+    assert results == ["one"] * 10 + ["two"]
+    assert sorted(calls) == ["one", "two"]
+    assert flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors_and_recovers():
+    """
+    Waiters see the leader's error, and the next call after it loads again.
+    """
+    from core.single_flight import SingleFlight
+
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(flight.do("key", fail) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+
+    async def ok():
+        return 42
+
+    assert await flight.do("key", ok) == 42
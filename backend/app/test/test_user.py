@@ -60,3 +60,24 @@ async def test_delete_user(auth_client):
     response = await auth_client.delete("/user/1999")
     assert response.status_code == 404
     assert response.json()["detail"] == "User not found"
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_password(async_client, async_db):
+    from app.models.user.model import User
+    from core.utils.password_hash import pwd_context
+    from sqlalchemy import select
+
+    weak_hash = pwd_context.handler("bcrypt").using(rounds=4).hash("password123")
+    async_db.add(User(username="legacy_user", password=weak_hash))
+    await async_db.commit()
+
+    response = await async_client.post(
+        "/user/login", json={"username": "legacy_user", "password": "password123"}
+    )
+    assert response.status_code == 200
+
+    async_db.expire_all()
+    user = (await async_db.execute(select(User).where(User.username == "legacy_user"))).scalar_one()
+    assert user.password != weak_hash
+    assert not pwd_context.needs_update(user.password)
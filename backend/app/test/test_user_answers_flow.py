@@ -8,6 +8,7 @@ from app.models.user_answers.model import UserAnswers
 from app.models.user.model import User
 
 @pytest.mark.asyncio
+@pytest.mark.usefixtures("untokened_submit")
 async def test_user_answers_flow(auth_client, async_db):
     # 1. Setup Data
     # Create Subject
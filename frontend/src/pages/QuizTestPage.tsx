@@ -138,9 +138,12 @@ const QuizTestPage = () => {
             else if (selectedKey === 'C') answerValue = q.option_c;
             else if (selectedKey === 'D') answerValue = q.option_d;
 
+            const optionIndex = selectedKey ? 'ABCD'.indexOf(selectedKey) : -1;
+
             return {
                 question_id: q.id,
                 answer: answerValue,
+                option_index: optionIndex >= 0 ? optionIndex : null,
             };
         });
 
@@ -148,6 +151,7 @@ const QuizTestPage = () => {
             quiz_id: quizData.quiz_id,
             user_id: user?.id || null,
             answers: answerList,
+            attempt_token: quizData.attempt_token,
         }, {
             onSuccess: (data) => {
                 setResults(data);
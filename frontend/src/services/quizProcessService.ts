@@ -19,17 +19,21 @@ export interface StartQuizResponse {
     title: string;
     duration: number;
     questions: QuestionDTO[];
+    attempt_token: string;
 }
 
 export interface AnswerDTO {
     question_id: number;
     answer: string;
+    // Position of the chosen option as served (0 = option_a)
+    option_index?: number | null;
 }
 
 export interface EndQuizRequest {
     quiz_id: number;
     user_id?: number | null;
     answers: AnswerDTO[];
+    attempt_token: string;
 }
 
 export interface EndQuizResponse {